@@ -1,618 +1,147 @@
+import os
 import tkinter as tk
 from tkinter import ttk, messagebox
-from collections import deque
 import time
-from pymongo import MongoClient
-from bson import ObjectId
-
-# Connect to MongoDB (update the URI and database/collection as needed)
-client = MongoClient('mongodb://localhost:27017/')
-db = client['dev']  # change database name here
-collection = db['order']  # change collection name here
-limit_collection = db['dish limit']  # collection holding dish limits
-menu_collection = db['menu']   # collection that stores available menu items
-
-# Debugging helper
-try:
-    for doc in collection.find({}):
-        print("Loaded:", doc)
-except Exception as e:
-    print("Mongo debug print failed:", e)
-
-
-# -----------------------
-# Kitchen Manager (with order_type + order_number)
-# -----------------------
-class KitchenManager:
-    def __init__(self):
-        # index constants for order structure (10 fields)
-        # [dish, order_number, order_type, remarks, locked, ready, batch_id, timestamp, completed, mongo_id]
-        self.IDX_DISH = 0
-        self.IDX_ORDER_NO = 1
-        self.IDX_TYPE = 2
-        self.IDX_REMARK = 3
-        self.IDX_LOCKED = 4
-        self.IDX_READY = 5
-        self.IDX_BATCH = 6
-        self.IDX_TIMESTAMP = 7
-        self.IDX_COMPLETED = 8
-        self.IDX_MONGO_ID = 9
-
-        self.orders = []   # all orders
-        self.batches = []  # [dish, batch_id, locked, timestamp]
-        self.batch_counter = 0
-
-        # queue for delivery bills
-        self.bill_queue = deque()
-
-        # dish limits loaded from Mongo: dish -> max items per batch
-        self.dish_limits = {}
 
-    # -------------------------------------------------
-    # Dish limits loader + helper
-    # -------------------------------------------------
-    def load_dish_limits(self, limit_records):
-        """
-        Accepts an iterable of records (dict-like) with keys:
-          - 'dish'
-          - 'maximum_number_of_dishes_per_batch' (int)
-        Populates self.dish_limits.
-        """
-        for rec in limit_records:
-            dish = rec.get("dish")
-            size = rec.get("maximum_number_of_dishes_per_batch")
-            try:
-                size_int = int(size)
-            except Exception:
-                size_int = None
-
-            if dish and isinstance(size_int, int) and size_int > 0:
-                self.dish_limits[dish] = size_int
-
-    # -------------------------------------------------
-    # Load available menu from MongoDB
-    # -------------------------------------------------
-    def load_menu_items(self, records):
-        menu = []
-        for r in records:
-            # accept both spellings for safety
-            dish_name = r.get("dish")
-            is_available = r.get("available", r.get("avalable", False))
-
-            if dish_name and is_available:
-                menu.append(dish_name)
-
-        return menu
-
-    def get_limit(self, dish):
-        """
-        Return the maximum number of dishes per batch for `dish`.
-        If none is defined, return a very large number (effectively no limit).
-        """
-        return self.dish_limits.get(dish, 10**9)
-
-    # -------------------------------------------------
-    # Find or create an available unlocked batch for dish
-    # -------------------------------------------------
-    def get_available_batch(self, dish):
-        """
-        Returns an existing unlocked batch_id for the dish if it is not full.
-        Otherwise creates a new batch and returns its id.
-        """
-        max_size = self.get_limit(dish)
-
-        # Try to find an unlocked batch for this dish that isn't full.
-        for b in self.batches:
-            if b[0] == dish and not b[2]:  # matching dish and not locked
-                batch_id = b[1]
-                # count current (not completed) items in that batch
-                count = sum(
-                    1 for o in self.orders
-                    if o[self.IDX_DISH] == dish and o[self.IDX_BATCH] == batch_id and not o[self.IDX_COMPLETED]
-                )
-                if count < max_size:
-                    return batch_id
-
-        # No suitable batch found — create a new unlocked batch
-        self.batch_counter += 1
-        new_id = self.batch_counter
-        self.batches.append([dish, new_id, False, time.time()])
-        return new_id
-
-    # -------------------------------------------------
-    # Load from MongoDB (handles legacy bill_number)
-    # -------------------------------------------------
-    def load_orders_from_mongodb(self, mongo_records):
-        """
-        Loads existing orders from Mongo. For records without batch_id,
-        it will allocate an available batch (respecting dish limits).
-        If a record already has batch_id, we keep it (legacy data).
-        """
-        for rec in mongo_records:
-            dish = rec.get("dish", "")
-
-            # legacy bill_number support
-            order_number = rec.get("order_number", rec.get("bill_number"))
-
-            # infer or read order_type
-            order_type = rec.get("order_type")
-            if not order_type:
-                if isinstance(order_number, str) and str(order_number).startswith("Table:"):
-                    order_type = "dine-in"
-                else:
-                    order_type = "delivery"
-
-            remarks = rec.get("remarks", "")
-            locked = bool(rec.get("locked", False))
-            ready = bool(rec.get("ready", False))
-            batch_id = rec.get("batch_id")
-            timestamp = rec.get("timestamp", time.time())
-            completed = bool(rec.get("completed", False))
-            mongo_id = rec.get("_id")
-
-            # validate timestamp
-            if not isinstance(timestamp, (float, int)):
-                timestamp = time.time()
-
-            # ensure batch ID: if record had none, allocate according to limits
-            if batch_id is None:
-                batch_id = self.get_available_batch(dish)
-            else:
-                # try to coerce to int and update batch_counter
-                try:
-                    bid = int(batch_id)
-                    batch_id = bid
-                    if bid > self.batch_counter:
-                        self.batch_counter = bid
-                except Exception:
-                    # leave batch_id as-is if it isn't an int
-                    pass
-
-            # keep batch list clean — but compute lock from all related orders
-            existing = next((b for b in self.batches if b[1] == batch_id), None)
-
-            if existing:
-                # update locked if any order in this batch is locked
-                if locked:
-                    existing[2] = True
-            else:
-                # batch lock should be True if ANY associated order is locked
-                batch_locked = any(
-                    o.get("locked", False)
-                    for o in mongo_records
-                    if o.get("dish") == dish and o.get("batch_id") == batch_id
-                )
-                self.batches.append([dish, batch_id, batch_locked, timestamp])
-
-            # store order
-            self.orders.append([
-                dish,
-                order_number,
-                order_type,
-                remarks,
-                locked,
-                ready,
-                batch_id,
-                timestamp,
-                completed,
-                mongo_id
-            ])
-
-        # After loading all records, ensure that if a batch is marked locked,
-        # all orders belonging to that batch are flagged locked in memory too.
-        for b in self.batches:
-            dish, batch_id, batch_locked, _ = b
-            if batch_locked:
-                for o in self.orders:
-                    try:
-                        if o[self.IDX_DISH] == dish and o[self.IDX_BATCH] == batch_id:
-                            o[self.IDX_LOCKED] = True
-                    except Exception:
-                        pass
-
-    # -------------------------------------------------
-    # LIVE SYNC PATCH — Sync Orders, Menu, Dish Limits
-    # -------------------------------------------------
-
-    def sync_orders(self):
-        """Sync internal orders with MongoDB, detecting new/edited/deleted docs."""
-        try:
-            mongo_records = list(collection.find({}))
-        except Exception as e:
-            print("Order sync failed:", e)
-            return
-
-        # Build maps
-        existing_map = {o[self.IDX_MONGO_ID]: o for o in self.orders if o[self.IDX_MONGO_ID]}
-        mongo_ids = {rec["_id"] for rec in mongo_records}
-
-        # --- NEW ORDERS ---
-        for rec in mongo_records:
-            _id = rec["_id"]
-            if _id not in existing_map:
-                print("NEW ORDER DETECTED:", rec)
-                self.load_orders_from_mongodb([rec])
-
-        # --- UPDATED ORDERS ---
-        for rec in mongo_records:
-            _id = rec["_id"]
-            if _id in existing_map:
-                local = existing_map[_id]
-                local[self.IDX_REMARK]    = rec.get("remarks", local[self.IDX_REMARK])
-                local[self.IDX_LOCKED]    = bool(rec.get("locked", local[self.IDX_LOCKED]))
-                local[self.IDX_READY]     = bool(rec.get("ready", local[self.IDX_READY]))
-                local[self.IDX_COMPLETED] = bool(rec.get("completed", local[self.IDX_COMPLETED]))
-
-        # --- DELETED ORDERS ---
-        for o in list(self.orders):
-            _id = o[self.IDX_MONGO_ID]
-            if _id and _id not in mongo_ids:
-                print("ORDER DELETED:", _id)
-                self.orders.remove(o)
-
-    def sync_menu(self):
-        """Reload menu availability from DB."""
-        try:
-            recs = list(menu_collection.find({}))
-            return self.load_menu_items(recs)
-        except Exception as e:
-            print("Menu sync failed:", e)
-            return self.menu_items
-
-    def sync_dish_limits(self):
-        try:
-            limits = list(limit_collection.find({}))
-            old_limits = dict(self.dish_limits)
-            self.load_dish_limits(limits)
-
-            # Detect change
-            if self.dish_limits != old_limits:
-                print("Dish limits changed → rebuilding batches")
-                self.rebuild_batches_after_limit_change()
-
-        except Exception as e:
-            print("Dish limit sync failed:", e)
-
-    # -------------------------------------------------
-    # Delivery queue
-    # -------------------------------------------------
-    def add_bill_to_queue(self, order_number, items):
-        # Normalize bill number label used internally
-        self.bill_queue.append([str(order_number), items])
-
-
-    def feed_next_item_to_kitchen(self):
-        if not self.bill_queue:
-            return None
-
-        bill_entry = self.bill_queue[0]
-        bill_number, items = bill_entry
-
-        if not items:
-            self.bill_queue.popleft()
-            return None
-
-        dish, remarks = items.pop(0)
-
-        # attach to latest unlocked batch that isn't full OR create new
-        batch_id = self.get_available_batch(dish)
-
-        self.orders.append([
-            dish,
-            bill_number,
-            "delivery",
-            remarks,
-            False,
-            False,
-            batch_id,
-            time.time(),
-            False,
-            None
-        ])
-
-        if not items:
-            self.bill_queue.popleft()
-
-        return dish
-
-    # -------------------------------------------------
-    # Add dine-in order directly (now order_type-aware)
-    # -------------------------------------------------
-    def add_order(self, dish, order_number, remarks="", order_type="dine-in"):
-        """
-        Adds an order (dine-in or delivery) and returns the batch_id it was assigned to.
-        """
-        batch_id = self.get_available_batch(dish)
-
-        self.orders.append([
-            dish,
-            order_number,
-            order_type,
-            remarks,
-            False,
-            False,
-            batch_id,
-            time.time(),
-            False,
-            None
-        ])
-
-        return batch_id
-
-    # -------------------------------------------------
-    # Batch controls
-    # -------------------------------------------------
-    def lock_specific_batch(self, dish, batch_id):
-        found = False
-
-        # Lock batch in memory
-        for b in self.batches:
-            if b[0] == dish and b[1] == batch_id:
-                if b[2]:  # already locked
-                    return True
-                b[2] = True
-                found = True
-                break
-
-        if not found:
-            return False
-
-        # Lock orders in memory and try to persist per-order if we have IDs
-        for o in self.orders:
-            if o[self.IDX_DISH] == dish and o[self.IDX_BATCH] == batch_id:
-                o[self.IDX_LOCKED] = True
-
-                # Update MongoDB per-document if we have mongo id
-                if o[self.IDX_MONGO_ID]:
-                    try:
-                        # use the stored id directly (it's already an ObjectId from PyMongo)
-                        collection.update_one(
-                            {"_id": o[self.IDX_MONGO_ID]},
-                            {"$set": {"locked": True}}
-                        )
-                    except Exception as e:
-                        print("Failed to update locked flag for", o[self.IDX_MONGO_ID], e)
-
-        # Also set batch-wide lock in Mongo (best-effort)
-        try:
-            collection.update_many(
-                {"dish": dish, "batch_id": batch_id},
-                {"$set": {"locked": True}}
-            )
-        except Exception as e:
-            print("Failed to update_many locked for batch", dish, batch_id, e)
-
-        return True
-
-    def confirm_batch_done(self, dish, batch_id):
-        updated = False
-        for o in self.orders:
-            if (
-                o[self.IDX_DISH] == dish and
-                o[self.IDX_BATCH] == batch_id and
-                o[self.IDX_LOCKED] and
-                not o[self.IDX_COMPLETED]
-            ):
-                o[self.IDX_READY] = True
-                updated = True
-
-                if o[self.IDX_MONGO_ID]:
-                    try:
-                        collection.update_one(
-                            {"_id": o[self.IDX_MONGO_ID]},
-                            {"$set": {"ready": True}}
-                        )
-                    except Exception as e:
-                        print("Failed to update ready flag for", o[self.IDX_MONGO_ID], e)
-
-        return updated
-
-    # -------------------------------------------------
-    # Getters for dashboard
-    # -------------------------------------------------
-    def get_unlocked_batches(self):
-        """
-        Return a list of (dish, batch_id, orders_in_batch) for ALL unlocked batches
-        that still have at least one incomplete order.
-        """
-        result = []
-
-        # Organize orders by (dish, batch_id)
-        orders_by_batch = {}
-        for o in self.orders:
-            dish = o[self.IDX_DISH]
-            batch = o[self.IDX_BATCH]
-            completed = o[self.IDX_COMPLETED]
-
-            if completed:
-                continue  # ignore completed orders
-
-            orders_by_batch.setdefault((dish, batch), []).append(o)
-
-        # Filter by batches table (must exist + unlocked)
-        for (dish, batch), orders in orders_by_batch.items():
-
-            # Find batch info
-            batch_info = next(
-                (b for b in self.batches if b[0] == dish and b[1] == batch),
-                None
-            )
-            if not batch_info:
-                continue
-
-            locked = batch_info[2]
-            if locked:
-                continue  # skip locked batches
-
-            result.append((dish, batch, orders))
-
-        return result
-
-
-    def get_locked_batches(self):
-        """
-        Return locked batches that still contain active (not completed) orders.
-        Prevents flickering between Pending/Preparing.
-        """
-        result = []
-
-        # Group ONLY active (not completed) orders
-        orders_by_batch = {}
-        for o in self.orders:
-            if o[self.IDX_COMPLETED]:
-                continue
-            dish = o[self.IDX_DISH]
-            batch = o[self.IDX_BATCH]
-            orders_by_batch.setdefault((dish, batch), []).append(o)
-
-        # Now filter locked batches
-        for (dish, batch), orders in orders_by_batch.items():
-            batch_info = next(
-                (b for b in self.batches if b[0] == dish and b[1] == batch),
-                None
-            )
-            if not batch_info:
-                continue
-
-            locked = batch_info[2]
-            if not locked:
-                continue
-
-            result.append((dish, batch, orders))
-
-        return result
-
-    # -------------------------------------------------
-    # Order type–aware ready bill detection
-    # -------------------------------------------------
-    def get_ready_bills(self):
-        dine = []
-        delivery = []
-
-        # normalize order numbers to strings to avoid type mismatch between ints and "Bill:xxx"
-        order_numbers = {
-            str(o[self.IDX_ORDER_NO])
-            for o in self.orders
-            if not o[self.IDX_COMPLETED]
-        }
-
-        for order_no in order_numbers:
-            group = [
-                o for o in self.orders
-                if str(o[self.IDX_ORDER_NO]) == order_no and not o[self.IDX_COMPLETED]
-            ]
-
-            if group and all(o[self.IDX_READY] for o in group):
-                order_type = group[0][self.IDX_TYPE]
-                if order_type == "dine-in":
-                    dine.append(order_no)
-                else:
-                    delivery.append(order_no)
-
-        # nice sorting for tables
-        def table_key(x):
-            try:
-                return int(x)
-            except:
-                return float("inf")
-
-        dine.sort(key=table_key)
-        delivery.sort()
-
-        return dine, delivery
-    
-    def refresh_from_mongo(self):
-        """Loads NEW orders from Mongo that are not yet in memory."""
-        try:
-            mongo_records = list(collection.find({}))
-        except Exception as e:
-            print("Mongo refresh failed:", e)
-            return
-
-        existing_ids = {o[self.IDX_MONGO_ID] for o in self.orders if o[self.IDX_MONGO_ID]}
-
-        for rec in mongo_records:
-            _id = rec.get("_id")
-            if _id not in existing_ids:
-                # NEW ORDER → add it normally
-                print("New order found:", rec)
-                self.load_orders_from_mongodb([rec])
-
-    def rebuild_batches_after_limit_change(self):
-        print("Rebuilding batches based on updated dish limits...")
-
-        self.batches = []
-        self.batch_counter = 0
-
-        orders_by_dish = {}
-        for o in self.orders:
-            if not o[self.IDX_COMPLETED]:
-                orders_by_dish.setdefault(o[self.IDX_DISH], []).append(o)
-
-        bulk_ops = []
-
-        for dish, orders in orders_by_dish.items():
-            limit = self.get_limit(dish)
-            orders.sort(key=lambda o: o[self.IDX_TIMESTAMP])
-
-            batch_id = None
-            count_in_batch = 0
+from delivery_feed import make_policy
+from kitchen_engine import KitchenEngine
+from journal import Journal
+from mongo_worker import MongoWorker
+from order_sync import OrderSync, ChangeFeed
+from storage import MongoStorage
+from sqlite_storage import SqliteStorage
+from perf import Perf, format_stats
+from scheduler import Scheduler, format_schedule
+from metrics import MetricsExporter
+from cards import (
+    VirtualList, BatchCard, TableCard, BillCard,
+    estimate_batch_card, estimate_table_card, estimate_bill_card,
+)
+
+# MongoDB settings (update the URI and database/collection names as needed).
+# The client itself is owned by the MongoWorker thread, never the Tk thread.
+MONGO_URI = 'mongodb://localhost:27017/'
+DB_NAME = 'dev'  # change database name here
+ORDER_COLLECTION = 'order'  # change collection name here
+LIMIT_COLLECTION = 'dish limit'  # collection holding dish limits
+MENU_COLLECTION = 'menu'   # collection that stores available menu items
+
+# Set KITCHEN_STORAGE=sqlite to run without a database server: everything
+# lives in one local SQLite file (KITCHEN_SQLITE_PATH)
+STORAGE_BACKEND = os.environ.get("KITCHEN_STORAGE", "mongo")
+SQLITE_PATH = os.environ.get(
+    "KITCHEN_SQLITE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "kitchen.db"),
+)
+
+# order in which queued delivery bills are fed: fifo, round-robin,
+# deadline (earliest promised time) or max-fill (see delivery_feed.py)
+FEED_POLICY = os.environ.get("KITCHEN_FEED_POLICY", "fifo")
+
+# auto-lock rules come with the dish limit records (auto_lock_when_full,
+# auto_lock_after_seconds, auto_lock_on_capacity); on_capacity rules lock
+# while fewer than this many items are cooking (unset: those rules are off)
+AUTO_LOCK_CAPACITY = os.environ.get("KITCHEN_AUTO_LOCK_CAPACITY")
+
+# local event journal + snapshots used for warm starts
+JOURNAL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "journal_data")
+
+
+# Debugging helper (runs on the Mongo worker; set KITCHEN_DEBUG=1 to dump orders at startup)
+def debug_print_orders(db):
+    try:
+        for doc in db[ORDER_COLLECTION].find({}):
+            print("Loaded:", doc)
+    except Exception as e:
+        print("Mongo debug print failed:", e)
 
-            for o in orders:
-                if batch_id is None or count_in_batch >= limit:
-                    self.batch_counter += 1
-                    batch_id = self.batch_counter
-                    count_in_batch = 0
-                    locked = any(o2[self.IDX_LOCKED] for o2 in orders if o2[self.IDX_BATCH] == batch_id)
-                    self.batches.append([dish, batch_id, locked, o[self.IDX_TIMESTAMP]])
 
-                old_batch = o[self.IDX_BATCH]
-                if old_batch != batch_id:
-                    o[self.IDX_BATCH] = batch_id
-                    mongo_id = o[self.IDX_MONGO_ID]
-                    if mongo_id:
-                        bulk_ops.append(
-                            {"update_one": {"filter": {"_id": mongo_id}, "update": {"$set": {"batch_id": batch_id}}}}
-                        )
+# OpenMetrics endpoint on localhost (KITCHEN_METRICS_PORT=0 turns it off)
+# and/or a metrics file rewritten every second
+METRICS_PORT = int(os.environ.get("KITCHEN_METRICS_PORT", "9464"))
+METRICS_FILE = os.environ.get("KITCHEN_METRICS_FILE")
 
-                count_in_batch += 1
+# hot paths timed for the performance overlay (F12)
+ENGINE_HOT_PATHS = (
+    "sync_orders", "sync_dish_limits", "sync_menu", "apply_remote_insert",
+    "apply_remote_update", "apply_remote_delete", "feed_kitchen",
+    "place_order", "lock_specific_batch", "confirm_batch_done", "evict_completed",
+    "run_auto_locks",
+    "get_unlocked_batches", "get_locked_batches", "get_ready_bills",
+    "rebuild_batches_after_limit_change",
+)
+APP_HOT_PATHS = (
+    "_refresh_all_pages", "_populate_chef_panels", "_populate_dinein",
+    "_populate_delivery", "_apply_mongo_changes", "_flush_writes",
+)
 
-        # Execute bulk updates
-        if bulk_ops:
-            try:
-                for op in bulk_ops:
-                    collection.update_one(**op["update_one"])
-            except Exception as e:
-                print("Failed to bulk update batch_ids in Mongo:", e)
 
-        print("Batch rebuild finished.")
+# The kitchen core lives in kitchen_engine.py (importable without Tk or a
+# database); the old name is kept for existing callers.
+KitchenManager = KitchenEngine
 
 
     # -------------------------------------------------
     # UI App
     # -------------------------------------------------
 class KitchenApp(tk.Tk):
-    def __init__(self, kitchen):
+    # menu / dish limit reload interval when change streams are unavailable
+    SLOW_RELOAD_SECONDS = 15
+
+    def __init__(self, kitchen, io, journal=None, warm=False):
         super().__init__()
 
         # FIX: assign kitchen BEFORE using it
+        # (a KitchenEngine on MongoStorage; the app is only a view over it)
         self.kitchen = kitchen
-
-        # Load menu items from Mongo
-        try:
-            menu_records = list(menu_collection.find({}))
-            self.menu_items = self.kitchen.load_menu_items(menu_records)
-            if not self.menu_items:
-                self.menu_items = ["(No items available)"]
-        except Exception as e:
-            print("Menu load failed:", e)
-            self.menu_items = ["(Menu load error)"]
+        self.storage = kitchen.storage
+        kitchen.on_bill_ready = self._on_bill_ready
+
+        # all Mongo I/O goes through the worker thread; results come back in _drain_io
+        self.io = io
+        self.journal = journal
+
+        # latency histograms behind the F12 overlay
+        self.perf = Perf()
+        self.perf.instrument_worker(io)
+        self.perf.wrap(kitchen, ENGINE_HOT_PATHS, "engine.")
+
+        self.metrics = MetricsExporter(kitchen, self.perf, METRICS_FILE)
+        if METRICS_PORT:
+            self.metrics.serve(METRICS_PORT)
+
+        # incremental sync: order deltas + change feeds for menu / limits
+        self.order_sync = OrderSync(kitchen, self.storage.orders)
+        self.menu_feed = ChangeFeed(self.storage.menu, full_document=None)
+        self.limit_feed = ChangeFeed(self.storage.limits, full_document=None)
+        self.io.submit(lambda db: self.order_sync.start())
+        if warm:
+            # state came from the journal: catch up with what changed while we were down
+            self.io.submit(
+                lambda db: self.order_sync.fetch_full(),
+                callback=self._apply_warm_resync,
+                errback=self._on_sync_error,
+            )
+        self._last_slow_reload = time.monotonic()
+        self._sync_in_flight = False
+        self._sync_started = None
+        self._flush_pending = False
+
+        # Menu items arrive from the worker; the combobox is filled in when they do
+        self.menu_items = ["(Loading menu...)"]
+        self.io.submit(
+            lambda db: self.storage.load_menu(),
+            callback=self._on_menu_loaded,
+            errback=self._on_menu_error,
+        )
 
         self.title("Kitchen Dashboard")
         self.geometry("1100x650")
 
-        # holds (label_widget, batch_id, status, created_timestamp)
-        self.timestamp_labels = []
+        # kitchen.version the pages were last rendered at
+        self._rendered_version = None
+        # batch planner output for the Pending column: (dish, batch_id) -> Suggestion
+        self._plan = {}
 
         self.style = ttk.Style(self)
         self.style.theme_use("clam")
@@ -634,12 +163,27 @@ class KitchenApp(tk.Tk):
 
         self.show_page("Orders")
 
-        # set up periodic feed and timestamp refresher
-        self.after(1500, self._periodic_feed_and_refresh)
-        self.after(1000, self._start_timestamp_refresher)
-
-        self.after(1000, self._poll_mongo_new_orders)
-        self.after(1000, self._poll_all_mongo_data)
+        self.perf.wrap(self, APP_HOT_PATHS, "ui.")
+        self._perf_overlay = tk.Label(self, font=("Courier", 9), justify="left",
+                                      anchor="nw", bg="#101010", fg="#7CFC00", padx=8, pady=6)
+        self._perf_overlay_on = False
+        self.bind("<F12>", self._toggle_perf_overlay)
+
+        # every periodic job runs from one scheduler; timer-driven changes
+        # ask for a render instead of redrawing themselves
+        self.scheduler = Scheduler(self.after, self._refresh_all_pages, perf=self.perf)
+        self.scheduler.add("io", self._drain_io, 0.016)
+        self.scheduler.add("sync", self._poll_all_mongo_data, 1.0,
+                           min_interval=0.5, max_interval=8.0)
+        self.scheduler.add("flush", self._flush_tick, 1.0)
+        self.scheduler.add("clock", self._start_timestamp_refresher, 1.0)
+        self.scheduler.add("feed", self._periodic_feed_and_refresh, 1.0)
+        self.scheduler.add("plan", self._refresh_batch_plan, 5.0)
+        self.scheduler.add("autolock", self._run_auto_locks, 1.0)
+        self.scheduler.add("metrics", self.metrics.update, 1.0)
+        self.scheduler.add("overlay", self._refresh_perf_overlay, 0.5)
+        self.scheduler.set_enabled("overlay", False)
+        self.scheduler.start()
 
     def _build_sidebar(self):
         ttk.Label(self.sidebar, text="Kitchen Hub", font=("Helvetica", 18, "bold")).pack(
@@ -781,137 +325,94 @@ class KitchenApp(tk.Tk):
         wrapper = ttk.Frame(frame)
         wrapper.pack(fill="both", expand=True)
 
+        # Both columns are virtualized: only the cards in view exist as widgets
         # PENDING COLUMN
         left = ttk.Frame(wrapper)
         left.pack(side="left", fill="both", expand=True, padx=6)
         ttk.Label(left, text="Pending", font=self.big_font).pack(anchor="w")
-
-        self.pending_canvas = tk.Canvas(left, highlightthickness=0)
-        self.pending_inner = ttk.Frame(self.pending_canvas)
-        self.pending_canvas.create_window((0, 0), window=self.pending_inner,
-                                          anchor="nw")
-        self.pending_canvas.pack(side="left", fill="both", expand=True)
-        pending_scrollbar = ttk.Scrollbar(left, orient="vertical",
-                      command=self.pending_canvas.yview)
-        pending_scrollbar.pack(side="right", fill="y")
-        self.pending_canvas.configure(yscrollcommand=pending_scrollbar.set)
-        self.pending_inner.bind(
-            "<Configure>",
-            lambda e: self.pending_canvas.configure(scrollregion=self.pending_canvas.bbox("all"))
-        )
+        self.pending_cards = VirtualList(
+            left, lambda p: BatchCard(p, self._on_batch_action, clock=self.kitchen.clock),
+            "No pending batches.", ("Helvetica", 10, "italic"), estimate_batch_card)
 
         # PREPARING COLUMN
         right = ttk.Frame(wrapper)
         right.pack(side="left", fill="both", expand=True, padx=6)
         ttk.Label(right, text="Preparing", font=self.big_font).pack(anchor="w")
-
-        self.prep_canvas = tk.Canvas(right, highlightthickness=0)
-        self.prep_inner = ttk.Frame(self.prep_canvas)
-        self.prep_canvas.create_window((0, 0), window=self.prep_inner,
-                                       anchor="nw")
-        self.prep_canvas.pack(side="left", fill="both", expand=True)
-        prep_scrollbar = ttk.Scrollbar(right, orient="vertical",
-                      command=self.prep_canvas.yview)
-        prep_scrollbar.pack(side="right", fill="y")
-        self.prep_canvas.configure(yscrollcommand=prep_scrollbar.set)
-        self.prep_inner.bind(
-            "<Configure>",
-            lambda e: self.prep_canvas.configure(scrollregion=self.prep_canvas.bbox("all"))
-        )
+        self.prep_cards = VirtualList(
+            right, lambda p: BatchCard(p, self._on_batch_action, clock=self.kitchen.clock),
+            "No preparing batches.", ("Helvetica", 10, "italic"), estimate_batch_card)
 
     # -------------------------------------------------
     # Populate Chef panels (FIXED to show ORDER TYPE)
     # -------------------------------------------------
     def _populate_chef_panels(self):
-        # CLEAR OLD CARDS
-        for widget in self.pending_inner.winfo_children():
-            widget.destroy()
-        for widget in self.prep_inner.winfo_children():
-            widget.destroy()
-
-        # Reset timestamp labels to avoid duplicates
-        self.timestamp_labels = []
-
-        # Save scroll positions
-        pending_y = self.pending_canvas.yview()
-        prep_y = self.prep_canvas.yview()
-
-        # Prepare new lists
-        self.pending_cards = []
-        self.prep_cards = []
-
-        # Fetch batches
+        # Cards are keyed by (dish, batch_id) and only touched when their
+        # content changed; off-screen batches have no widgets at all.
         pending_batches = [
             (dish, batch, orders)
             for (dish, batch, orders) in self.kitchen.get_unlocked_batches()
-            if not all(o[self.kitchen.IDX_READY] for o in orders)
+            if not all(o.ready for o in orders)
         ]
+        # batches the planner says to start now come first, least slack first
+        plan = self._plan
+        far = (True, float("inf"))
+        pending_batches.sort(key=lambda entry: (
+            (not plan[entry[:2]].start_now, plan[entry[:2]].slack) if entry[:2] in plan else far))
         prep_batches = [
             (dish, batch, orders)
             for (dish, batch, orders) in self.kitchen.get_locked_batches()
-            if not all(o[self.kitchen.IDX_READY] for o in orders)
+            if not all(o.ready for o in orders)
         ]
 
-        def create_cards(container, batches, status_label):
-            cards = []
-            for dish, batch_id, orders in batches:
-                frame = ttk.Frame(container, relief="raised", padding=10)
-                frame.pack(fill="x", pady=6, padx=6)
-
-                ttk.Label(frame, text=f"{dish} — x{len(orders)}", font=("Helvetica", 11)).pack(anchor="w")
-
-                created = next((b[3] for b in self.kitchen.batches if b[1] == batch_id), None)
-                if created:
-                    sec = int(time.time() - created)
-                    m, s = divmod(sec, 60)
-                    lbl = ttk.Label(frame, text=f"Batch #{batch_id} • {status_label} • {m:02d}:{s:02d}", font=("Helvetica", 9))
-                    lbl.pack(anchor="w", pady=(2,6))
-                    self.timestamp_labels.append((lbl, batch_id, status_label, created))
-                else:
-                    ttk.Label(frame, text=f"Batch #{batch_id} • {status_label}", font=("Helvetica", 9)).pack(anchor="w", pady=(2,6))
-
-                order_labels = []
-                for o in orders:
-                    order_no = o[self.kitchen.IDX_ORDER_NO]
-                    order_type = o[self.kitchen.IDX_TYPE]
-                    remark = o[self.kitchen.IDX_REMARK]
-                    type_str = " (dine-in)" if order_type == "dine-in" else " (delivery)"
-                    remark_str = f" — {remark}" if remark else ""
-                    lbl = ttk.Label(frame, text=f"{order_no}{type_str}{remark_str}", font=("Helvetica", 9))
-                    lbl.pack(anchor="w")
-                    order_labels.append(lbl)
-
-                if status_label == "Pending":
-                    ttk.Button(frame, text="Confirm (Start)",
-                            command=lambda d=dish, b=batch_id: self._lock_batch(d, b)).pack(anchor="e", pady=4)
-                else:
-                    ttk.Button(frame, text="Mark Ready",
-                            command=lambda d=dish, b=batch_id: self._mark_batch_done(d, b)).pack(anchor="e", pady=4)
-
-                card = type('Card', (), {})()
-                card.frame = frame
-                card.batch_key = (dish, batch_id)
-                card.order_labels = order_labels
-                cards.append(card)
-            return cards
-
-        # Create new cards
-        self.pending_cards = create_cards(self.pending_inner, pending_batches, "Pending")
-        self.prep_cards = create_cards(self.prep_inner, prep_batches, "Preparing")
-
-        # Add placeholders if empty
-        if not pending_batches:
-            lbl = ttk.Label(self.pending_inner, text="No pending batches.", font=("Helvetica", 10, "italic"))
-            lbl.pack(anchor="w", pady=6, padx=6)
-            lbl.is_placeholder = True
-        if not prep_batches:
-            lbl = ttk.Label(self.prep_inner, text="No preparing batches.", font=("Helvetica", 10, "italic"))
-            lbl.pack(anchor="w", pady=6, padx=6)
-            lbl.is_placeholder = True
-
-        # Restore scroll positions
-        self.pending_canvas.yview_moveto(pending_y[0])
-        self.prep_canvas.yview_moveto(prep_y[0])
+        self.pending_cards.render(self._batch_card_items(pending_batches, "Pending"))
+        self.prep_cards.render(self._batch_card_items(prep_batches, "Preparing"))
+
+    def _batch_card_items(self, batches, status_label):
+        items = []
+        for dish, batch_id, orders in batches:
+            batch_info = self.kitchen.batches.get(batch_id)
+            created = batch_info.timestamp if batch_info else None
+            lines = tuple(
+                (o.order_no, o.order_type, o.remarks)
+                for o in orders
+            )
+            advice = None
+            if status_label == "Pending":
+                advice = self._plan_advice(self._plan.get((dish, batch_id)))
+            items.append(((dish, batch_id), (dish, batch_id, status_label, created, lines, advice)))
+        return items
+
+    @staticmethod
+    def _plan_advice(suggestion):
+        if suggestion is None:
+            return None
+        if suggestion.start_now:
+            return f"Start now — {suggestion.reason}"
+        return f"Can wait {int(suggestion.slack // 60)} min — {suggestion.reason}"
+
+    def _run_auto_locks(self):
+        locked = self.kitchen.run_auto_locks()
+        for dish, batch_id, reason in locked:
+            print(f"Auto-locked batch {batch_id} of {dish} ({reason})")
+        if locked:
+            # same bulk write as a chef's Confirm (Start)
+            self._request_flush()
+            self.scheduler.request_render()
+        return bool(locked)
+
+    def _refresh_batch_plan(self):
+        """Re-plan the open batches; redraw the chef panels only when the advice changed."""
+        plan = {(s.dish, s.batch_id): s for s in self.kitchen.planner.plan()}
+        before = {key: self._plan_advice(s) for key, s in self._plan.items()}
+        self._plan = plan
+        if before != {key: self._plan_advice(s) for key, s in plan.items()}:
+            self._populate_chef_panels()
+
+    def _on_batch_action(self, dish, batch_id, status_label):
+        if status_label == "Pending":
+            self._lock_batch(dish, batch_id)
+        else:
+            self._mark_batch_done(dish, batch_id)
 
     # -------------------------------------------------
     # DINE-IN PAGE
@@ -921,26 +422,19 @@ class KitchenApp(tk.Tk):
                   font=self.header_font).pack(anchor="w")
         self.dinein_list = ttk.Frame(parent)
         self.dinein_list.pack(fill="both", expand=True, pady=8)
+        self.dinein_cards = VirtualList(
+            self.dinein_list, lambda p: TableCard(p, self.card_font, self._serve_item),
+            "No dishes ready.", self.big_font, estimate_table_card, padx=0)
 
     def _populate_dinein(self):
-        for w in self.dinein_list.winfo_children():
-            w.destroy()
-
         ready = [
-            o for o in self.kitchen.orders
-            if o[self.kitchen.IDX_READY] and
-               not o[self.kitchen.IDX_COMPLETED] and
-               o[self.kitchen.IDX_TYPE] == "dine-in"
+            o for o in self.kitchen.orders.in_state("ready")
+            if o.is_dine_in
         ]
 
-        if not ready:
-            ttk.Label(self.dinein_list, text="No dishes ready.",
-                      font=self.big_font).pack(anchor="w")
-            return
-
         groups = {}
         for o in ready:
-            groups.setdefault(str(o[self.kitchen.IDX_ORDER_NO]), []).append(o)
+            groups.setdefault(str(o.order_no), []).append(o)
 
         def tkey(x):
             try:
@@ -948,50 +442,27 @@ class KitchenApp(tk.Tk):
             except:
                 return float("inf")
 
+        items = []
         for table in sorted(groups.keys(), key=tkey):
-            card = ttk.Frame(self.dinein_list, relief="raised", padding=8)
-            card.pack(fill="x", pady=6)
-
             label = table.split(":")[1] if ":" in table else table
-            ttk.Label(card, text=f"Table {label}", font=self.card_font).pack(
-                anchor="w"
-            )
-
+            rows = []
             for item in groups[table]:
-                remark = f" ({item[self.kitchen.IDX_REMARK]})" if item[self.kitchen.IDX_REMARK] else ""
-                row = ttk.Frame(card)
-                row.pack(fill="x", pady=2)
-
-                ttk.Label(row,
-                          text=f"{item[self.kitchen.IDX_DISH]}{remark}",
-                          font=("Helvetica", 10)).pack(side="left")
+                remark = f" ({item.remarks})" if item.remarks else ""
+                rows.append((item, f"{item.dish}{remark}"))
+            items.append((table, (label, tuple(rows))))
 
-                ttk.Button(
-                    row,
-                    text="Mark Completed",
-                    command=lambda it=item: self._serve_item(it),
-                ).pack(side="right")
+        self.dinein_cards.render(items)
 
     # serve item
     def _serve_item(self, item):
-        for o in self.kitchen.orders:
-            if o is item and o[self.kitchen.IDX_READY] and not o[self.kitchen.IDX_COMPLETED]:
-                o[self.kitchen.IDX_COMPLETED] = True
-
-                if o[self.kitchen.IDX_MONGO_ID]:
-                    try:
-                        collection.update_one(
-                            {"_id": o[self.kitchen.IDX_MONGO_ID]},
-                            {"$set": {"completed": True}},
-                        )
-                    except Exception as e:
-                        print("Failed to update completed for", o[self.kitchen.IDX_MONGO_ID], e)
-
-                messagebox.showinfo(
-                    "Served",
-                    f"{o[self.kitchen.IDX_DISH]} for {o[self.kitchen.IDX_ORDER_NO]} completed.",
-                )
-                break
+        o = item
+        if self.kitchen.serve_item(o):
+            self._request_flush()
+
+            messagebox.showinfo(
+                "Served",
+                f"{o.dish} for {o.order_no} completed.",
+            )
 
         self._refresh_all_pages()
 
@@ -1003,93 +474,88 @@ class KitchenApp(tk.Tk):
                   font=self.header_font).pack(anchor="w")
         self.delivery_list = ttk.Frame(parent)
         self.delivery_list.pack(fill="both", expand=True, pady=8)
+        self.delivery_cards = VirtualList(
+            self.delivery_list, lambda p: BillCard(p, self.card_font, self._pack_delivery),
+            "No delivery bills ready.", self.big_font, estimate_bill_card, padx=0)
 
     def _populate_delivery(self):
-        for w in self.delivery_list.winfo_children():
-            w.destroy()
-
         _, delivery = self.kitchen.get_ready_bills()
 
-        if not delivery:
-            ttk.Label(self.delivery_list, text="No delivery bills ready.",
-                      font=self.big_font).pack(anchor="w")
-            return
-
+        items = []
         for bill in delivery:
-            card = ttk.Frame(self.delivery_list, relief="raised", padding=8)
-            card.pack(fill="x", pady=6)
-
-            ttk.Label(card, text=bill, font=self.card_font).pack(anchor="w")
+            lines = []
+            for o in self.kitchen.orders.for_order_no(bill):
+                if o.completed:
+                    continue
+                r = f" ({o.remarks})" if o.remarks else ""
+                lines.append(f" - {o.dish}{r}")
+            items.append((bill, (bill, tuple(lines))))
 
-            for o in [
-                x for x in self.kitchen.orders
-                if str(x[self.kitchen.IDX_ORDER_NO]) == bill and not x[self.kitchen.IDX_COMPLETED]
-            ]:
-                r = f" ({o[self.kitchen.IDX_REMARK]})" if o[self.kitchen.IDX_REMARK] else ""
-                ttk.Label(card,
-                          text=f" - {o[self.kitchen.IDX_DISH]}{r}",
-                          font=("Helvetica", 10)).pack(anchor="w")
+        self.delivery_cards.render(items)
 
-            ttk.Button(
-                card, text="Mark Completed",
-                command=lambda b=bill: self._pack_delivery(b)
-            ).pack(anchor="e", pady=6)
+    def _on_bill_ready(self, order_no, dine_in):
+        print("Bill ready:", order_no, "(dine-in)" if dine_in else "(delivery)")
 
     def _pack_delivery(self, bill):
-        for o in self.kitchen.orders:
-            if str(o[self.kitchen.IDX_ORDER_NO]) == bill and o[self.kitchen.IDX_READY] and not o[self.kitchen.IDX_COMPLETED]:
-                o[self.kitchen.IDX_COMPLETED] = True
-
-                if o[self.kitchen.IDX_MONGO_ID]:
-                    try:
-                        collection.update_one(
-                            {"_id": o[self.kitchen.IDX_MONGO_ID]},
-                            {"$set": {"completed": True}},
-                        )
-                    except Exception as e:
-                        print("Failed to update completed for", o[self.kitchen.IDX_MONGO_ID], e)
+        self.kitchen.complete_bill(bill)
+        self._request_flush()
 
         messagebox.showinfo("Packed", f"{bill} marked completed.")
         self._refresh_all_pages()
 
+    # -------------------------------------------------
+    # Mongo write flush (one bulk_write per tick)
+    # -------------------------------------------------
+    def _request_flush(self):
+        """Coalesce every write queued during this event-loop pass into one flush."""
+        if not self._flush_pending:
+            self._flush_pending = True
+            self.after_idle(self._flush_writes)
+
+    def _flush_writes(self):
+        self._flush_pending = False
+        batch = self.kitchen.writes.take()
+        if batch is None:
+            return
+        self.io.submit(
+            lambda db: self.storage.write(batch),
+            callback=lambda failures: self.kitchen.writes.settle(batch, failures),
+            errback=lambda e: self.kitchen.writes.settle(batch, error=e),
+        )
+
     # -------------------------------------------------
     # GLOBAL REFRESH
     # -------------------------------------------------
-    def _refresh_all_pages(self):
+    def _refresh_all_pages(self, force=False):
+        # nothing in KitchenEngine changed since the last render: skip the diff
+        version = self.kitchen.version
+        if not force and version == self._rendered_version:
+            return
+        self._rendered_version = version
         self._populate_chef_panels()
         self._populate_dinein()
         self._populate_delivery()
 
     # periodic feed
     def _periodic_feed_and_refresh(self):
-        fed = self.kitchen.feed_next_item_to_kitchen()
+        # the engine's token bucket sets the pace; this only polls it
+        fed = self.kitchen.feed_kitchen()
         if fed:
-            print("Fed:", fed)
-            self._refresh_all_pages()
-        self.after(2500, self._periodic_feed_and_refresh)
+            print("Fed:", ", ".join(fed))
+            self.scheduler.request_render()
+
+        # completed orders past the retention delay move to history
+        if self.kitchen.evict_completed():
+            self._request_flush()
+            self.scheduler.request_render()
 
     # timestamp updater
     def _start_timestamp_refresher(self):
-        now = time.time()
-        for lbl, batch_id, status, created in self.timestamp_labels:
-            try:
-                sec = int(now - created)
-                m, s = divmod(sec, 60)
-                lbl.config(text=f"Batch #{batch_id} • {status} • {m:02d}:{s:02d}")
-            except Exception:
-                pass
-        self.after(1000, self._start_timestamp_refresher)
-
-
-    def _poll_mongo_new_orders(self):
-        try:
-            self.kitchen.refresh_from_mongo()
-            self._refresh_all_pages()
-        except Exception as e:
-            print("Mongo polling error:", e)
+        now = self.kitchen.clock()
+        for cards in (self.pending_cards, self.prep_cards):
+            for card in cards.visible_cards():
+                card.tick(now)
 
-        # run again in 1 sec
-        self.after(1000, self._poll_mongo_new_orders)
 
     # samples
     def _add_sample_bills(self):
@@ -1106,9 +572,9 @@ class KitchenApp(tk.Tk):
         self._refresh_all_pages()
 
     def _clear_all_ready(self):
-        self.kitchen.orders = [
-            o for o in self.kitchen.orders if not o[self.kitchen.IDX_COMPLETED]
-        ]
+        # archive now instead of waiting for the retention delay
+        self.kitchen.evict_completed(force=True)
+        self._request_flush()
         messagebox.showinfo("Cleared", "Completed cleared.")
         self._refresh_all_pages()
 
@@ -1116,36 +582,162 @@ class KitchenApp(tk.Tk):
     # LIVE SYNC PATCH — Poll MongoDB and refresh UI
     # -------------------------------------------------
     def _poll_all_mongo_data(self):
-        """Refresh program state when MongoDB is edited externally."""
+        """
+        Refresh program state when MongoDB is edited externally.
+        Orders arrive as change-feed deltas; menu and dish limits are only
+        re-read when their feed reports a change (or every
+        SLOW_RELOAD_SECONDS when change streams are unavailable).
+
+        The reads run on the Mongo worker (_fetch_mongo_changes); the Tk
+        thread only applies the results (_apply_mongo_changes), which also
+        tells the scheduler whether anything changed so the poll backs off
+        while storage is quiet and speeds up under load.
+        """
+        if self._sync_in_flight:
+            return None
+        self._sync_in_flight = True
+        now = time.monotonic()
+        slow_due = now - self._last_slow_reload >= self.SLOW_RELOAD_SECONDS
+        if slow_due:
+            self._last_slow_reload = now
+        self._sync_started = time.perf_counter()
+        self.io.submit(
+            lambda db: self._fetch_mongo_changes(slow_due),
+            callback=self._apply_mongo_changes,
+            errback=self._on_sync_error,
+        )
+        return None
+
+    def _flush_tick(self):
+        # send everything queued this tick
+        self._flush_writes()
+
+        # push this tick's journal events to the OS, compacting now and then
+        # (the snapshot is pickled and fsynced on the I/O worker)
+        if self.journal is not None:
+            self.journal.sync()
+            self.journal.maybe_snapshot(self.io.submit)
+
+    def _fetch_mongo_changes(self, slow_due):
+        """Worker thread: every read for one sync tick. Must not touch KitchenEngine or Tk."""
+        result = {"orders": self.order_sync.fetch(), "limits": None, "menu": None}
+        if self._feed_says_reload(self.limit_feed, slow_due):
+            result["limits"] = list(self.limit_feed.collection.find({}))
+        if self._feed_says_reload(self.menu_feed, slow_due):
+            result["menu"] = list(self.menu_feed.collection.find({}))
+        return result
+
+    def _apply_mongo_changes(self, result):
+        """Tk thread: fold one sync tick into KitchenEngine and the UI."""
+        self._sync_in_flight = False
         try:
-            # SYNC ORDERS
-            self.kitchen.sync_orders()
+            # SYNC ORDERS (deltas only)
+            changed = self.order_sync.apply(result["orders"]) > 0
 
             # SYNC DISH LIMITS
-            self.kitchen.sync_dish_limits()
+            if result["limits"] is not None:
+                self.kitchen.sync_dish_limits(result["limits"])
+                changed = True
 
             # SYNC MENU (if changed, update combobox)
-            new_menu = self.kitchen.sync_menu()
-            if new_menu != self.menu_items:
-                self.menu_items = new_menu
-                try:
-                    # Update combo on order page
-                    for page in self.pages.values():
-                        for w in page.winfo_children():
-                            if isinstance(w, ttk.Frame):
-                                for child in w.winfo_children():
-                                    if isinstance(child, ttk.Combobox):
-                                        child['values'] = self.menu_items
-                except:
-                    pass
+            if result["menu"] is not None:
+                new_menu = self.kitchen.sync_menu(result["menu"])
+                if new_menu != self.menu_items:
+                    self._set_menu_items(new_menu)
 
             # Refresh UI
-            self._refresh_all_pages()
+            self.scheduler.report("sync", changed)
+            if changed:
+                self.scheduler.request_render()
+                # limit changes re-batch orders
+                self._request_flush()
 
         except Exception as e:
             print("Mongo polling error:", e)
+            self.metrics.sync_finished(time.perf_counter() - self._sync_started, ok=False)
+        else:
+            self.metrics.sync_finished(time.perf_counter() - self._sync_started)
+
+    def _apply_warm_resync(self, delta):
+        if self.order_sync.apply(delta):
+            self._refresh_all_pages()
+            self._request_flush()
+
+    def _on_sync_error(self, e):
+        self._sync_in_flight = False
+        print("Mongo polling error:", e)
+        if self._sync_started is not None:
+            self.metrics.sync_finished(time.perf_counter() - self._sync_started, ok=False)
+
+    @staticmethod
+    def _feed_says_reload(feed, slow_due):
+        events = feed.changes()
+        if events is None:
+            return slow_due
+        return bool(events)
+
+    def after(self, ms, func=None, *args):
+        """Tk after(), timing the callback and how late it fired ('loop lag')."""
+        perf = getattr(self, "perf", None)
+        if func is None or perf is None or not isinstance(ms, int):
+            return super().after(ms, func, *args)
+        due = time.perf_counter() + ms / 1000.0
+        name = "after " + getattr(func, "__name__", "callback")
+
+        def fire(*a):
+            start = time.perf_counter()
+            perf.record("loop lag", start - due)
+            try:
+                func(*a)
+            finally:
+                perf.record(name, time.perf_counter() - start)
+        return super().after(ms, fire, *args)
+
+    def _toggle_perf_overlay(self, event=None):
+        self._perf_overlay_on = not self._perf_overlay_on
+        if self._perf_overlay_on:
+            self._perf_overlay.place(relx=1.0, y=0, anchor="ne")
+            self._perf_overlay.lift()
+            self._refresh_perf_overlay()
+        else:
+            self._perf_overlay.place_forget()
+        self.scheduler.set_enabled("overlay", self._perf_overlay_on)
 
-        self.after(1000, self._poll_all_mongo_data)
+    def _refresh_perf_overlay(self):
+        if not self._perf_overlay_on:
+            return
+        self._perf_overlay.config(
+            text=f"last {self.perf.window * 2:.0f} s  (F12 hides)\n" + format_stats(self.perf.stats())
+            + "\n\n" + format_schedule(self.scheduler.stats()))
+
+    def _drain_io(self):
+        """Run worker results on the Tk thread within a small per-frame budget."""
+        self.perf.frame()
+        self.perf.maybe_rotate()
+        self.io.drain()
+
+    def _on_menu_loaded(self, menu_records):
+        menu_items = self.kitchen.load_menu_items(menu_records)
+        self._set_menu_items(menu_items or ["(No items available)"])
+
+    def _on_menu_error(self, e):
+        print("Menu load failed:", e)
+        self._set_menu_items(["(Menu load error)"])
+
+    def _set_menu_items(self, menu_items):
+        self.menu_items = menu_items
+        try:
+            # Update combo on order page
+            for page in self.pages.values():
+                for w in page.winfo_children():
+                    if isinstance(w, ttk.Frame):
+                        for child in w.winfo_children():
+                            if isinstance(child, ttk.Combobox):
+                                child['values'] = self.menu_items
+            if self.dish_var.get() not in self.menu_items:
+                self.dish_var.set(self.menu_items[0])
+        except:
+            pass
 
     # -------------------------------------------------
     # New / Fixed helper methods for missing functionality
@@ -1160,32 +752,11 @@ class KitchenApp(tk.Tk):
             messagebox.showwarning("Missing", "Please enter table/bill number.")
             return
 
-        # Add to kitchen system (now passes order_type)
-        batch_id = self.kitchen.add_order(dish, order_no, remarks, order_type)
+        # Add to kitchen system (now passes order_type); the insert goes
+        # out with the next bulk flush
+        batch_id = self.kitchen.place_order(dish, order_no, remarks, order_type)
         print("Assigned batch:", batch_id)
-
-        # Save to Mongo and try to write back the mongo_id into the in-memory order
-        try:
-            res = collection.insert_one({
-                "dish": dish,
-                "order_number": order_no,
-                "order_type": order_type,
-                "remarks": remarks,
-                "locked": False,
-                "ready": False,
-                "batch_id": int(batch_id) if batch_id is not None else None,
-                "timestamp": time.time(),
-                "completed": False,
-            })
-            inserted_id = res.inserted_id
-
-            # Guarantee correct mapping
-            self.kitchen.orders[-1][self.kitchen.IDX_MONGO_ID] = inserted_id
-
-        except Exception as e:
-            print("Insert failed:", e)
-
-            pass
+        self._request_flush()
 
         if order_type == "dine-in":
             msg = f"{dish} for Table {order_no} placed."
@@ -1203,6 +774,7 @@ class KitchenApp(tk.Tk):
 
     def _lock_batch(self, dish, batch_id):
         ok = self.kitchen.lock_specific_batch(dish, batch_id)
+        self._request_flush()
         if ok:
             messagebox.showinfo("Locked", f"Batch {batch_id} of {dish} locked (preparing).")
         else:
@@ -1211,6 +783,7 @@ class KitchenApp(tk.Tk):
 
     def _mark_batch_done(self, dish, batch_id):
         updated = self.kitchen.confirm_batch_done(dish, batch_id)
+        self._request_flush()
         if updated:
             messagebox.showinfo("Ready", f"Batch {batch_id} of {dish} marked ready.")
         else:
@@ -1221,21 +794,42 @@ class KitchenApp(tk.Tk):
 # MAIN APP
 # -------------------------------------------------
 if __name__ == "__main__":
-    km = KitchenManager()
-
-    # Load dish limits from MongoDB (if collection exists)
-    try:
-        limits = list(limit_collection.find({}))
-        km.load_dish_limits(limits)
-        print("Loaded dish limits:", km.dish_limits)
-    except Exception as e:
-        print("Failed loading dish limits:", e)
-
-    try:
-        data = list(collection.find({}))
-        km.load_orders_from_mongodb(data)
-    except Exception as e:
-        print("MongoDB load failed:", e)
-
-    app = KitchenApp(km)
-    app.mainloop()
\ No newline at end of file
+    if STORAGE_BACKEND == "sqlite":
+        # the I/O worker owns the SQLite connection the same way it owns a MongoClient
+        storage = SqliteStorage(SQLITE_PATH)
+        io = MongoWorker(SQLITE_PATH, None, client_factory=lambda path: storage).start()
+    else:
+        io = MongoWorker(MONGO_URI, DB_NAME).start()
+        storage = MongoStorage(io.db, ORDER_COLLECTION, LIMIT_COLLECTION, MENU_COLLECTION)
+    if os.environ.get("KITCHEN_DEBUG"):
+        io.submit(debug_print_orders)
+
+    km = KitchenEngine(storage)
+    km.feed_policy = make_policy(FEED_POLICY)
+    if AUTO_LOCK_CAPACITY:
+        km.auto_lock.capacity = int(AUTO_LOCK_CAPACITY)
+
+    # Warm start from the local journal when there is one; otherwise the
+    # startup load (dish limits, then orders) happens before the UI exists,
+    # so waiting on the worker is fine here
+    journal = Journal(JOURNAL_DIR)
+    warm = journal.recover(km)
+    if not warm:
+        io.call(lambda db: km.load())
+        journal.attach(km)
+        journal.snapshot()
+    else:
+        # the journal's limits may be stale: reload them and repack the
+        # recovered batches before going live
+        try:
+            km.load_dish_limits(io.call(lambda db: storage.load_dish_limits()))
+            print("Loaded dish limits:", km.dish_limits)
+        except Exception as e:
+            print("Failed loading dish limits:", e)
+        km.rebuild_batches_after_limit_change()
+
+    app = KitchenApp(km, io, journal, warm)
+    app.mainloop()
+    app.metrics.close()
+    journal.close()
+    io.stop()
@@ -0,0 +1,153 @@
+# -----------------------
+# Automatic batch locking: per-dish rules evaluated from timer heaps
+# -----------------------
+import heapq
+
+from order_store import DISHES
+
+
+class AutoLockRule:
+    """
+    When a dish's open batch locks by itself:
+      full       - as soon as it holds dish_limits[dish] orders
+      max_age    - this many seconds after the batch timestamp (None: never)
+      on_capacity - whenever the kitchen has room for it (see AutoLocker.capacity)
+    """
+
+    __slots__ = ("full", "max_age", "on_capacity")
+
+    def __init__(self, full=False, max_age=None, on_capacity=False):
+        self.full = full
+        self.max_age = max_age
+        self.on_capacity = on_capacity
+
+    def __bool__(self):
+        return bool(self.full or self.max_age is not None or self.on_capacity)
+
+    def row(self):
+        return (self.full, self.max_age, self.on_capacity)
+
+    def __repr__(self):
+        return f"AutoLockRule(full={self.full}, max_age={self.max_age}, on_capacity={self.on_capacity})"
+
+
+class AutoLocker:
+    """
+    Applies AutoLockRule per dish (`rules`, falling back to `default`) to
+    a KitchenEngine. Nothing scans the batches per tick:
+
+      - a batch that fills up, or gets its first order under an age rule,
+        pushes a timer (due now / at timestamp + max_age) onto one heap
+      - batches of on_capacity dishes wait in a second heap, oldest first,
+        and are taken while the orders cooking (locked, not ready) plus the
+        batch stay within `capacity` (or the kitchen is idle)
+
+    run(now) pops what is due, re-checks it (a batch may have been locked,
+    emptied or re-timed meanwhile) and locks through
+    engine.lock_specific_batch(), so auto-locks are queued on the same
+    bulk write path and journal as a chef's click. Returns the
+    (dish, batch_id, reason) it locked.
+
+    rearm() rebuilds both heaps from the open batches; the engine calls it
+    after loads, batch rebuilds and rule changes.
+    """
+
+    def __init__(self, engine, capacity=None):
+        self.engine = engine
+        self.capacity = capacity
+        self.rules = {}
+        self.default = AutoLockRule()
+        self._timers = []      # (due, seq, batch_id, reason)
+        self._waiting = []     # (batch timestamp, seq, batch_id) of on_capacity dishes
+        self._seq = 0
+
+    def rule(self, dish):
+        return self.rules.get(dish, self.default)
+
+    def set_rule(self, dish, rule):
+        """Set (or with a falsy rule, clear) the rule for one dish."""
+        if rule:
+            self.rules[dish] = rule
+        else:
+            self.rules.pop(dish, None)
+        self.rearm()
+
+    # -------------------------------------------------
+    # Arming (engine callbacks)
+    # -------------------------------------------------
+    def fill_changed(self, b):
+        """A batch's active order count changed (called after BatchRegistry updated it)."""
+        if not self.rules and not self.default:
+            return
+        if not b.locked and b.count > 0:
+            self._arm(b, first=b.count == 1)
+
+    def rearm(self):
+        self._timers = []
+        self._waiting = []
+        for b in self.engine.batches.open_with_orders():
+            self._arm(b, first=True)
+
+    def _arm(self, b, first):
+        dish = DISHES.name(b.dish_code)
+        rule = self.rule(dish)
+        if not rule:
+            return
+        if rule.full and b.count >= self.engine.get_limit(dish):
+            self._push_timer(self.engine.clock(), b, "full")
+        if first:
+            # first order: start the age clock / join the capacity queue
+            if rule.max_age is not None and b.timestamp:
+                self._push_timer(b.timestamp + rule.max_age, b, "age")
+            if rule.on_capacity:
+                self._seq += 1
+                heapq.heappush(self._waiting, (b.timestamp or 0, self._seq, b.batch_id))
+
+    def _push_timer(self, due, b, reason):
+        self._seq += 1
+        heapq.heappush(self._timers, (due, self._seq, b.batch_id, reason))
+
+    # -------------------------------------------------
+    # Evaluation
+    # -------------------------------------------------
+    def run(self, now=None):
+        engine = self.engine
+        now = engine.clock() if now is None else now
+        locked = []
+
+        while self._timers and self._timers[0][0] <= now:
+            _, _, batch_id, reason = heapq.heappop(self._timers)
+            b = engine.batches.get(batch_id)
+            if b is None or b.locked or b.count <= 0:
+                continue
+            dish = DISHES.name(b.dish_code)
+            rule = self.rule(dish)
+            if reason == "full" and not (rule.full and b.count >= engine.get_limit(dish)):
+                continue
+            if reason == "age":
+                if rule.max_age is None or not b.timestamp:
+                    continue
+                if b.timestamp + rule.max_age > now:
+                    # re-timed since it was armed
+                    self._push_timer(b.timestamp + rule.max_age, b, "age")
+                    continue
+            if engine.lock_specific_batch(dish, batch_id):
+                locked.append((dish, batch_id, reason))
+
+        if self.capacity is not None:
+            cooking = engine.orders.count("locked")
+            while self._waiting:
+                _, _, batch_id = self._waiting[0]
+                b = engine.batches.get(batch_id)
+                dish = DISHES.name(b.dish_code) if b is not None else None
+                if b is None or b.locked or b.count <= 0 or not self.rule(dish).on_capacity:
+                    heapq.heappop(self._waiting)
+                    continue
+                # a batch bigger than the capacity still goes into an idle kitchen
+                if cooking and cooking + b.count > self.capacity:
+                    break
+                heapq.heappop(self._waiting)
+                if engine.lock_specific_batch(dish, batch_id):
+                    cooking += b.count
+                    locked.append((dish, batch_id, "capacity"))
+        return locked
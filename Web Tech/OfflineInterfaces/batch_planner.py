@@ -0,0 +1,111 @@
+# -----------------------
+# Deadline-aware batch planner: which open batches to start now
+# -----------------------
+import heapq
+
+from order_store import DISHES
+
+FOREVER = float("inf")
+
+
+class Suggestion:
+    """
+    Planner advice for one open batch. slack is how long the batch can
+    still wait before it has to start to be done by its due time (negative
+    when it is already late); start_now says whether the chef should start
+    it now, `reason` says why (or why waiting pays off).
+    """
+
+    __slots__ = ("dish", "batch_id", "count", "limit", "due", "slack", "start_now", "reason")
+
+    def __init__(self, dish, batch_id, count, limit, due, slack, start_now, reason):
+        self.dish = dish
+        self.batch_id = batch_id
+        self.count = count
+        self.limit = limit
+        self.due = due
+        self.slack = slack
+        self.start_now = start_now
+        self.reason = reason
+
+    def __repr__(self):
+        verdict = "start now" if self.start_now else "wait"
+        return f"Suggestion({self.dish!r}, {self.batch_id!r}, {verdict}, slack={self.slack:.0f}s, {self.reason})"
+
+
+class BatchPlanner:
+    """
+    Decides when an open batch should stop waiting for more orders.
+
+    Every open batch has a due time: the earliest promised time of the
+    delivery bills in it, or `target` seconds after its oldest dine-in
+    order. Its slack is due - now - cook time (engine.cook_time(dish)).
+    A batch should start now when it is full, when its slack is used up,
+    or when the orders it still has room for are not expected before its
+    slack runs out (the dish's recent arrival rate is estimated from the
+    batch itself: orders so far / time open). Otherwise waiting fills it
+    for free and the chef is told how long it can wait. A dish without a
+    batch limit never fills, so its batches simply wait out their slack.
+
+    plan() returns the open batches most urgent first (start-now ones,
+    least slack first) using a heap, so asking for the top few does not
+    sort every batch.
+    """
+
+    # dine-in: seconds from the first order of a batch until it should be served
+    TARGET_TICKET = 900
+    # arrival rate estimates use at least this much history (seconds)
+    MIN_RATE_WINDOW = 60
+
+    def __init__(self, engine, target=TARGET_TICKET):
+        self.engine = engine
+        self.target = target
+
+    def plan(self, limit=None, now=None):
+        """Suggestions for open batches with active orders, most urgent first (at most `limit`)."""
+        now = self.engine.clock() if now is None else now
+        entries = [
+            ((not s.start_now, s.slack, s.batch_id), s)
+            for s in (self.advise(b, now) for b in self.engine.batches.open_with_orders())
+        ]
+        if limit is None:
+            entries.sort(key=lambda e: e[0])
+        else:
+            entries = heapq.nsmallest(limit, entries, key=lambda e: e[0])
+        return [s for _, s in entries]
+
+    def start_now(self, stations=None, now=None):
+        """Batches to start now, at most one per free station (`stations`)."""
+        return [s for s in self.plan(stations, now) if s.start_now]
+
+    def advise(self, b, now):
+        engine = self.engine
+        dish = DISHES.name(b.dish_code)
+        limit = engine.get_limit(dish)
+        cook = engine.cook_time(dish)
+        orders = engine.orders.active_in_batch(dish, b.batch_id)
+        count = len(orders)
+
+        due = FOREVER
+        for o in orders:
+            promised = engine.promises.get(o.order_no) if not o.is_dine_in else None
+            due = min(due, promised if promised is not None else o.timestamp + self.target)
+        slack = due - now - cook
+
+        if count >= limit:
+            return Suggestion(dish, b.batch_id, count, limit, due, slack, True, "full")
+        if slack <= 0:
+            return Suggestion(dish, b.batch_id, count, limit, due, slack, True, "due")
+        if limit >= engine.NO_LIMIT:
+            # nothing to fill: more orders only make the batch bigger
+            return Suggestion(dish, b.batch_id, count, limit, due, slack, False,
+                              f"no limit, start within {int(slack // 60) + 1} min")
+
+        opened = b.timestamp if b.timestamp else now
+        rate = count / max(self.MIN_RATE_WINDOW, now - opened)
+        fill_eta = (limit - count) / rate if rate > 0 else FOREVER
+        if fill_eta >= slack:
+            return Suggestion(dish, b.batch_id, count, limit, due, slack, True,
+                              "will not fill in time")
+        return Suggestion(dish, b.batch_id, count, limit, due, slack, False,
+                          f"fills in ~{int(fill_eta // 60) + 1} min")
@@ -0,0 +1,186 @@
+"""
+Hot-path benchmark suite for KitchenEngine (KitchenManager in Kitchen.py).
+
+Seeds an engine with 1k / 10k / 100k orders (bench_loader's dish and
+limit mix) and times the calls the dashboard makes every tick or on every
+click:
+
+    load_orders_from_mongodb, add_order, get_available_batch,
+    lock_specific_batch, confirm_batch_done, get_unlocked_batches,
+    get_locked_batches, get_ready_bills, rebuild_batches_after_limit_change
+
+Every number is microseconds per call (the best of REPEATS runs). The report
+is JSON; with a baseline, each result is compared to it and anything more
+than TOLERANCE times (and MIN_DELTA_US) slower counts as a regression.
+
+    python benchmarks/bench_hot_paths.py                       # compare with the stored baseline
+    python benchmarks/bench_hot_paths.py --sizes 1000 10000
+    python benchmarks/bench_hot_paths.py --json report.json    # also write the report
+    python benchmarks/bench_hot_paths.py --save-baseline       # record a new baseline
+
+The stored baseline (hot_paths_baseline.json) is machine specific:
+re-record it on the machine that runs the comparison.
+
+Exits with status 1 on a regression.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_loader import make_records, DISHES, LIMITS  # noqa: E402
+from kitchen_engine import KitchenEngine  # noqa: E402
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hot_paths_baseline.json")
+TOLERANCE = 1.5
+MIN_DELTA_US = 5.0  # below this, differences in the few-us calls are timer noise
+REPEATS = 3
+CALLS = 200  # per timing run for the per-click operations
+
+
+def seeded(records):
+    km = KitchenEngine()
+    km.dish_limits = dict(LIMITS)
+    with contextlib.redirect_stdout(io.StringIO()):
+        km.load_orders_from_mongodb(records)
+    return km
+
+
+def best_of(fn, calls=1, repeats=REPEATS, setup=None):
+    """Best time per call in microseconds. setup() (untimed) returns fn's argument."""
+    best = float("inf")
+    for _ in range(repeats):
+        arg = setup() if setup is not None else None
+        t0 = time.perf_counter()
+        if setup is not None:
+            fn(arg)
+        else:
+            for _ in range(calls):
+                fn()
+        best = min(best, (time.perf_counter() - t0) / calls)
+    return best * 1e6
+
+
+def run_size(n):
+    records = make_records(n)
+    results = {}
+
+    results["load_orders_from_mongodb"] = best_of(lambda km: km.load_orders_from_mongodb(records),
+                                                  calls=1, setup=_empty_engine)
+
+    def add_orders(km):
+        for i in range(CALLS):
+            km.add_order(DISHES[i % len(DISHES)], f"Table:{i % 40}")
+    results["add_order"] = best_of(add_orders, calls=CALLS, setup=lambda: seeded(records))
+
+    km = seeded(records)
+    results["get_available_batch"] = best_of(
+        lambda: km.get_available_batch(DISHES[0]), calls=CALLS)
+    results["get_unlocked_batches"] = best_of(km.get_unlocked_batches, calls=5)
+    results["get_locked_batches"] = best_of(km.get_locked_batches, calls=5)
+    results["get_ready_bills"] = best_of(km.get_ready_bills, calls=5)
+
+    results["lock_specific_batch"] = _per_batch(records, "get_unlocked_batches", "lock_specific_batch")
+    results["confirm_batch_done"] = _per_batch(records, "get_locked_batches", "confirm_batch_done")
+
+    def rebuild(km):
+        with contextlib.redirect_stdout(io.StringIO()):
+            km.rebuild_batches_after_limit_change()
+    results["rebuild_batches_after_limit_change"] = best_of(
+        rebuild, calls=1, setup=lambda: seeded(records))
+
+    return results
+
+
+def _empty_engine():
+    km = KitchenEngine()
+    km.dish_limits = dict(LIMITS)
+    return km
+
+
+def _per_batch(records, getter, method):
+    """Time km.<method>(dish, batch_id) on up to CALLS batches listed by km.<getter>()."""
+    best = float("inf")
+    for _ in range(REPEATS):
+        km = seeded(records)
+        targets = [(dish, batch_id) for dish, batch_id, _ in getattr(km, getter)()[:CALLS]]
+        if not targets:
+            return 0.0
+        fn = getattr(km, method)
+        t0 = time.perf_counter()
+        for dish, batch_id in targets:
+            fn(dish, batch_id)
+        best = min(best, (time.perf_counter() - t0) / len(targets))
+    return best * 1e6
+
+
+def compare(report, baseline):
+    """[(size, name, now_us, base_us)] for every result over TOLERANCE x its baseline."""
+    regressions = []
+    for size, results in report["results"].items():
+        base = baseline.get("results", {}).get(size, {})
+        for name, us in results.items():
+            ref = base.get(name)
+            if ref and us > ref * TOLERANCE and us - ref > MIN_DELTA_US:
+                regressions.append((size, name, us, ref))
+    return regressions
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline report to compare with")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store this run as the baseline instead of comparing")
+    args = parser.parse_args(argv)
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "unit": "us/call",
+        "results": {},
+    }
+    sizes = sorted(args.sizes)
+    for n in sizes:
+        report["results"][str(n)] = run_size(n)
+
+    print(f"{'us/call':<36}" + "".join(f"{n:>12}" for n in sizes))
+    for name in report["results"][str(sizes[0])]:
+        row = "".join(f"{report['results'][str(n)][name]:>12.1f}" for n in sizes)
+        print(f"{name:<36}{row}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print("baseline saved to", args.baseline)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("no baseline at", args.baseline, "(run with --save-baseline)")
+        return 0
+    with open(args.baseline) as f:
+        regressions = compare(report, json.load(f))
+    for size, name, us, ref in regressions:
+        print(f"REGRESSION {name} @ {size}: {us:.1f} us vs baseline {ref:.1f} us (x{us / ref:.2f})")
+    if regressions:
+        print(f"FAIL: {len(regressions)} result(s) over x{TOLERANCE} of the baseline")
+        return 1
+    print(f"OK (all within x{TOLERANCE} of the baseline)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
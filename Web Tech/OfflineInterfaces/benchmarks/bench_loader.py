@@ -0,0 +1,95 @@
+"""
+Startup benchmark for KitchenEngine.load_orders_from_mongodb.
+
+Loads synthetic order documents at growing sizes and checks that the
+time per record stays flat (the loader must be linear in record count).
+
+    python benchmarks/bench_loader.py            # default sizes
+    python benchmarks/bench_loader.py 5000 50000 # custom sizes
+
+Exits with status 1 if the per-record cost grows by more than
+MAX_GROWTH between the smallest and the largest size.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kitchen_engine import KitchenEngine  # noqa: E402
+
+DISHES = [
+    "Margherita Pizza", "Caesar Salad", "Tomato Soup", "Grilled Chicken",
+    "Spaghetti Bolognese", "Fish and Chips", "Beef Burger", "Pad Thai",
+]
+LIMITS = {"Margherita Pizza": 4, "Tomato Soup": 8, "Beef Burger": 6, "Pad Thai": 3}
+
+DEFAULT_SIZES = [2500, 5000, 10000, 20000]
+MAX_GROWTH = 3.0
+REPEATS = 3
+
+
+def make_records(n, seed=1):
+    """Order documents shaped like the `order` collection (a mix of legacy and batched rows)."""
+    rnd = random.Random(seed)
+    start = time.time() - 6 * 3600
+    records = []
+    batch_id = 0
+    for i in range(n):
+        dish = rnd.choice(DISHES)
+        dine_in = rnd.random() < 0.6
+        rec = {
+            "_id": f"bench-{i}",
+            "dish": dish,
+            "order_number": f"Table:{rnd.randint(1, 40)}" if dine_in else f"Bill:{1000 + i // 3}",
+            "order_type": "dine-in" if dine_in else "delivery",
+            "remarks": "",
+            "locked": rnd.random() < 0.3,
+            "ready": False,
+            "timestamp": start + i,
+            "completed": rnd.random() < 0.5,
+        }
+        # two thirds carry a batch_id, the rest are legacy rows without one
+        if rnd.random() < 0.66:
+            if rnd.random() < 0.25:
+                batch_id += 1
+            rec["batch_id"] = batch_id
+        records.append(rec)
+    return records
+
+
+def time_load(records):
+    best = float("inf")
+    for _ in range(REPEATS):
+        km = KitchenEngine()
+        km.dish_limits = dict(LIMITS)
+        t0 = time.perf_counter()
+        km.load_orders_from_mongodb(records)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv):
+    sizes = [int(a) for a in argv] or DEFAULT_SIZES
+    sizes.sort()
+
+    per_record = []
+    print(f"{'records':>10} {'load (ms)':>12} {'us/record':>12}")
+    for n in sizes:
+        elapsed = time_load(make_records(n))
+        us = elapsed / n * 1e6
+        per_record.append(us)
+        print(f"{n:>10} {elapsed * 1000:>12.1f} {us:>12.2f}")
+
+    growth = per_record[-1] / per_record[0]
+    print(f"per-record growth {sizes[0]} -> {sizes[-1]}: x{growth:.2f} (limit x{MAX_GROWTH})")
+    if growth > MAX_GROWTH:
+        print("FAIL: loader is not linear in record count")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,128 @@
+"""
+Memory benchmark for the order records and the engine holding them.
+
+Builds the same order documents twice: once as the old 10-field list rows
+([dish, order_number, order_type, remarks, locked, ready, batch_id,
+timestamp, completed, mongo_id]) and once as order_store.Order records,
+and reports what each costs per order. Both sides start from freshly
+decoded documents (new strings, like documents off the wire); the _id and
+timestamp objects are needed by both and are reported separately.
+
+It also measures the whole KitchenEngine working set after
+load_orders_from_mongodb (records + the store's indexes + batches, _id and
+timestamp included) against the old engine, which kept nothing but the
+list of rows. The indexes that make the batch / bill getters O(1) cost
+more than the slotted records save (~570 B against ~420 B per order at
+20000 orders), so the gate bounds that overhead rather than asking for a
+saving.
+
+    python benchmarks/bench_memory.py          # 20000 orders
+    python benchmarks/bench_memory.py 100000
+
+Exits with status 1 if a record costs more than half a list row, or the
+engine more than 1.5x the old list of rows, per order.
+"""
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_loader import make_records  # noqa: E402
+from kitchen_engine import KitchenEngine  # noqa: E402
+from order_store import Order  # noqa: E402
+
+DEFAULT_SIZE = 20000
+MAX_RATIO = 0.5
+MAX_ENGINE_RATIO = 1.5
+
+# fields both representations keep as-is (unique per document)
+SHARED = ("_id", "timestamp")
+
+
+def as_list_row(rec):
+    return [
+        rec.get("dish", ""),
+        rec.get("order_number"),
+        rec.get("order_type"),
+        rec.get("remarks", ""),
+        bool(rec.get("locked", False)),
+        bool(rec.get("ready", False)),
+        rec.get("batch_id"),
+        rec.get("timestamp"),
+        bool(rec.get("completed", False)),
+        rec.get("_id"),
+    ]
+
+
+def as_record(rec):
+    return Order(
+        rec.get("dish", ""), rec.get("order_number"), rec.get("order_type"),
+        rec.get("remarks", ""), bool(rec.get("locked", False)),
+        bool(rec.get("ready", False)), rec.get("batch_id"), rec.get("timestamp"),
+        bool(rec.get("completed", False)), rec.get("_id"),
+    )
+
+
+def retained(blob, build):
+    """Bytes still allocated after decoding `blob`, building from it and dropping the documents."""
+    gc.collect()
+    tracemalloc.start()
+    records = json.loads(blob)
+    kept = build(records)
+    del records
+    gc.collect()
+    total = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return total
+
+
+def load_engine(records):
+    km = KitchenEngine()
+    km.load_orders_from_mongodb(records)
+    return km
+
+
+def main(argv):
+    n = int(argv[0]) if argv else DEFAULT_SIZE
+    blob = json.dumps(make_records(n))
+
+    # the _id / timestamp objects alone (kept by either representation)
+    payload = retained(blob, lambda recs: [rec[f] for rec in recs for f in SHARED])
+    rows = retained(blob, lambda recs: [as_list_row(r) for r in recs])
+    records = retained(blob, lambda recs: [as_record(r) for r in recs])
+    engine = retained(blob, load_engine)
+
+    rows_own = (rows - payload) / n
+    records_own = (records - payload) / n
+
+    print(f"orders: {n}")
+    print(f"  10-field list row:               {rows_own:8.1f} B/order")
+    print(f"  Order record (slots, interned):  {records_own:8.1f} B/order")
+    print(f"  _id + timestamp (either way):    {payload / n:8.1f} B/order")
+    print(f"  KitchenEngine working set:       {engine / n:8.1f} B/order (records + indexes + batches)")
+    print(f"    of which indexes + batches:    {(engine - records) / n:8.1f} B/order")
+    print(f"  old engine (list of rows):       {rows / n:8.1f} B/order")
+
+    failed = False
+    ratio = records_own / rows_own
+    print(f"record / list row: {ratio:.2f} (limit {MAX_RATIO})")
+    if ratio > MAX_RATIO:
+        print("FAIL: records are not at most half the size of list rows")
+        failed = True
+    engine_ratio = engine / rows
+    print(f"engine / old engine: {engine_ratio:.2f} (limit {MAX_ENGINE_RATIO})")
+    if engine_ratio > MAX_ENGINE_RATIO:
+        print("FAIL: the engine's indexes cost more than the budget per order")
+        failed = True
+    if failed:
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,92 @@
+"""
+Write / load benchmark for sqlite_storage.SqliteStorage.
+
+Runs a KitchenEngine on a fresh SQLite file in a temp directory: places
+orders one flush at a time (each flush is one transaction, like one
+dashboard tick), locks and finishes batches, then times a cold load of
+everything back.
+
+    python benchmarks/bench_sqlite_storage.py          # 5000 orders
+    python benchmarks/bench_sqlite_storage.py 20000
+
+Exits with status 1 if the median flush takes longer than MAX_FLUSH_US.
+"""
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_loader import LIMITS  # noqa: E402
+from kitchen_engine import KitchenEngine  # noqa: E402
+from sqlite_storage import SqliteStorage  # noqa: E402
+
+DEFAULT_SIZE = 5000
+MAX_FLUSH_US = 2000
+
+
+def timed_flush(km, samples):
+    t0 = time.perf_counter()
+    km.flush_writes()
+    samples.append((time.perf_counter() - t0) * 1e6)
+
+
+def main(argv):
+    n = int(argv[0]) if argv else DEFAULT_SIZE
+    rnd = random.Random(1)
+    dishes = sorted(LIMITS)
+    directory = tempfile.mkdtemp(prefix="kitchen-sqlite-")
+    try:
+        storage = SqliteStorage(os.path.join(directory, "kitchen.db"))
+        km = KitchenEngine(storage)
+        km.dish_limits = dict(LIMITS)
+
+        inserts, batch_ops = [], []
+        for i in range(n):
+            km.place_order(rnd.choice(dishes), f"Table:{rnd.randint(1, 40)}")
+            timed_flush(km, inserts)
+            if i % 10 == 9:
+                unlocked = km.get_unlocked_batches()
+                if unlocked:
+                    km.lock_specific_batch(unlocked[0][0], unlocked[0][1])
+                locked = km.get_locked_batches()
+                if locked:
+                    km.confirm_batch_done(locked[0][0], locked[0][1])
+                timed_flush(km, batch_ops)
+
+        t0 = time.perf_counter()
+        fresh = KitchenEngine(storage)
+        fresh.load()
+        load = time.perf_counter() - t0
+        loaded = len(fresh.orders)
+        storage.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    median = statistics.median(inserts)
+    print(f"orders: {n}")
+    print(f"  flush, one insert:          median {median:8.1f} us, p99 {_p99(inserts):8.1f} us")
+    print(f"  flush, lock + ready batch:  median {statistics.median(batch_ops):8.1f} us, "
+          f"p99 {_p99(batch_ops):8.1f} us")
+    print(f"  cold load of {loaded} orders: {load * 1000:8.1f} ms")
+
+    if loaded != n:
+        print("FAIL: not every order came back")
+        return 1
+    if median > MAX_FLUSH_US:
+        print(f"FAIL: median flush over {MAX_FLUSH_US} us")
+        return 1
+    print("OK")
+    return 0
+
+
+def _p99(samples):
+    return sorted(samples)[int(len(samples) * 0.99)]
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
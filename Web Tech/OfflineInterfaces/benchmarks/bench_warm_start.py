@@ -0,0 +1,99 @@
+"""
+Warm-start benchmark for journal.Journal.
+
+Loads synthetic orders into a KitchenEngine, takes a snapshot, runs a tail
+of ordinary kitchen events into the journal log, then times recover() into
+a fresh engine next to a cold load_orders_from_mongodb of the same orders.
+
+    python benchmarks/bench_warm_start.py              # 50000 orders
+    python benchmarks/bench_warm_start.py 100000 20000 # orders, tail events
+
+Exits with status 1 if recovery takes longer than MAX_SECONDS or does not
+rebuild the same orders.
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_loader import make_records, LIMITS  # noqa: E402
+from journal import Journal  # noqa: E402
+from kitchen_engine import KitchenEngine  # noqa: E402
+
+DEFAULT_ORDERS = 50000
+DEFAULT_TAIL = 5000
+MAX_SECONDS = 1.0
+
+
+def run_tail(km, events, seed=2):
+    """Place, lock and finish orders the way a shift would."""
+    rnd = random.Random(seed)
+    dishes = sorted(LIMITS)
+    for i in range(events):
+        r = rnd.random()
+        if r < 0.6:
+            km.place_order(rnd.choice(dishes), f"Table:{rnd.randint(1, 40)}")
+        elif r < 0.8:
+            unlocked = km.get_unlocked_batches()
+            if unlocked:
+                km.lock_specific_batch(unlocked[0][0], unlocked[0][1])
+        else:
+            locked = km.get_locked_batches()
+            if locked:
+                km.confirm_batch_done(locked[0][0], locked[0][1])
+        km.writes.take()
+
+
+def signature(km):
+    return sorted(
+        (o.seq, o.dish, o.order_no, o.locked, o.ready, o.batch_id, o.completed)
+        for o in km.orders
+    )
+
+
+def main(argv):
+    n = int(argv[0]) if argv else DEFAULT_ORDERS
+    tail = int(argv[1]) if len(argv) > 1 else DEFAULT_TAIL
+    records = make_records(n)
+    directory = tempfile.mkdtemp(prefix="kitchen-journal-")
+    try:
+        km = KitchenEngine()
+        km.dish_limits = dict(LIMITS)
+        t0 = time.perf_counter()
+        km.load_orders_from_mongodb(records)
+        cold = time.perf_counter() - t0
+
+        journal = Journal(directory, snapshot_every=10 ** 9)
+        journal.attach(km)
+        journal.snapshot()
+        run_tail(km, tail)
+        journal.close()
+        expected = signature(km)
+
+        fresh = KitchenEngine()
+        t0 = time.perf_counter()
+        Journal(directory).recover(fresh)
+        warm = time.perf_counter() - t0
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"orders: {n}, tail events: {tail}")
+    print(f"  cold load (documents in memory): {cold * 1000:8.1f} ms")
+    print(f"  warm start (snapshot + replay):  {warm * 1000:8.1f} ms (limit {MAX_SECONDS * 1000:.0f} ms)")
+
+    if signature(fresh) != expected:
+        print("FAIL: recovered orders differ from the journaled engine")
+        return 1
+    if warm > MAX_SECONDS:
+        print("FAIL: warm start is too slow")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,325 @@
+# -----------------------
+# Dashboard cards + keyed reconciliation
+# -----------------------
+import bisect
+import time
+import tkinter as tk
+from tkinter import ttk
+
+
+def batch_age_text(batch_id, status, created, now):
+    """`now` comes from the engine clock, like `created`."""
+    if not created:
+        return f"Batch #{batch_id} • {status}"
+    sec = int(now - created)
+    m, s = divmod(sec, 60)
+    return f"Batch #{batch_id} • {status} • {m:02d}:{s:02d}"
+
+
+# first-guess card heights (px) until a card has been measured on screen
+def estimate_batch_card(data):
+    return 90 + 18 * len(data[4])
+
+
+def estimate_table_card(data):
+    return 34 + 34 * len(data[1])
+
+
+def estimate_bill_card(data):
+    return 76 + 20 * len(data[1])
+
+
+class VirtualList:
+    """
+    Scrollable list that only keeps widgets for the cards inside the viewport
+    (plus `overscan` cards above and below). Off-screen cards go back to a
+    pool and are recycled for whatever scrolls into view, so a backlog of
+    thousands of entries costs about a screenful of widgets.
+
+    render() gets the full list of (key, data) pairs. A visible card is
+    only updated when its data changed. Heights start from estimate(data)
+    and are replaced by the measured height once a card has been shown.
+
+    make_card(parent) must return an object with .frame and .update(data).
+    """
+
+    def __init__(self, parent, make_card, empty_text, empty_font, estimate,
+                 overscan=3, gap=6, padx=6):
+        self.make_card = make_card
+        self.estimate = estimate
+        self.overscan = overscan
+        self.gap = gap
+        self.padx = padx
+
+        self.canvas = tk.Canvas(parent, highlightthickness=0)
+        self.scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self.canvas.yview)
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.canvas.configure(yscrollcommand=self._on_yscroll)
+        self.canvas.bind("<Configure>", self._on_configure)
+
+        self.items = []
+        self._heights = {}      # key -> measured height
+        self._offsets = []      # top y of every item
+        self._total = 0
+        self._visible = {}      # key -> card
+        self._shown = {}        # id(card) -> data it currently shows
+        self._windows = {}      # id(card) -> canvas window item
+        self._pool = []
+        self._width = 1
+        self._layout_pending = False
+
+        self._placeholder = ttk.Label(self.canvas, text=empty_text, font=empty_font)
+        self._placeholder_win = self.canvas.create_window(
+            padx, gap, window=self._placeholder, anchor="nw", state="hidden")
+
+    # -------------------------------------------------
+    # Data
+    # -------------------------------------------------
+    def render(self, items):
+        self.items = items
+        keys = {k for k, _ in items}
+        self._heights = {k: h for k, h in self._heights.items() if k in keys}
+        for key in [k for k in self._visible if k not in keys]:
+            self._release(key)
+        self._relayout_offsets()
+        self.canvas.itemconfigure(self._placeholder_win, state="hidden" if items else "normal")
+        self.layout()
+
+    def visible_cards(self):
+        return list(self._visible.values())
+
+    # -------------------------------------------------
+    # Layout
+    # -------------------------------------------------
+    def _relayout_offsets(self):
+        y = self.gap
+        offsets = []
+        for key, data in self.items:
+            offsets.append(y)
+            h = self._heights.get(key)
+            y += (h if h is not None else self.estimate(data)) + self.gap
+        self._offsets = offsets
+        self._total = y
+
+    def _schedule_layout(self):
+        if not self._layout_pending:
+            self._layout_pending = True
+            self.canvas.after_idle(self.layout)
+
+    def layout(self):
+        self._layout_pending = False
+        top = self.canvas.canvasy(0)
+        bottom = top + max(self.canvas.winfo_height(), 1)
+
+        first = max(bisect.bisect_right(self._offsets, top) - 1 - self.overscan, 0)
+        last = min(bisect.bisect_left(self._offsets, bottom) + self.overscan, len(self.items))
+        wanted = {self.items[i][0] for i in range(first, last)}
+
+        for key in [k for k in self._visible if k not in wanted]:
+            self._release(key)
+
+        placed = []
+        for i in range(first, last):
+            key, data = self.items[i]
+            card = self._visible.get(key)
+            if card is None:
+                card = self._visible[key] = self._acquire()
+            if self._shown.get(id(card)) != data:
+                card.update(data)
+                self._shown[id(card)] = data
+            placed.append((i, key, card))
+
+        # measure what is on screen; fix offsets if estimates were off
+        if placed:
+            self.canvas.update_idletasks()
+            changed = False
+            for i, key, card in placed:
+                h = card.frame.winfo_reqheight()
+                if h > 1 and self._heights.get(key) != h:
+                    self._heights[key] = h
+                    changed = True
+            if changed:
+                self._relayout_offsets()
+
+        for i, key, card in placed:
+            self.canvas.coords(self._windows[id(card)], self.padx, self._offsets[i])
+
+        self._set_scrollregion(top)
+
+    def _set_scrollregion(self, top):
+        region = (0, 0, self._width, self._total)
+        current = self.canvas.cget("scrollregion")
+        if current and tuple(int(float(v)) for v in current.split()) == region:
+            return
+        self.canvas.configure(scrollregion=region)
+        # keep the same pixel at the top when the total height changed
+        if self._total > 0:
+            self.canvas.yview_moveto(top / self._total)
+
+    # -------------------------------------------------
+    # Widget pool
+    # -------------------------------------------------
+    def _acquire(self):
+        if self._pool:
+            card = self._pool.pop()
+            self.canvas.itemconfigure(self._windows[id(card)], state="normal")
+            return card
+        card = self.make_card(self.canvas)
+        self._windows[id(card)] = self.canvas.create_window(
+            self.padx, 0, window=card.frame, anchor="nw",
+            width=max(self._width - 2 * self.padx, 1))
+        return card
+
+    def _release(self, key):
+        card = self._visible.pop(key)
+        self.canvas.itemconfigure(self._windows[id(card)], state="hidden")
+        self._pool.append(card)
+
+    # -------------------------------------------------
+    # Tk events
+    # -------------------------------------------------
+    def _on_yscroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self._schedule_layout()
+
+    def _on_configure(self, event):
+        if event.width != self._width:
+            self._width = event.width
+            for win in self._windows.values():
+                self.canvas.itemconfigure(win, width=max(self._width - 2 * self.padx, 1))
+            # text wraps differently now: measure again
+            self._heights.clear()
+            self._relayout_offsets()
+        self._schedule_layout()
+
+
+class BatchCard:
+    """
+    Chef card for one batch. data is
+    (dish, batch_id, status, created, ((order_no, order_type, remark), ...), advice)
+    where advice is the batch planner's hint (or None).
+    on_action(dish, batch_id, status) runs when the button is pressed;
+    clock is the engine clock the batch timestamps come from.
+    """
+
+    def __init__(self, parent, on_action, clock=time.time):
+        self.on_action = on_action
+        self.clock = clock
+        self.data = None
+        self.frame = ttk.Frame(parent, relief="raised", padding=10)
+        self.title = ttk.Label(self.frame, font=("Helvetica", 11))
+        self.title.pack(anchor="w")
+        self.age = ttk.Label(self.frame, font=("Helvetica", 9))
+        self.age.pack(anchor="w", pady=(2, 6))
+        self.advice = ttk.Label(self.frame, font=("Helvetica", 9, "bold"))
+        self.orders_box = ttk.Frame(self.frame)
+        self.orders_box.pack(fill="x")
+        self.order_labels = []
+        self.button = ttk.Button(self.frame, command=self._pressed)
+        self.button.pack(anchor="e", pady=4)
+
+    def update(self, data):
+        dish, batch_id, status, created, orders, advice = data
+        self.data = data
+        self.title.config(text=f"{dish} — x{len(orders)}")
+        self.age.config(text=batch_age_text(batch_id, status, created, self.clock()))
+        if advice:
+            self.advice.config(text=advice)
+            self.advice.pack(anchor="w", after=self.age, pady=(0, 6))
+        else:
+            self.advice.pack_forget()
+        self.button.config(text="Confirm (Start)" if status == "Pending" else "Mark Ready")
+
+        # reuse order labels, only adding / removing the difference
+        while len(self.order_labels) < len(orders):
+            lbl = ttk.Label(self.orders_box, font=("Helvetica", 9))
+            lbl.pack(anchor="w")
+            self.order_labels.append(lbl)
+        while len(self.order_labels) > len(orders):
+            self.order_labels.pop().destroy()
+
+        for lbl, (order_no, order_type, remark) in zip(self.order_labels, orders):
+            type_str = " (dine-in)" if order_type == "dine-in" else " (delivery)"
+            remark_str = f" — {remark}" if remark else ""
+            lbl.config(text=f"{order_no}{type_str}{remark_str}")
+
+    def tick(self, now):
+        """Refresh the age label only."""
+        if self.data:
+            dish, batch_id, status, created, _, _ = self.data
+            if created:
+                self.age.config(text=batch_age_text(batch_id, status, created, now))
+
+    def _pressed(self):
+        if self.data:
+            dish, batch_id, status = self.data[:3]
+            self.on_action(dish, batch_id, status)
+
+
+class TableCard:
+    """
+    Dine-in card for one table. data is (label, ((item_key, text), ...));
+    on_serve(item_key) runs for "Mark Completed".
+    """
+
+    def __init__(self, parent, font, on_serve):
+        self.on_serve = on_serve
+        self.frame = ttk.Frame(parent, relief="raised", padding=8)
+        self.title = ttk.Label(self.frame, font=font)
+        self.title.pack(anchor="w")
+        self.rows = []  # (row_frame, label, button)
+
+    def update(self, data):
+        label, items = data
+        self.title.config(text=f"Table {label}")
+
+        while len(self.rows) < len(items):
+            row = ttk.Frame(self.frame)
+            row.pack(fill="x", pady=2)
+            lbl = ttk.Label(row, font=("Helvetica", 10))
+            lbl.pack(side="left")
+            btn = ttk.Button(row, text="Mark Completed")
+            btn.pack(side="right")
+            self.rows.append((row, lbl, btn))
+        while len(self.rows) > len(items):
+            self.rows.pop()[0].destroy()
+
+        for (row, lbl, btn), (item_key, text) in zip(self.rows, items):
+            lbl.config(text=text)
+            btn.config(command=lambda k=item_key: self.on_serve(k))
+
+
+class BillCard:
+    """
+    Delivery card for one ready bill. data is (bill, (line_text, ...));
+    on_pack(bill) runs for "Mark Completed".
+    """
+
+    def __init__(self, parent, font, on_pack):
+        self.on_pack = on_pack
+        self.bill = None
+        self.frame = ttk.Frame(parent, relief="raised", padding=8)
+        self.title = ttk.Label(self.frame, font=font)
+        self.title.pack(anchor="w")
+        self.lines_box = ttk.Frame(self.frame)
+        self.lines_box.pack(fill="x")
+        self.lines = []
+        self.button = ttk.Button(self.frame, text="Mark Completed",
+                                 command=lambda: self.on_pack(self.bill))
+        self.button.pack(anchor="e", pady=6)
+
+    def update(self, data):
+        bill, lines = data
+        self.bill = bill
+        self.title.config(text=bill)
+
+        while len(self.lines) < len(lines):
+            lbl = ttk.Label(self.lines_box, font=("Helvetica", 10))
+            lbl.pack(anchor="w")
+            self.lines.append(lbl)
+        while len(self.lines) > len(lines):
+            self.lines.pop().destroy()
+
+        for lbl, text in zip(self.lines, lines):
+            lbl.config(text=text)
@@ -0,0 +1,172 @@
+# -----------------------
+# Delivery bill queue: queued bills and the feed rate limiter
+# -----------------------
+from collections import deque
+
+
+class Bill:
+    """
+    A delivery bill waiting in KitchenEngine.bill_queue. `items` is a
+    deque of [dish, remarks] still to be fed and `fed` counts the items
+    already fed; queued_at / first_fed_at / fed_at are engine clock times
+    (None until they happen), promised_at the promised delivery time if
+    there is one. seq identifies the bill in journal events (the engine
+    numbers bills as they are queued).
+    """
+
+    __slots__ = ("order_no", "items", "queued_at", "first_fed_at", "fed_at",
+                 "promised_at", "fed", "seq")
+
+    def __init__(self, order_no, items, queued_at=None, first_fed_at=None, fed_at=None,
+                 promised_at=None, fed=0, seq=None):
+        self.order_no = str(order_no)
+        self.items = deque(list(item) for item in items)
+        self.queued_at = queued_at
+        self.first_fed_at = first_fed_at
+        self.fed_at = fed_at
+        self.promised_at = promised_at
+        self.fed = fed
+        self.seq = seq
+
+    def __iter__(self):
+        # unpacks like the old [order_no, items] queue entries
+        yield self.order_no
+        yield self.items
+
+    def __len__(self):
+        return len(self.items)
+
+    def take(self, n, now):
+        """Pop the next n items (the fed ones); returns them."""
+        taken = [self.items.popleft() for _ in range(n)]
+        self.fed += n
+        if self.first_fed_at is None:
+            self.first_fed_at = now
+        return taken
+
+    def wait(self, now):
+        """Seconds from queueing until the last item was fed (or until now)."""
+        if self.queued_at is None:
+            return 0.0
+        end = self.fed_at if self.fed_at is not None else now
+        return max(0.0, end - self.queued_at)
+
+    def row(self):
+        """Plain copy for the journal (see from_row)."""
+        return [self.order_no, [list(item) for item in self.items],
+                self.queued_at, self.first_fed_at, self.fed_at, self.promised_at, self.fed,
+                self.seq]
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row)
+
+
+class TokenBucket:
+    """
+    Admission rate limiter: `rate` tokens (items) per second, at most
+    `burst` saved up. rate=None admits everything.
+
+    take() may overdraw a full bucket, so an item group larger than the
+    burst (a catering bill fed whole) still goes in once the bucket is
+    full and later admissions pay the debt back.
+    """
+
+    def __init__(self, rate=None, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._stamp = None
+
+    def _refill(self, now):
+        if self._stamp is not None and now > self._stamp:
+            self.tokens = min(self.burst, self.tokens + (now - self._stamp) * self.rate)
+        self._stamp = now if self._stamp is None else max(self._stamp, now)
+
+    def available(self, now):
+        """Whole tokens available now (None when unlimited)."""
+        if self.rate is None:
+            return None
+        self._refill(now)
+        return max(0, int(self.tokens))
+
+    def full(self, now):
+        if self.rate is None:
+            return True
+        self._refill(now)
+        return self.tokens >= self.burst
+
+    def take(self, n, now):
+        if self.rate is None:
+            return
+        self._refill(now)
+        self.tokens -= n
+
+
+# -----------------------
+# Feed policies: which queued bill feeds next
+# -----------------------
+class FeedPolicy:
+    """
+    Orders the queued bills for KitchenEngine.feed_kitchen(), which keeps
+    them in a heap on key(bill, engine) (lowest first, ties in queue
+    order) and re-keys a bill after each item it feeds. `dynamic` policies
+    depend on kitchen state other feeds change, so the heap top is
+    re-keyed before it is used (lazy re-evaluation).
+
+    The base policy is FIFO: the oldest bill is drained before the next.
+    """
+
+    name = "fifo"
+    dynamic = False
+
+    def key(self, bill, engine):
+        return 0
+
+
+class RoundRobin(FeedPolicy):
+    """One item per bill in turn: the bill with the fewest items fed goes next."""
+
+    name = "round-robin"
+
+    def key(self, bill, engine):
+        return bill.fed
+
+
+class EarliestPromise(FeedPolicy):
+    """Earliest promised delivery time first; bills without a promise go last, oldest first."""
+
+    name = "deadline"
+
+    def key(self, bill, engine):
+        if bill.promised_at is None:
+            return (1, 0)
+        return (0, bill.promised_at)
+
+
+class MaxBatchFill(FeedPolicy):
+    """
+    Feed the bill whose next dish tops up the fullest open batch (fewest
+    free places left), so identical dishes join a batch before the chef
+    locks it; a dish with no open batch counts as a new, empty one.
+    """
+
+    name = "max-fill"
+    dynamic = True
+
+    def key(self, bill, engine):
+        dish = bill.items[0][0]
+        limit = engine.get_limit(dish)
+        b = engine.batches.available(dish, limit)
+        return limit - b.count if b is not None else limit
+
+
+FEED_POLICIES = {policy.name: policy for policy in (FeedPolicy, RoundRobin, EarliestPromise, MaxBatchFill)}
+
+
+def make_policy(name):
+    """FeedPolicy instance by name ('fifo', 'round-robin', 'deadline', 'max-fill')."""
+    try:
+        return FEED_POLICIES[name]()
+    except KeyError:
+        raise ValueError(f"unknown feed policy {name!r} (one of {', '.join(FEED_POLICIES)})")
@@ -0,0 +1,389 @@
+# -----------------------
+# Local event journal + snapshots for KitchenEngine warm starts
+# -----------------------
+import os
+import pickle
+import time
+
+from delivery_feed import Bill
+from order_store import Order, DISHES, ORDER_TYPES
+
+SNAPSHOT_FILE = "snapshot.pkl"
+SNAPSHOT_FORMAT = 1
+
+
+class Journal:
+    """
+    Append-only log of every KitchenEngine mutation, plus periodic compact
+    snapshots, kept in `directory`:
+
+      snapshot.pkl        full engine state at generation g
+      journal-<g>.log     events since that snapshot (pickled tuples)
+
+    A snapshot may be written after its log was rotated (off the UI
+    thread), so recovery replays journal-<g>.log, journal-<g+1>.log, ...
+    for as long as they exist.
+
+    A restart loads the snapshot and replays the log tail instead of
+    re-reading the whole `order` collection; bill_queue and batch
+    timestamps survive too. Queued bills are logged per bill (bill_push /
+    bill_take / bill_pop, keyed by Bill.seq), never as the whole queue.
+    So is the retention state: when each order completed and which _ids
+    were archived, so completed orders still leave on schedule and
+    archived ones stay out of later syncs.
+
+    Events are buffered and reach the OS on sync() (the dashboard syncs
+    once per tick), so a crash loses at most the last tick. With fsync=True
+    sync() also forces the data to disk. A torn record at the end of the
+    log is ignored on replay.
+
+    Orders are keyed by Order.seq; dish names and order types are written
+    as names (the interned codes differ between runs).
+    """
+
+    def __init__(self, directory, snapshot_every=20000, fsync=False):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self.generation = 0
+        self.events_since_snapshot = 0
+        self._file = None
+        self._engine = None
+        self._writing = False
+        os.makedirs(directory, exist_ok=True)
+
+    # -------------------------------------------------
+    # Recording
+    # -------------------------------------------------
+    def attach(self, engine):
+        """Start logging engine mutations (after recover() or a cold load)."""
+        self._engine = engine
+        engine.orders.log = self.record
+        engine.batches.log = self.record
+        engine.journal = self
+        if self._file is None:
+            self._file = open(self._log_path(self.generation), "ab")
+
+    def record(self, kind, *args):
+        event = self._encode(kind, args)
+        pickle.dump(event, self._file, pickle.HIGHEST_PROTOCOL)
+        self.events_since_snapshot += 1
+
+    def sync(self):
+        if self._file is None:
+            return
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def maybe_snapshot(self, submit=None):
+        """
+        Take a snapshot once snapshot_every events have piled up. Returns True
+        if it did. With `submit` (MongoWorker.submit) only the state copy and
+        the log rotation happen here; pickling and fsync run on the worker.
+        """
+        if self._engine is None or self.events_since_snapshot < self.snapshot_every:
+            return False
+        if self._writing:
+            return False
+        state = self.begin_snapshot()
+        if submit is None:
+            self.write_snapshot(state)
+            return True
+
+        def done(_):
+            self._writing = False
+
+        def failed(e):
+            self._writing = False
+            print(f"Journal: snapshot failed: {e}")
+
+        self._writing = True
+        submit(lambda db: self.write_snapshot(state), callback=done, errback=failed)
+        return True
+
+    def snapshot(self):
+        """Write the full state, then start a fresh log for the next generation."""
+        self.write_snapshot(self.begin_snapshot())
+
+    def begin_snapshot(self):
+        """
+        Copy the engine state and switch to the next generation's log right
+        away. Events logged from here on belong to the new log, so the copy
+        can be written later (write_snapshot) from another thread.
+        """
+        engine = self._engine
+        state = {
+            "format": SNAPSHOT_FORMAT,
+            "generation": self.generation + 1,
+            "taken_at": time.time(),
+            "batch_counter": engine.batch_counter,
+            "next_seq": engine.orders.next_seq,
+            "dish_limits": dict(engine.dish_limits),
+            "cook_times": dict(engine.cook_times),
+            "promises": dict(engine.promises),
+            "auto_lock": engine.auto_lock_rules(),
+            "bill_queue": _copy_bill_queue(engine.bill_queue),
+            "bill_seq": engine.bill_seq,
+            "batches": [
+                (b.dish, b.batch_id, b.locked, b.timestamp) for b in engine.batches
+            ],
+            "orders": [_order_row(o) for o in engine.orders],
+            "completed": [(t, o.seq) for t, o in engine._completed if o in engine.orders],
+            "archived": dict(engine._archived),
+        }
+
+        self.generation = state["generation"]
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+        self._file = open(self._log_path(self.generation), "ab")
+        self.events_since_snapshot = 0
+        return state
+
+    def write_snapshot(self, state):
+        """Persist a begin_snapshot() copy, then drop the logs it covers."""
+        tmp = os.path.join(self.directory, SNAPSHOT_FILE + ".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        # the snapshot is only live once the rename lands; until then the
+        # old snapshot + the chain of logs after it still describe the state
+        os.replace(tmp, os.path.join(self.directory, SNAPSHOT_FILE))
+
+        for g in range(state["generation"] - 1, -1, -1):
+            try:
+                os.remove(self._log_path(g))
+            except OSError:
+                break
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    # -------------------------------------------------
+    # Recovery
+    # -------------------------------------------------
+    def recover(self, engine):
+        """
+        Rebuild an empty engine from the snapshot and the log tail, then
+        attach to it. Returns False (and leaves the engine alone) if there
+        is nothing to recover.
+        """
+        state = self._read_snapshot()
+        generation = state["generation"] if state else 0
+        if state is None and not os.path.exists(self._log_path(generation)):
+            return False
+
+        # replay must not write itself back into the log, and completion
+        # times come from the log rather than from the replay clock
+        engine.orders.log = None
+        engine.batches.log = None
+        engine.journal = None
+        on_complete, engine.orders.on_complete = engine.orders.on_complete, None
+        engine._completed.clear()
+
+        by_seq = {}
+        bills = {}  # Bill.seq -> queued bill
+        if state is not None:
+            engine.dish_limits = dict(state["dish_limits"])
+            engine.cook_times = dict(state["cook_times"])
+            engine.promises = dict(state["promises"])
+            engine.set_auto_lock_rules(state["auto_lock"])
+            engine.bill_seq = state["bill_seq"]
+            _load_bill_queue(engine, bills, state["bill_queue"])
+            for dish, batch_id, locked, timestamp in state["batches"]:
+                engine.batches.add(dish, batch_id, locked, timestamp)
+            for row in state["orders"]:
+                o = engine.orders.add(Order(*row))
+                by_seq[o.seq] = o
+            engine.batch_counter = state["batch_counter"]
+            engine.orders.next_seq = max(engine.orders.next_seq, state["next_seq"])
+            engine._completed.extend(
+                (t, by_seq[seq]) for t, seq in state["completed"] if seq in by_seq)
+            engine._archived = dict(state["archived"])
+
+        # a snapshot written off-thread may not have landed before a crash:
+        # the logs rotated after it follow on, one generation each
+        replayed = 0
+        while True:
+            for event in self._read_log(self._log_path(generation)):
+                self._apply(engine, event, by_seq, bills)
+                replayed += 1
+            if not os.path.exists(self._log_path(generation + 1)):
+                break
+            generation += 1
+        self.generation = generation
+
+        engine.orders.on_complete = on_complete
+
+        # fill counts are derived, never logged
+        for b in engine.batches:
+            engine.batches.set_fill(b, engine.orders.active_count(b.dish, b.batch_id))
+        engine.auto_lock.rearm()
+
+        self.events_since_snapshot = replayed
+        self.attach(engine)
+        print(f"Journal: recovered {len(engine.orders)} orders "
+              f"(generation {self.generation}, {replayed} events replayed)")
+        return True
+
+    def _read_snapshot(self):
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        if state.get("format") != SNAPSHOT_FORMAT:
+            print("Journal: unknown snapshot format, ignoring it")
+            return None
+        return state
+
+    @staticmethod
+    def _read_log(path):
+        if not os.path.exists(path):
+            return
+        with open(path, "r+b") as f:
+            good = 0
+            while True:
+                try:
+                    event = pickle.load(f)
+                except EOFError:
+                    break
+                except Exception as e:
+                    # torn write at the end of the log (crash mid-record):
+                    # cut it off so new events are not appended after it
+                    print("Journal: dropping a damaged record at the end of the log:", e)
+                    f.truncate(good)
+                    break
+                good = f.tell()
+                yield event
+
+    def _apply(self, engine, event, by_seq, bills):
+        kind = event[0]
+        if kind == "add":
+            o = engine.orders.add(Order(*event[1]))
+            by_seq[o.seq] = o
+        elif kind == "set":
+            _, seq, field, value = event
+            o = by_seq.get(seq)
+            if o is not None:
+                if field in ("dish", "order_type"):
+                    field, value = _CODED[field](value)
+                engine.orders.set(o, field, value)
+        elif kind == "remove":
+            o = by_seq.pop(event[1], None)
+            if o is not None:
+                engine.orders.remove(o)
+        elif kind == "batch_add":
+            _, dish, batch_id, locked, timestamp = event
+            engine.batches.add(dish, batch_id, locked, timestamp)
+            if isinstance(batch_id, int) and batch_id > engine.batch_counter:
+                engine.batch_counter = batch_id
+        elif kind == "batch_lock":
+            b = engine.batches.get(event[1])
+            if b is not None:
+                engine.batches.set_locked(b, event[2])
+        elif kind == "batch_time":
+            b = engine.batches.get(event[1])
+            if b is not None:
+                engine.batches.set_timestamp(b, event[2])
+        elif kind == "batch_clear":
+            engine.batches.clear()
+            engine.batch_counter = 0
+        elif kind == "bill_push":
+            _push_bill(engine, bills, Bill.from_row(event[1]))
+        elif kind == "bill_take":
+            _, seq, n, now = event
+            bill = bills.get(seq)
+            if bill is not None:
+                bill.take(n, now)
+        elif kind == "bill_pop":
+            _, seq, now = event
+            bill = bills.pop(seq, None)
+            if bill is not None and now is None:
+                # dropped while empty
+                engine.bill_queue.remove(bill)
+            elif bill is not None:
+                # journal is detached during replay, so this logs nothing
+                engine._bill_fed(bill, now)
+        elif kind == "dish_limits":
+            engine.dish_limits = dict(event[1])
+        elif kind == "cook_times":
+            engine.cook_times = dict(event[1])
+        elif kind == "auto_lock":
+            engine.set_auto_lock_rules(event[1])
+        elif kind == "completed":
+            o = by_seq.get(event[1])
+            if o is not None:
+                engine._completed.append((event[2], o))
+        elif kind == "archived":
+            engine._archived[event[1]] = event[2]
+        elif kind == "promise":
+            if event[2] is None:
+                engine.promises.pop(event[1], None)
+            else:
+                engine.promises[event[1]] = event[2]
+
+    # -------------------------------------------------
+    # Encoding
+    # -------------------------------------------------
+    @staticmethod
+    def _encode(kind, args):
+        if kind == "add":
+            return (kind, _order_row(args[0]))
+        if kind == "set":
+            o, field, value = args
+            if field == "dish_code":
+                field, value = "dish", o.dish
+            elif field == "type_code":
+                field, value = "order_type", o.order_type
+            return (kind, o.seq, field, value)
+        if kind in ("remove", "completed"):
+            return (kind, args[0].seq) + tuple(args[1:])
+        if kind == "batch_add":
+            b = args[0]
+            return (kind, b.dish, b.batch_id, b.locked, b.timestamp)
+        if kind == "batch_lock":
+            return (kind, args[0].batch_id, args[0].locked)
+        if kind == "batch_time":
+            return (kind, args[0].batch_id, args[0].timestamp)
+        if kind == "bill_push":
+            return (kind, args[0].row())
+        if kind in ("dish_limits", "cook_times", "auto_lock"):
+            return (kind, dict(args[0]))
+        return (kind,) + tuple(args)
+
+    def _log_path(self, generation):
+        return os.path.join(self.directory, f"journal-{generation}.log")
+
+
+def _order_row(o):
+    """Constructor arguments for Order(*row), with names instead of codes."""
+    return (o.dish, o.order_no, o.order_type, o.remarks, o.locked, o.ready,
+            o.batch_id, o.timestamp, o.completed, o.mongo_id, o.seq)
+
+
+def _copy_bill_queue(queue):
+    return [bill.row() for bill in queue]
+
+
+def _load_bill_queue(engine, bills, rows):
+    for row in rows:
+        _push_bill(engine, bills, Bill.from_row(row))
+
+
+def _push_bill(engine, bills, bill):
+    engine.bill_seq = max(engine.bill_seq, bill.seq)
+    engine.bill_queue.append(bill)
+    bills[bill.seq] = bill
+
+
+# set events on coded fields carry the name; map it back to the code field
+_CODED = {
+    "dish": lambda name: ("dish_code", DISHES.code(name)),
+    "order_type": lambda name: ("type_code", ORDER_TYPES.code(name)),
+}
@@ -0,0 +1,825 @@
+# -----------------------
+# Headless kitchen core (no Tk, no database driver)
+# -----------------------
+from collections import deque
+import heapq
+import time
+
+from auto_lock import AutoLocker, AutoLockRule
+from batch_planner import BatchPlanner
+from delivery_feed import Bill, TokenBucket, FeedPolicy
+from order_store import OrderStore, BatchRegistry, Order
+from write_buffer import WriteBuffer
+
+
+# -----------------------
+# Kitchen Engine (with order_type + order_number)
+# -----------------------
+class KitchenEngine:
+    """
+    All kitchen state and rules: orders, batches, dish limits, the delivery
+    queue and the queued writes. No UI and no database driver in here.
+
+    storage: backend with load_orders() / load_dish_limits() / load_menu() /
+             new_id() / write(batch) (see storage.py). May be None for
+             purely in-memory use.
+    clock:   returns "now" in epoch seconds (time.time by default), so
+             simulations and benchmarks can drive time themselves.
+    retention: seconds a completed order stays in the live set before
+             evict_completed() archives it to the history store (None
+             keeps completed orders until they are archived by hand).
+    """
+
+    # default delay before a completed order leaves the live working set
+    COMPLETED_RETENTION = 300
+    # how long an archived _id is ignored if the sync loop still sees it
+    ARCHIVE_GUARD = 3600
+    # delivery feed: items per second admitted to the kitchen and how many
+    # a quiet kitchen may take at once (see feed_kitchen())
+    FEED_RATE = 1.0
+    FEED_BURST = 8
+    # how many fed bills feed_waits remembers
+    FEED_WAIT_HISTORY = 200
+    # cooking time (seconds) of a batch whose dish has no cook time set
+    DEFAULT_COOK_TIME = 300
+    # batch limit of a dish with none set (effectively no limit)
+    NO_LIMIT = 10**9
+
+    def __init__(self, storage=None, clock=time.time, retention=COMPLETED_RETENTION):
+        self.storage = storage
+        self.clock = clock
+        self.retention = retention
+
+        self.batches = BatchRegistry()  # batch_id -> Batch(dish, batch_id, locked, timestamp, count)
+        # all orders, indexed by batch / order number / mongo id / state;
+        # batch fill counts follow every order mutation
+        self.orders = OrderStore(
+            on_fill_change=self._fill_changed,
+            on_complete=self._order_completed,
+            on_bill_ready=self._bill_ready,
+        )
+        # on_bill_ready(order_no, dine_in): called the moment the last
+        # outstanding item of a table / bill turns ready
+        self.on_bill_ready = None
+
+        # completed orders in completion order: (completed_at, order)
+        self._completed = deque()
+        # mongo _id -> archive time, so a late sync cannot bring one back
+        self._archived = {}
+        self.batch_counter = 0
+
+        # queue for delivery bills (delivery_feed.Bill), fed in feed_policy
+        # order through a token bucket; feed_whole_bills admits a bill only
+        # when all of it fits, feed_per_tick caps one feed_kitchen() call
+        self.bill_queue = deque()
+        # last Bill.seq handed out (journal events name bills by seq)
+        self.bill_seq = 0
+        self.feed_policy = FeedPolicy()
+        self.feed_bucket = TokenBucket(self.FEED_RATE, self.FEED_BURST)
+        self.feed_whole_bills = False
+        self.feed_per_tick = None
+        # (order number, seconds queued) of recently fully fed bills
+        self.feed_waits = deque(maxlen=self.FEED_WAIT_HISTORY)
+
+        # dish limits loaded from Mongo: dish -> max items per batch, and the
+        # optional cooking time per batch: dish -> seconds
+        self.dish_limits = {}
+        self.cook_times = {}
+
+        # promised delivery time per delivery bill (order number -> epoch seconds)
+        self.promises = {}
+        # suggests which open batches to start now (see batch_planner.py)
+        self.planner = BatchPlanner(self)
+        # per-dish rules that lock batches without a chef's click (auto_lock.py)
+        self.auto_lock = AutoLocker(self)
+
+        # Mongo writes are queued here and sent as one bulk_write per tick
+        self.writes = WriteBuffer()
+
+        # local event journal (journal.Journal.attach() sets it)
+        self.journal = None
+
+    @property
+    def version(self):
+        """Changes whenever orders or batches change (the dashboard's dirty flag)."""
+        return self.orders.version + self.batches.version
+
+    # -------------------------------------------------
+    # Storage
+    # -------------------------------------------------
+    def load(self):
+        """Startup load of dish limits and orders from storage."""
+        try:
+            self.load_dish_limits(self.storage.load_dish_limits())
+            print("Loaded dish limits:", self.dish_limits)
+        except Exception as e:
+            print("Failed loading dish limits:", e)
+
+        try:
+            self.load_orders_from_mongodb(self.storage.load_orders())
+        except Exception as e:
+            print("Order load failed:", e)
+
+    def flush_writes(self):
+        """Send queued writes to storage in one round trip; returns {_id: error}."""
+        batch = self.writes.take()
+        if batch is None:
+            return {}
+        try:
+            failures = self.storage.write(batch)
+        except Exception as e:
+            return self.writes.settle(batch, error=e)
+        return self.writes.settle(batch, failures)
+
+    def _log(self, kind, *args):
+        if self.journal is not None:
+            self.journal.record(kind, *args)
+
+    # -------------------------------------------------
+    # Retention: completed orders -> history
+    # -------------------------------------------------
+    def _fill_changed(self, dish_code, batch_id, count):
+        self.batches.fill_changed(dish_code, batch_id, count)
+        b = self.batches.get(batch_id)
+        if b is not None and b.dish_code == dish_code:
+            self.auto_lock.fill_changed(b)
+
+    def _order_completed(self, o):
+        now = self.clock()
+        self._completed.append((now, o))
+        self._log("completed", o, now)
+
+    def _bill_ready(self, order_no, dine_in):
+        if self.on_bill_ready is not None:
+            self.on_bill_ready(order_no, dine_in)
+
+    def evict_completed(self, force=False):
+        """
+        Archive completed orders older than `retention` seconds (all of them
+        with force=True): they leave the live store and are queued for the
+        history store. Returns how many were archived.
+        """
+        now = self.clock()
+        if self.retention is None and not force:
+            return 0
+
+        evicted = 0
+        while self._completed:
+            completed_at, o = self._completed[0]
+            if not force and now - completed_at < self.retention:
+                break
+            self._completed.popleft()
+            # un-completed or already gone since it was queued
+            if not o.completed or o not in self.orders:
+                continue
+            self._archive(o, now)
+            evicted += 1
+
+        # forget guards once no sync can still return the document
+        while self._archived:
+            _id, at = next(iter(self._archived.items()))
+            if now - at < self.ARCHIVE_GUARD:
+                break
+            del self._archived[_id]
+
+        return evicted
+
+    def _archive(self, o, now):
+        self.orders.remove(o)
+        _id = o.mongo_id
+        if _id is None and self.storage is not None:
+            # fed from the bill queue, never written: history still gets it
+            _id = self.storage.new_id()
+        if _id is None:
+            return
+        self._archived[_id] = now
+        self._log("archived", _id, now)
+        self.writes.archive(_id, {
+            "dish": o.dish,
+            "order_number": o.order_no,
+            "order_type": o.order_type,
+            "remarks": o.remarks,
+            "locked": o.locked,
+            "ready": o.ready,
+            "batch_id": o.batch_id,
+            "timestamp": o.timestamp,
+            "completed": True,
+            "archived_at": now,
+        })
+
+    def is_archived(self, mongo_id):
+        return mongo_id in self._archived
+
+    # -------------------------------------------------
+    # Dish limits loader + helper
+    # -------------------------------------------------
+    def load_dish_limits(self, limit_records):
+        """
+        Accepts an iterable of records (dict-like) with keys:
+          - 'dish'
+          - 'maximum_number_of_dishes_per_batch' (int)
+          - 'cook_time_seconds' (optional, number)
+          - 'auto_lock_when_full', 'auto_lock_after_seconds',
+            'auto_lock_on_capacity' (optional, see auto_lock.AutoLockRule)
+        Populates self.dish_limits, self.cook_times and the auto-lock rules.
+        """
+        before = dict(self.dish_limits)
+        cook_before = dict(self.cook_times)
+        rules_before = self.auto_lock_rules()
+        for rec in limit_records:
+            dish = rec.get("dish")
+            size = rec.get("maximum_number_of_dishes_per_batch")
+            try:
+                size_int = int(size)
+            except Exception:
+                size_int = None
+
+            if dish and isinstance(size_int, int) and size_int > 0:
+                self.dish_limits[dish] = size_int
+
+            try:
+                cook = float(rec.get("cook_time_seconds"))
+            except (TypeError, ValueError):
+                cook = None
+            if dish and cook is not None and cook > 0:
+                self.cook_times[dish] = cook
+
+            if dish and any(key.startswith("auto_lock_") for key in rec):
+                try:
+                    max_age = rec.get("auto_lock_after_seconds")
+                    max_age = float(max_age) if max_age not in (None, "") else None
+                except (TypeError, ValueError):
+                    max_age = None
+                self.auto_lock.rules[dish] = AutoLockRule(
+                    bool(rec.get("auto_lock_when_full")), max_age,
+                    bool(rec.get("auto_lock_on_capacity")))
+
+        if self.dish_limits != before:
+            self._log("dish_limits", self.dish_limits)
+        if self.cook_times != cook_before:
+            self._log("cook_times", self.cook_times)
+        if self.auto_lock_rules() != rules_before:
+            self.set_auto_lock_rules(self.auto_lock_rules())
+
+    # -------------------------------------------------
+    # Load available menu from MongoDB
+    # -------------------------------------------------
+    def load_menu_items(self, records):
+        menu = []
+        for r in records:
+            # accept both spellings for safety
+            dish_name = r.get("dish")
+            is_available = r.get("available", r.get("avalable", False))
+
+            if dish_name and is_available:
+                menu.append(dish_name)
+
+        return menu
+
+    def get_limit(self, dish):
+        """
+        Return the maximum number of dishes per batch for `dish`.
+        If none is defined, return a very large number (effectively no limit).
+        """
+        return self.dish_limits.get(dish, self.NO_LIMIT)
+
+    def auto_lock_rules(self):
+        """{dish: (full, max_age, on_capacity)} of every auto-lock rule."""
+        return {dish: rule.row() for dish, rule in self.auto_lock.rules.items()}
+
+    def set_auto_lock_rules(self, rows):
+        """Replace the auto-lock rules ({dish: (full, max_age, on_capacity)})."""
+        self.auto_lock.rules = {dish: AutoLockRule(*row) for dish, row in rows.items()}
+        self.auto_lock.rearm()
+        self._log("auto_lock", self.auto_lock_rules())
+
+    def run_auto_locks(self):
+        """Lock the batches whose auto-lock rule is due; returns (dish, batch_id, reason) per lock."""
+        return self.auto_lock.run()
+
+    def cook_time(self, dish):
+        """Seconds one batch of `dish` takes to cook (DEFAULT_COOK_TIME if unknown)."""
+        return self.cook_times.get(dish, self.DEFAULT_COOK_TIME)
+
+    # -------------------------------------------------
+    # Find or create an available unlocked batch for dish
+    # -------------------------------------------------
+    def get_available_batch(self, dish):
+        """
+        Returns an existing unlocked batch_id for the dish if it is not full.
+        Otherwise creates a new batch and returns its id.
+        """
+        max_size = self.get_limit(dish)
+
+        # Oldest unlocked batch for this dish that isn't full (live fill counters)
+        b = self.batches.available(dish, max_size)
+        if b is not None:
+            return b.batch_id
+
+        # No suitable batch found — create a new unlocked batch
+        self.batch_counter += 1
+        new_id = self.batch_counter
+        self.batches.add(dish, new_id, False, self.clock())
+        return new_id
+
+    # -------------------------------------------------
+    # Load from MongoDB (handles legacy bill_number)
+    # -------------------------------------------------
+    def load_orders_from_mongodb(self, mongo_records):
+        """
+        Loads existing orders from Mongo. For records without batch_id,
+        it will allocate an available batch (respecting dish limits).
+        If a record already has batch_id, we keep it (legacy data).
+
+        Runs in a single pass: each batch aggregates its lock state
+        (locked if ANY of its orders is locked), earliest timestamp and
+        live order count as records arrive, then locks are propagated
+        once per locked batch instead of rescanning all records/orders.
+        Auto-lock timers are armed once at the end, not per inserted order.
+        """
+        # fills change on every insert: keep the batch counts, skip arming
+        self.orders.on_fill_change = self.batches.fill_changed
+        try:
+            self._load_records(mongo_records)
+        finally:
+            self.orders.on_fill_change = self._fill_changed
+
+        # batch timestamps moved while loading: re-arm the auto-lock timers once
+        self.auto_lock.rearm()
+
+    def _load_records(self, mongo_records):
+        # (dish, batch_id) of every batch touched by this load that ends up locked
+        locked_batches = set()
+
+        for rec in mongo_records:
+            dish = rec.get("dish", "")
+
+            # legacy bill_number support
+            order_number = rec.get("order_number", rec.get("bill_number"))
+
+            # infer or read order_type
+            order_type = rec.get("order_type")
+            if not order_type:
+                if isinstance(order_number, str) and str(order_number).startswith("Table:"):
+                    order_type = "dine-in"
+                else:
+                    order_type = "delivery"
+
+            remarks = rec.get("remarks", "")
+            locked = bool(rec.get("locked", False))
+            ready = bool(rec.get("ready", False))
+            batch_id = rec.get("batch_id")
+            timestamp = rec.get("timestamp", self.clock())
+            completed = bool(rec.get("completed", False))
+            mongo_id = rec.get("_id")
+
+            # validate timestamp
+            if not isinstance(timestamp, (float, int)):
+                timestamp = self.clock()
+
+            # ensure batch ID: if record had none, allocate according to limits
+            if batch_id is None:
+                batch_id = self.get_available_batch(dish)
+            else:
+                # try to coerce to int and update batch_counter
+                try:
+                    bid = int(batch_id)
+                    batch_id = bid
+                    if bid > self.batch_counter:
+                        self.batch_counter = bid
+                except Exception:
+                    # leave batch_id as-is if it isn't an int
+                    pass
+
+            # batch aggregate: created on first sight, then folded per record
+            batch = self.batches.get(batch_id)
+            if batch is None:
+                batch = self.batches.add(dish, batch_id, locked, timestamp)
+            else:
+                if timestamp < batch.timestamp:
+                    self.batches.set_timestamp(batch, timestamp)  # batch age follows its earliest order
+                if locked and not batch.locked:
+                    self.batches.set_locked(batch)
+
+            if batch.locked:
+                locked_batches.add((dish, batch_id))
+
+            # store order (the store keeps the batch's live count)
+            self.orders.add(Order(
+                dish, order_number, order_type, remarks,
+                locked, ready, batch_id, timestamp, completed, mongo_id,
+            ))
+
+        # Grouped propagation: if a batch is locked, all of its active
+        # orders are flagged locked in memory too.
+        for dish, batch_id in locked_batches:
+            for o in self.orders.active_in_batch(dish, batch_id):
+                self.orders.set(o, "locked", True)
+
+    # -------------------------------------------------
+    # LIVE SYNC PATCH — Sync Orders, Menu, Dish Limits
+    # -------------------------------------------------
+
+    def sync_orders(self, mongo_records, taken_at=None):
+        """
+        Full sync of internal orders with MongoDB, detecting new/edited/deleted docs.
+        Steady-state sync goes through OrderSync deltas; this is only used
+        when a change stream is invalidated. taken_at: see drop_missing().
+        """
+        mongo_ids = {rec["_id"] for rec in mongo_records}
+
+        for rec in mongo_records:
+            _id = rec["_id"]
+            local = self.orders.by_mongo_id(_id)
+
+            # --- NEW ORDERS ---
+            if local is None:
+                if _id in self._archived:
+                    continue  # archived; its delete just has not landed yet
+                print("NEW ORDER DETECTED:", rec)
+                self.load_orders_from_mongodb([rec])
+                continue
+
+            # --- UPDATED ORDERS ---
+            self._apply_remote_fields(local, rec)
+
+        # --- DELETED ORDERS ---
+        self.drop_missing(mongo_ids, taken_at)
+
+    def drop_missing(self, mongo_ids, taken_at=None):
+        """
+        Remove orders whose Mongo _id is no longer in `mongo_ids`. Returns how many.
+        Orders whose insert is still queued or in flight, or landed after the
+        snapshot was taken (time.monotonic() `taken_at`), are kept: the
+        snapshot simply predates them.
+        """
+        writes = self.writes
+        gone = [i for i in self.orders.mongo_ids()
+                if i not in mongo_ids and not writes.inserting(i, taken_at)]
+        for _id in gone:
+            print("ORDER DELETED:", _id)
+            self.orders.remove(self.orders.by_mongo_id(_id))
+        return len(gone)
+
+    def unknown_ids(self, mongo_ids):
+        """The ids in `mongo_ids` that are neither live orders nor archived."""
+        return {i for i in mongo_ids
+                if self.orders.by_mongo_id(i) is None and i not in self._archived}
+
+    def apply_remote_insert(self, rec):
+        """Change-feed insert. Returns True if memory changed."""
+        _id = rec.get("_id")
+        if _id is None:
+            return False
+        local = self.orders.by_mongo_id(_id)
+        if local is not None:
+            # our own insert echoed back, or a replay after resume
+            return self._apply_remote_fields(local, rec)
+        if _id in self._archived:
+            return False
+        print("NEW ORDER DETECTED:", rec)
+        self.load_orders_from_mongodb([rec])
+        return True
+
+    def apply_remote_update(self, mongo_id, fields):
+        """Change-feed update with only the changed fields. Returns True if memory changed."""
+        local = self.orders.by_mongo_id(mongo_id)
+        if local is None:
+            return False
+        return self._apply_remote_fields(local, fields)
+
+    def apply_remote_delete(self, mongo_id):
+        local = self.orders.by_mongo_id(mongo_id)
+        if local is None:
+            return False
+        print("ORDER DELETED:", mongo_id)
+        return self.orders.remove(local)
+
+    def _apply_remote_fields(self, local, rec):
+        before = local.fields()
+        self.orders.set(local, "remarks", rec.get("remarks", local.remarks))
+        self.orders.set(local, "locked", bool(rec.get("locked", local.locked)))
+        self.orders.set(local, "ready", bool(rec.get("ready", local.ready)))
+        self.orders.set(local, "completed", bool(rec.get("completed", local.completed)))
+        return local.fields() != before
+
+    def sync_menu(self, menu_records):
+        """Reload menu availability from freshly read `menu` records."""
+        return self.load_menu_items(menu_records)
+
+    def sync_dish_limits(self, limits):
+        try:
+            old_limits = dict(self.dish_limits)
+            self.load_dish_limits(limits)
+
+            # Detect change
+            if self.dish_limits != old_limits:
+                print("Dish limits changed → rebuilding batches")
+                self.rebuild_batches_after_limit_change()
+
+        except Exception as e:
+            print("Dish limit sync failed:", e)
+
+    # -------------------------------------------------
+    # Delivery queue
+    # -------------------------------------------------
+    def add_bill_to_queue(self, order_number, items, promised_at=None):
+        # Bill normalizes the bill number label used internally
+        self.bill_seq += 1
+        bill = Bill(order_number, items, queued_at=self.clock(), promised_at=promised_at,
+                    seq=self.bill_seq)
+        self.bill_queue.append(bill)
+        self._log("bill_push", bill)
+        if promised_at is not None:
+            self.promises[str(order_number)] = promised_at
+            self._log("promise", str(order_number), promised_at)
+
+    def feed_kitchen(self, limit=None):
+        """
+        Admit queued delivery items to the kitchen as fast as feed_bucket
+        allows: up to `limit` / feed_per_tick items per call, whole bills
+        only with feed_whole_bills (a bill bigger than the burst goes in
+        once the bucket is full). Bills take turns in feed_policy order.
+        Returns the dishes fed, in order.
+        """
+        now = self.clock()
+        budget = self.feed_bucket.available(now)
+        for cap in (limit, self.feed_per_tick):
+            if cap is not None:
+                budget = cap if budget is None else min(budget, cap)
+
+        heap = self._feed_heap()
+        policy = self.feed_policy
+        fed = []
+        while heap:
+            key, pos, bill = heap[0]
+            if policy.dynamic:
+                fresh = policy.key(bill, self)
+                if fresh != key:
+                    heapq.heapreplace(heap, (fresh, pos, bill))
+                    continue
+
+            room = None if budget is None else budget - len(fed)
+            if room is not None and room <= 0:
+                break
+            take = 1
+            if self.feed_whole_bills:
+                take = len(bill.items)
+                # a bill bigger than the budget goes in alone, on a full bucket
+                if room is not None and take > room and (fed or not self.feed_bucket.full(now)):
+                    break
+            fed.extend(self._feed_items(bill, take, now))
+
+            if bill.items:
+                heapq.heapreplace(heap, (policy.key(bill, self), pos, bill))
+            else:
+                heapq.heappop(heap)
+                self._bill_fed(bill, now)
+
+        if fed:
+            self.feed_bucket.take(len(fed), now)
+        return fed
+
+    def feed_next_item_to_kitchen(self):
+        """Feed one queued delivery item regardless of the feed rate; returns its dish."""
+        heap = self._feed_heap()
+        dish = None
+        if heap:
+            now = self.clock()
+            _, _, bill = min(heap)
+            dish = self._feed_items(bill, 1, now)[0]
+            if not bill.items:
+                self._bill_fed(bill, now)
+        return dish
+
+    def _feed_heap(self):
+        """Queued bills as a heap of (policy key, queue position, bill); drops empty bills."""
+        if any(not bill.items for bill in self.bill_queue):
+            kept = []
+            for bill in self.bill_queue:
+                if bill.items:
+                    kept.append(bill)
+                else:
+                    self._log("bill_pop", bill.seq, None)
+            self.bill_queue.clear()
+            self.bill_queue.extend(kept)
+        policy = self.feed_policy
+        heap = [(policy.key(bill, self), pos, bill) for pos, bill in enumerate(self.bill_queue)]
+        heapq.heapify(heap)
+        return heap
+
+    def _feed_items(self, bill, n, now):
+        """Feed the next n items of bill into batches; returns their dishes."""
+        dishes = []
+        for dish, remarks in bill.take(n, now):
+            # attach to latest unlocked batch that isn't full OR create new
+            batch_id = self.get_available_batch(dish)
+
+            self.orders.add(Order(dish, bill.order_no, "delivery", remarks,
+                                  batch_id=batch_id, timestamp=now))
+            dishes.append(dish)
+        self._log("bill_take", bill.seq, n, now)
+        return dishes
+
+    def _bill_fed(self, bill, now):
+        if self.bill_queue[0] is bill:
+            self.bill_queue.popleft()
+        else:
+            self.bill_queue.remove(bill)
+        bill.fed_at = now
+        self.feed_waits.append((bill.order_no, bill.wait(now)))
+        self._log("bill_pop", bill.seq, now)
+
+    def bill_wait(self, order_number):
+        """Seconds a queued bill has waited so far (None if it is not queued)."""
+        order_number = str(order_number)
+        now = self.clock()
+        for bill in self.bill_queue:
+            if bill.order_no == order_number:
+                return bill.wait(now)
+        return None
+
+    def queued_items(self):
+        return sum(len(bill.items) for bill in self.bill_queue)
+
+    # -------------------------------------------------
+    # Add dine-in order directly (now order_type-aware)
+    # -------------------------------------------------
+    def add_order(self, dish, order_number, remarks="", order_type="dine-in"):
+        """
+        Adds an order (dine-in or delivery) and returns the batch_id it was assigned to.
+        """
+        batch_id = self.get_available_batch(dish)
+
+        self.orders.add(Order(dish, order_number, order_type, remarks,
+                              batch_id=batch_id, timestamp=self.clock()))
+
+        return batch_id
+
+    def place_order(self, dish, order_number, remarks="", order_type="dine-in"):
+        """
+        add_order() plus its storage document. The id comes from storage
+        right away so the in-memory order maps to its document; the insert
+        itself goes out with the next flush. Returns the batch_id.
+        """
+        batch_id = self.add_order(dish, order_number, remarks, order_type)
+
+        order = self.orders.last()
+        new_id = self.storage.new_id() if self.storage is not None else None
+        if new_id is None:
+            return batch_id
+        self.orders.set(order, "mongo_id", new_id)
+        self.writes.insert({
+            "_id": new_id,
+            "dish": dish,
+            "order_number": order_number,
+            "order_type": order_type,
+            "remarks": remarks,
+            "locked": False,
+            "ready": False,
+            "batch_id": int(batch_id) if batch_id is not None else None,
+            "timestamp": order.timestamp,
+            "completed": False,
+        })
+        return batch_id
+
+    def serve_item(self, o):
+        """Mark one ready order completed. Returns True if it was."""
+        if o in self.orders and o.ready and not o.completed:
+            self.orders.set(o, "completed", True)
+            self.writes.set(o.mongo_id, {"completed": True})
+            return True
+        return False
+
+    def complete_bill(self, order_number):
+        """Mark every ready order of a bill completed. Returns how many."""
+        done = 0
+        for o in self.orders.for_order_no(order_number):
+            if o.ready and not o.completed:
+                self.orders.set(o, "completed", True)
+                self.writes.set(o.mongo_id, {"completed": True})
+                done += 1
+        if self.promises.pop(str(order_number), None) is not None:
+            self._log("promise", str(order_number), None)
+        return done
+
+    def suggest_batches(self, stations=None):
+        """Open batches the chef should start now, most urgent first (see BatchPlanner)."""
+        return self.planner.start_now(stations)
+
+    # -------------------------------------------------
+    # Batch controls
+    # -------------------------------------------------
+    def lock_specific_batch(self, dish, batch_id):
+        # Lock batch in memory
+        b = self.batches.get(batch_id, dish)
+        if b is None:
+            return False
+        if b.locked:  # already locked
+            return True
+        self.batches.set_locked(b)
+
+        # Lock orders in memory and queue one update per document (all sent
+        # in the next bulk flush). Not a batch-wide filter: documents stored
+        # without a batch_id only have one in memory.
+        for o in self.orders.active_in_batch(dish, batch_id):
+            self.orders.set(o, "locked", True)
+            self.writes.set(o.mongo_id, {"locked": True})
+
+        return True
+
+    def confirm_batch_done(self, dish, batch_id):
+        updated = False
+        for o in self.orders.active_in_batch(dish, batch_id):
+            if o.locked:
+                self.orders.set(o, "ready", True)
+                self.writes.set(o.mongo_id, {"ready": True})
+                updated = True
+
+        return updated
+
+    # -------------------------------------------------
+    # Getters for dashboard
+    # -------------------------------------------------
+    def get_unlocked_batches(self):
+        """
+        Return a list of (dish, batch_id, orders_in_batch) for ALL unlocked batches
+        that still have at least one incomplete order.
+        """
+        # the registry indexes batches with active orders by lock state
+        return [self._batch_entry(b) for b in self.batches.open_with_orders()]
+
+    def get_locked_batches(self):
+        """
+        Return locked batches that still contain active (not completed) orders.
+        Prevents flickering between Pending/Preparing.
+        """
+        return [self._batch_entry(b) for b in self.batches.locked_with_orders()]
+
+    def _batch_entry(self, b):
+        dish = b.dish
+        return (dish, b.batch_id, self.orders.active_in_batch(dish, b.batch_id))
+
+    # -------------------------------------------------
+    # Order type–aware ready bill detection
+    # -------------------------------------------------
+    def get_ready_bills(self):
+        """
+        (dine-in tables, delivery bills) whose outstanding items are all
+        ready, as order-number strings: tables numerically, bills sorted.
+        The store keeps these lists up to date on every state change.
+        """
+        return self.orders.ready_bills()
+    
+    def rebuild_batches_after_limit_change(self):
+        print("Rebuilding batches based on updated dish limits...")
+
+        self.batches.clear()
+        self.batch_counter = 0
+
+        orders_by_dish = {}
+        for state in ("pending", "locked", "ready"):
+            for o in self.orders.in_state(state):
+                orders_by_dish.setdefault(o.dish, []).append(o)
+
+        locked_batches = []
+        for dish, orders in orders_by_dish.items():
+            limit = self.get_limit(dish)
+            orders.sort(key=lambda o: o.timestamp)
+
+            batch = None
+            count_in_batch = 0
+
+            for o in orders:
+                if batch is None or count_in_batch >= limit:
+                    self.batch_counter += 1
+                    batch_id = self.batch_counter
+                    count_in_batch = 0
+                    batch = self.batches.add(dish, batch_id, o.locked, o.timestamp)
+                    if batch.locked:
+                        locked_batches.append(batch)
+                elif o.locked and not batch.locked:
+                    # a batch is locked if any order packed into it is
+                    self.batches.set_locked(batch)
+                    locked_batches.append(batch)
+
+                old_batch = o.batch_id
+                if old_batch != batch_id:
+                    self.orders.set(o, "batch_id", batch_id)
+                    self.writes.set(o.mongo_id, {"batch_id": batch_id})
+
+                count_in_batch += 1
+
+        # pending orders packed into a locked batch are being cooked with it
+        for b in locked_batches:
+            for o in self.orders.active_in_batch(b.dish, b.batch_id):
+                if not o.locked:
+                    self.orders.set(o, "locked", True)
+                    self.writes.set(o.mongo_id, {"locked": True})
+
+        # rows that kept their batch_id never moved, so recount the new batches
+        for b in self.batches:
+            self.batches.set_fill(b, self.orders.active_count(b.dish, b.batch_id))
+        self.auto_lock.rearm()
+
+        print("Batch rebuild finished.")
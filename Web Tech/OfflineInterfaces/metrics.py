@@ -0,0 +1,167 @@
+# -----------------------
+# OpenMetrics exporter for kitchen health
+# -----------------------
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from order_store import STATES
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+
+class MetricsExporter:
+    """
+    Kitchen health in OpenMetrics text format, served on localhost
+    (serve()) and/or written to a file (`path`).
+
+    update() collects from KitchenEngine on the thread that owns it (the Tk
+    thread) and keeps the rendered text; scrapes only ever read that text,
+    so the HTTP thread never touches the engine. Every value comes from a
+    counter or index the engine already maintains; nothing walks the
+    orders.
+
+    The app reports its sync ticks through sync_finished(); UI refresh
+    and other latencies come from a perf.Perf (p50/p99 per path).
+    """
+
+    def __init__(self, kitchen, perf=None, path=None):
+        self.kitchen = kitchen
+        self.perf = perf
+        self.path = path
+        self.sync_duration = None
+        self.sync_errors = 0
+        self._last_sync = None   # monotonic time of the last finished sync tick
+        self._started = time.monotonic()
+        self._text = self.collect()
+        self._server = None
+
+    def sync_finished(self, duration, ok=True):
+        """One sync tick (fetch + apply) took `duration` seconds."""
+        self.sync_duration = duration
+        if ok:
+            self._last_sync = time.monotonic()
+        else:
+            self.sync_errors += 1
+
+    # -------------------------------------------------
+    # Collection (owner thread)
+    # -------------------------------------------------
+    def update(self):
+        self._text = self.collect()
+        if self.path:
+            tmp = self.path + ".tmp"
+            try:
+                with open(tmp, "w") as f:
+                    f.write(self._text)
+                os.replace(tmp, self.path)
+            except OSError as e:
+                print("Metrics file write failed:", e)
+
+    def collect(self):
+        km = self.kitchen
+        out = []
+
+        def metric(name, kind, help_text, samples):
+            # samples: (name suffix + labels, value); counters use the "_total" suffix
+            out.append(f"# TYPE {name} {kind}")
+            out.append(f"# HELP {name} {help_text}")
+            for tail, value in samples:
+                if value is None:
+                    continue
+                out.append(f"{name}{tail} {_number(value)}")
+
+        metric("kitchen_orders", "gauge", "Orders in the live set by state.",
+               [(f'{{state="{s}"}}', km.orders.count(s)) for s in STATES])
+        metric("kitchen_bill_queue_bills", "gauge", "Delivery bills waiting to be fed.",
+               [("", len(km.bill_queue))])
+        metric("kitchen_bill_queue_items", "gauge", "Delivery items waiting to be fed.",
+               [("", km.queued_items())])
+        head = km.bill_queue[0] if km.bill_queue else None
+        metric("kitchen_bill_queue_oldest_wait_seconds", "gauge",
+               "How long the bill at the head of the delivery queue has waited (0 if none).",
+               [("", head.wait(km.clock()) if head is not None else 0.0)])
+        waits = sorted(wait for _, wait in km.feed_waits)
+        metric("kitchen_bill_feed_wait_seconds", "gauge",
+               "Queue wait of recently fed delivery bills (queued until last item fed).",
+               [(f'{{quantile="0.{q}"}}', waits[min(len(waits) - 1, len(waits) * q // 100)] if waits else None)
+                for q in (50, 99)])
+        metric("kitchen_batches", "gauge", "Batch records held in memory.",
+               [("", len(km.batches))])
+
+        oldest = km.batches.oldest_open()
+        age = max(0.0, km.clock() - oldest.timestamp) if oldest is not None and oldest.timestamp else 0.0
+        metric("kitchen_oldest_unlocked_batch_age_seconds", "gauge",
+               "Age of the oldest unlocked batch with active orders (0 if none).", [("", age)])
+
+        metric("kitchen_sync_duration_seconds", "gauge",
+               "Duration of the last storage sync tick (fetch + apply).", [("", self.sync_duration)])
+        since = self._last_sync if self._last_sync is not None else self._started
+        metric("kitchen_sync_lag_seconds", "gauge",
+               "Seconds since the last successful storage sync tick.", [("", time.monotonic() - since)])
+        metric("kitchen_sync_errors", "counter", "Failed storage sync ticks.",
+               [("_total", self.sync_errors)])
+
+        writes = km.writes
+        metric("kitchen_write_failures", "counter", "Order writes rejected by storage.",
+               [("_total", writes.failed_total)])
+        metric("kitchen_write_flushes", "counter", "Write flushes sent to storage.",
+               [("_total", writes.round_trips)])
+        metric("kitchen_writes_pending", "gauge", "Writes queued for the next flush.",
+               [("", len(writes))])
+
+        if self.perf is not None:
+            samples = []
+            for path, h in sorted(self.perf.stats().items()):
+                for q in (50, 99):
+                    samples.append((f'{{path="{path}",quantile="0.{q}"}}', h.percentile(q)))
+            metric("kitchen_latency_seconds", "gauge",
+                   "Recent latency per hot path (UI refresh, engine calls, storage jobs, frame time).",
+                   samples)
+
+        out.append("# EOF")
+        return "\n".join(out) + "\n"
+
+    # -------------------------------------------------
+    # HTTP (background thread)
+    # -------------------------------------------------
+    def serve(self, port, host="127.0.0.1"):
+        """Serve GET /metrics on host:port from a daemon thread. Returns False if the port is taken."""
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = exporter._text.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # scrapes every few seconds would flood the console
+
+        try:
+            self._server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as e:
+            print("Metrics endpoint unavailable:", e)
+            return False
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        print(f"Metrics at http://{host}:{port}/metrics")
+        return True
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return value
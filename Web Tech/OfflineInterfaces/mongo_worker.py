@@ -0,0 +1,134 @@
+# -----------------------
+# Background Mongo I/O worker
+# -----------------------
+import queue
+import threading
+import time
+
+
+class MongoWorker:
+    """
+    Dedicated thread that owns the MongoClient. Every database call runs here;
+    the Tk thread only enqueues jobs and receives results through drain(),
+    which it calls from an after() callback. A slow or unreachable Mongo can
+    therefore never freeze the dashboard.
+
+    Jobs are functions fn(db) -> result. Callbacks run on the thread that
+    calls drain() (the Tk thread), so they may touch KitchenEngine and widgets.
+
+    With db_name=None the client itself is passed as `db` (used to run a
+    SqliteStorage on the same thread: client_factory returns the storage).
+    """
+
+    def __init__(self, uri, db_name, client_factory=None):
+        self.uri = uri
+        self.db_name = db_name
+        self._client_factory = client_factory
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="mongo-io", daemon=True)
+        self.client = None
+        self.db = None
+        self.in_flight = 0
+
+    # -------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------
+    def start(self, timeout=5.0):
+        """Start the thread and wait until it has created its client."""
+        self._thread.start()
+        self._ready.wait(timeout)
+        return self
+
+    def stop(self):
+        self._jobs.put(None)
+
+    def _connect(self):
+        if self._client_factory is not None:
+            return self._client_factory(self.uri)
+        from pymongo import MongoClient
+        # short selection timeout: an unreachable server fails a job quickly
+        return MongoClient(self.uri, serverSelectionTimeoutMS=3000)
+
+    def _run(self):
+        try:
+            self.client = self._connect()
+            self.db = self.client[self.db_name] if self.db_name is not None else self.client
+        except Exception as e:
+            print("Mongo client creation failed:", e)
+        finally:
+            self._ready.set()
+
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            fn, callback, errback, post = job
+            try:
+                result = fn(self.db)
+            except Exception as e:
+                if post:
+                    self._results.put((errback, e, True))
+            else:
+                if post:
+                    self._results.put((callback, result, False))
+
+        if self.client is not None:
+            self.client.close()
+
+    # -------------------------------------------------
+    # Jobs
+    # -------------------------------------------------
+    def submit(self, fn, callback=None, errback=None):
+        """Queue fn(db) on the worker; callback(result) / errback(exc) run in drain()."""
+        self.in_flight += 1
+        self._jobs.put((fn, callback, errback, True))
+
+    def call(self, fn, timeout=None):
+        """
+        Run fn(db) on the worker and wait for the result. Only for startup
+        before the UI exists — never from a Tk callback.
+        """
+        done = threading.Event()
+        box = {}
+
+        def job(db):
+            try:
+                box["result"] = fn(db)
+            except Exception as e:
+                box["error"] = e
+            finally:
+                done.set()
+
+        self._jobs.put((job, None, None, False))
+        if not done.wait(timeout):
+            raise TimeoutError("Mongo worker call timed out")
+        if "error" in box:
+            raise box["error"]
+        return box.get("result")
+
+    def drain(self, budget=0.008):
+        """
+        Run queued callbacks on the calling (Tk) thread, stopping once
+        `budget` seconds are used so one frame never blocks for long.
+        Returns how many callbacks ran.
+        """
+        deadline = time.perf_counter() + budget
+        ran = 0
+        while time.perf_counter() < deadline:
+            try:
+                handler, value, failed = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self.in_flight -= 1
+            ran += 1
+            if handler is None:
+                if failed:
+                    print("Mongo job failed:", value)
+                continue
+            try:
+                handler(value)
+            except Exception as e:
+                print("Mongo callback failed:", e)
+        return ran
@@ -0,0 +1,631 @@
+# -----------------------
+# Order / batch records and the indexed order store for KitchenEngine
+# -----------------------
+import bisect
+import heapq
+import sys
+
+STATES = ("pending", "locked", "ready", "completed")
+
+# fields that decide which (dish_code, batch_id) group an order is in
+BATCH_FIELDS = ("dish_code", "batch_id", "completed")
+# fields that move an order between a bill's outstanding / ready counts
+BILL_FIELDS = ("ready", "completed")
+
+
+def table_key(order_no):
+    """Sort key for dine-in order numbers: tables numerically, anything else last."""
+    try:
+        return (0, int(order_no), "")
+    except (TypeError, ValueError):
+        return (1, 0, str(order_no))
+
+
+class Interner:
+    """Two-way map between names and small int codes (a code never changes once handed out)."""
+
+    __slots__ = ("_codes", "_names")
+
+    def __init__(self, names=()):
+        self._codes = {}
+        self._names = []
+        for name in names:
+            self.code(name)
+
+    def code(self, name):
+        c = self._codes.get(name)
+        if c is None:
+            c = self._codes[name] = len(self._names)
+            self._names.append(name)
+        return c
+
+    def find(self, name):
+        """Code for name, or None if it was never interned (nothing can match it)."""
+        return self._codes.get(name)
+
+    def name(self, code):
+        return self._names[code]
+
+    def __len__(self):
+        return len(self._names)
+
+
+# dish names and order types are stored on records as small ints
+DISHES = Interner()
+ORDER_TYPES = Interner(("dine-in", "delivery"))
+DINE_IN = ORDER_TYPES.find("dine-in")
+
+
+class Order:
+    """
+    One order row. dish and order_type are kept as interned codes
+    (dish_code / type_code); the dish / order_type properties give the names.
+    seq is a local id handed out by OrderStore.add() (the journal's key for
+    orders that have no mongo _id yet).
+
+    Fields of a stored order MUST be changed through OrderStore.set() (or
+    the store's indexes go stale).
+    """
+
+    __slots__ = (
+        "dish_code", "order_no", "type_code", "remarks", "locked", "ready",
+        "batch_id", "timestamp", "completed", "mongo_id", "seq",
+    )
+
+    def __init__(self, dish, order_no, order_type, remarks="", locked=False,
+                 ready=False, batch_id=None, timestamp=0.0, completed=False, mongo_id=None,
+                 seq=None):
+        self.dish_code = DISHES.code(dish)
+        # a table / bill number repeats across its orders: share one string
+        self.order_no = sys.intern(order_no) if type(order_no) is str else order_no
+        self.type_code = ORDER_TYPES.code(order_type)
+        self.remarks = remarks
+        self.locked = locked
+        self.ready = ready
+        self.batch_id = batch_id
+        self.timestamp = timestamp
+        self.completed = completed
+        self.mongo_id = mongo_id
+        self.seq = seq
+
+    @property
+    def dish(self):
+        return DISHES.name(self.dish_code)
+
+    @property
+    def order_type(self):
+        return ORDER_TYPES.name(self.type_code)
+
+    @property
+    def is_dine_in(self):
+        return self.type_code == DINE_IN
+
+    @property
+    def state(self):
+        """Lifecycle state (completed > ready > locked > pending)."""
+        if self.completed:
+            return "completed"
+        if self.ready:
+            return "ready"
+        if self.locked:
+            return "locked"
+        return "pending"
+
+    def fields(self):
+        """Snapshot of every field, for change detection."""
+        return tuple(getattr(self, f) for f in Order.__slots__)
+
+    def __repr__(self):
+        return (f"Order({self.dish!r}, {self.order_no!r}, {self.order_type!r}, "
+                f"batch={self.batch_id!r}, {self.state})")
+
+
+class Batch:
+    """Batch metadata; count is the live number of active orders (kept by BatchRegistry)."""
+
+    __slots__ = ("dish_code", "batch_id", "locked", "timestamp", "count")
+
+    def __init__(self, dish_code, batch_id, locked, timestamp, count=0):
+        self.dish_code = dish_code
+        self.batch_id = batch_id
+        self.locked = locked
+        self.timestamp = timestamp
+        self.count = count
+
+    @property
+    def dish(self):
+        return DISHES.name(self.dish_code)
+
+    def __repr__(self):
+        return (f"Batch({self.dish!r}, {self.batch_id!r}, locked={self.locked}, "
+                f"count={self.count})")
+
+
+class OrderStore:
+    """
+    Holds every Order and keeps these indexes up to date:
+      - state (pending/locked/ready/completed) -> orders
+      - (dish_code, batch_id) -> active (not completed) orders
+      - str(order_number) -> orders
+      - mongo _id -> order
+
+    The state index doubles as the set of stored orders (every order is in
+    exactly one state). State sets are dicts keyed by the Order itself
+    (identity hash) for O(1) moves; the per-batch and per-order-number
+    groups are small, so they are plain lists in insertion order, which
+    costs far less memory than a dict per group.
+
+    on_fill_change(dish_code, batch_id, count) is called whenever the number
+    of active orders in a batch changes (add, re-batch, complete, delete).
+    on_complete(order) is called when a stored order becomes completed
+    (including orders that are added already completed).
+
+    Each order number (bill / table) also keeps counts of its outstanding
+    (not completed) and ready orders. A bill is ready when every
+    outstanding order is ready; ready bills are kept sorted (dine-in by
+    table number, delivery by bill) for ready_bills(), and
+    on_bill_ready(order_no, dine_in) fires once the last item flips, after
+    the mutation has finished.
+
+    If `log` is set, every mutation is reported to it as log("add", o),
+    log("set", o, field, value) or log("remove", o) (see journal.py).
+
+    `version` goes up on every mutation, so views can skip re-rendering
+    when nothing changed since they last looked.
+    """
+
+    def __init__(self, on_fill_change=None, on_complete=None, on_bill_ready=None):
+        self.on_fill_change = on_fill_change
+        self.on_complete = on_complete
+        self.on_bill_ready = on_bill_ready
+        self.log = None
+        self.version = 0
+        self.next_seq = 1
+        self._last = None
+        self._active_by_batch = {}
+        self._by_order_no = {}
+        self._by_mongo_id = {}
+        self._by_state = {s: {} for s in STATES}
+        self._bills = {}            # str(order_no) -> [outstanding, ready, dine_in]
+        self._ready_dine = []       # sorted (table_key, order_no)
+        self._ready_delivery = []   # sorted order_no
+        self._became_ready = []     # events waiting for the end of the mutation
+
+    # -------------------------------------------------
+    # Container protocol
+    # -------------------------------------------------
+    def __iter__(self):
+        return iter([o for rows in self._by_state.values() for o in rows])
+
+    def __len__(self):
+        return sum(len(rows) for rows in self._by_state.values())
+
+    def __contains__(self, o):
+        return o in self._by_state[o.state]
+
+    def last(self):
+        """Most recently added order (if still stored), or None."""
+        if self._last is not None and self._last in self:
+            return self._last
+        return None
+
+    # -------------------------------------------------
+    # Mutations
+    # -------------------------------------------------
+    def add(self, o):
+        if o in self:
+            return o
+        if o.seq is None:
+            o.seq = self.next_seq
+        self.next_seq = max(self.next_seq, o.seq + 1)
+        self._last = o
+        self.version += 1
+        self._index(o)
+        self._notify_fill(o)
+        if self.log is not None:
+            self.log("add", o)
+        if o.completed and self.on_complete is not None:
+            self.on_complete(o)
+        self._fire_bill_ready()
+        return o
+
+    # list-style alias so old call sites keep working
+    append = add
+
+    def remove(self, o):
+        if o not in self:
+            return False
+        self.version += 1
+        self._unindex(o)
+        self._notify_fill(o)
+        if self.log is not None:
+            self.log("remove", o)
+        # the orders left on the bill may all be ready now
+        self._fire_bill_ready()
+        return True
+
+    def set(self, o, field, value):
+        """Change one field of a stored order and move it between indexes."""
+        old = getattr(o, field)
+        if old == value and type(old) is type(value):
+            return
+        if o not in self:
+            setattr(o, field, value)
+            return
+        self.version += 1
+        before = (o.dish_code, o.batch_id, bool(o.completed))
+        state = o.state
+
+        # only the indexes keyed on `field` move (the groups are lists, so
+        # touching the others would cost a scan of e.g. a busy table's orders)
+        if field in BILL_FIELDS:
+            self._count_bill(o, -1)
+        if field in BATCH_FIELDS:
+            self._unindex_batch(o)
+        elif field == "order_no":
+            self._unindex_order_no(o)
+        elif field == "mongo_id":
+            self._unindex_mongo_id(o)
+        setattr(o, field, value)
+        if field in BILL_FIELDS:
+            self._count_bill(o, 1)
+        if field in BATCH_FIELDS:
+            self._index_batch(o)
+        elif field == "order_no":
+            self._index_order_no(o)
+        elif field == "mongo_id":
+            self._index_mongo_id(o)
+        if o.state != state:
+            del self._by_state[state][o]
+            self._by_state[o.state][o] = None
+
+        if self.log is not None:
+            self.log("set", o, field, value)
+
+        # only batch membership changes move the fill counters
+        if before != (o.dish_code, o.batch_id, bool(o.completed)):
+            self._notify_fill(o)
+            if (before[0], before[1]) != (o.dish_code, o.batch_id):
+                self._notify_fill_key(before[0], before[1])
+            if o.completed and not before[2] and self.on_complete is not None:
+                self.on_complete(o)
+        self._fire_bill_ready()
+
+    def remove_completed(self):
+        """Drop every completed order, returning how many were removed."""
+        done = list(self._by_state["completed"])
+        for o in done:
+            self.remove(o)
+        return len(done)
+
+    # -------------------------------------------------
+    # Lookups
+    # -------------------------------------------------
+    def active_in_batch(self, dish, batch_id):
+        """Not-completed orders of a batch (in insertion order)."""
+        return list(self._active_by_batch.get((DISHES.find(dish), batch_id), ()))
+
+    def active_count(self, dish, batch_id):
+        return len(self._active_by_batch.get((DISHES.find(dish), batch_id), ()))
+
+    def active_batches(self):
+        """Yield ((dish_code, batch_id), orders) for every batch that has active orders."""
+        for key, rows in self._active_by_batch.items():
+            yield key, list(rows)
+
+    def ready_bills(self):
+        """(dine-in order numbers by table, delivery order numbers) whose every outstanding order is ready."""
+        return [no for _, no in self._ready_dine], list(self._ready_delivery)
+
+    def is_bill_ready(self, order_no):
+        c = self._bills.get(str(order_no))
+        return c is not None and c[0] == c[1]
+
+    def for_order_no(self, order_no):
+        return list(self._by_order_no.get(str(order_no), ()))
+
+    def by_mongo_id(self, mongo_id):
+        return self._by_mongo_id.get(mongo_id)
+
+    def mongo_ids(self):
+        return self._by_mongo_id.keys()
+
+    def in_state(self, state):
+        return list(self._by_state[state])
+
+    def count(self, state):
+        return len(self._by_state[state])
+
+    # -------------------------------------------------
+    # Index maintenance
+    # -------------------------------------------------
+    def _notify_fill(self, o):
+        self._notify_fill_key(o.dish_code, o.batch_id)
+
+    def _notify_fill_key(self, dish_code, batch_id):
+        if self.on_fill_change is not None:
+            rows = self._active_by_batch.get((dish_code, batch_id), ())
+            self.on_fill_change(dish_code, batch_id, len(rows))
+
+    def _index(self, o):
+        self._index_batch(o)
+        self._index_order_no(o)
+        self._index_mongo_id(o)
+        self._by_state[o.state][o] = None
+
+    def _unindex(self, o):
+        self._unindex_batch(o)
+        self._unindex_order_no(o)
+        self._unindex_mongo_id(o)
+        self._by_state[o.state].pop(o, None)
+
+    def _index_batch(self, o):
+        if not o.completed:
+            self._active_by_batch.setdefault((o.dish_code, o.batch_id), []).append(o)
+
+    def _unindex_batch(self, o):
+        batch_key = (o.dish_code, o.batch_id)
+        rows = self._active_by_batch.get(batch_key)
+        if rows is not None and not o.completed:
+            rows.remove(o)
+            if not rows:
+                del self._active_by_batch[batch_key]
+
+    def _index_order_no(self, o):
+        self._by_order_no.setdefault(str(o.order_no), []).append(o)
+        self._count_bill(o, 1)
+
+    def _unindex_order_no(self, o):
+        self._count_bill(o, -1)
+        order_key = str(o.order_no)
+        rows = self._by_order_no.get(order_key)
+        if rows is not None:
+            rows.remove(o)
+            if not rows:
+                del self._by_order_no[order_key]
+
+    def _count_bill(self, o, sign):
+        """Add (sign=1) or take back (sign=-1) o's share of its bill's counts."""
+        if o.completed:
+            return
+        key = str(o.order_no)
+        c = self._bills.get(key)
+        if c is None:
+            c = self._bills[key] = [0, 0, o.is_dine_in]
+        was_ready = c[0] > 0 and c[0] == c[1]
+        c[0] += sign
+        if o.ready:
+            c[1] += sign
+        if not c[0]:
+            del self._bills[key]
+        is_ready = c[0] > 0 and c[0] == c[1]
+        if is_ready == was_ready:
+            return
+
+        dine_in = c[2]
+        if dine_in:
+            ready, entry = self._ready_dine, (table_key(key), key)
+        else:
+            ready, entry = self._ready_delivery, key
+        if is_ready:
+            bisect.insort(ready, entry)
+            self._became_ready.append((key, dine_in))
+        else:
+            i = bisect.bisect_left(ready, entry)
+            if i < len(ready) and ready[i] == entry:
+                del ready[i]
+
+    def _fire_bill_ready(self):
+        if not self._became_ready:
+            return
+        events, self._became_ready = self._became_ready, []
+        for key, dine_in in events:
+            # only bills still ready once the whole mutation is done
+            if self.on_bill_ready is not None and self.is_bill_ready(key):
+                self.on_bill_ready(key, dine_in)
+
+    def _index_mongo_id(self, o):
+        if o.mongo_id:
+            self._by_mongo_id[o.mongo_id] = o
+
+    def _unindex_mongo_id(self, o):
+        if o.mongo_id and self._by_mongo_id.get(o.mongo_id) is o:
+            del self._by_mongo_id[o.mongo_id]
+
+
+class BatchRegistry:
+    """
+    Batch records keyed by batch_id, plus per-dish lists of open (unlocked)
+    batches in creation order.
+
+    Batch.count is the live number of active orders in the batch (fed by
+    OrderStore through fill_changed()). Use set_locked() to change the lock
+    flag so the open lists stay current.
+
+    Each dish also has a heap of candidate batches (open and possibly not
+    full) ordered by creation; its top is the dish's current batch, so
+    picking a batch for a new order does not walk older batches.
+
+    Batches holding active orders are also kept in an open and a locked
+    index, so open_with_orders() / locked_with_orders() cost O(result);
+    the open ones are also in a heap by (timestamp, creation) for
+    oldest_open(), whose stale entries are dropped lazily.
+
+    `version` goes up whenever a batch is added, (un)locked, refilled or
+    re-timed (set_timestamp()). If `log` is set it gets log("batch_add", b),
+    log("batch_lock", b), log("batch_time", b) and log("batch_clear"); fill
+    counts are derived from the orders and never logged.
+    """
+
+    def __init__(self):
+        self.log = None
+        self.version = 0
+        self._by_id = {}
+        self._open_by_dish = {}  # dish_code -> {batch_id: batch}
+        self._seq = {}          # batch_id -> creation sequence number
+        self._next_seq = 0
+        self._candidates = {}   # dish_code -> heap of (seq, batch_id)
+        self._queued = set()    # batch_ids currently in a candidate heap
+        self._open_filled = {}    # batch_id -> unlocked batch with active orders
+        self._locked_filled = {}  # batch_id -> locked batch with active orders
+        self._by_age = []         # heap of (timestamp, seq, batch_id) of open batches with orders
+        self._aged = {}           # batch_id -> (timestamp, seq) of its entry in _by_age
+
+    def __iter__(self):
+        return iter(list(self._by_id.values()))
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def get(self, batch_id, dish=None):
+        """Return the batch for batch_id (optionally checking its dish), or None."""
+        b = self._by_id.get(batch_id)
+        if b is None or (dish is not None and b.dish_code != DISHES.find(dish)):
+            return None
+        return b
+
+    def add(self, dish, batch_id, locked, timestamp, count=0):
+        self.version += 1
+        b = Batch(DISHES.code(dish), batch_id, bool(locked), timestamp, count)
+        self._by_id[batch_id] = b
+        self._next_seq += 1
+        self._seq[batch_id] = self._next_seq
+        self._queued.discard(batch_id)
+        self._aged.pop(batch_id, None)
+        if not b.locked:
+            self._open_by_dish.setdefault(b.dish_code, {})[batch_id] = b
+            self._push_candidate(b)
+        self._refile(b)
+        if self.log is not None:
+            self.log("batch_add", b)
+        return b
+
+    def set_locked(self, b, locked=True):
+        self.version += 1
+        b.locked = bool(locked)
+        open_batches = self._open_by_dish.setdefault(b.dish_code, {})
+        if b.locked:
+            open_batches.pop(b.batch_id, None)
+        else:
+            open_batches[b.batch_id] = b
+            self._push_candidate(b)
+        self._refile(b)
+        if self.log is not None:
+            self.log("batch_lock", b)
+
+    def set_fill(self, b, count):
+        if b.count != count:
+            self.version += 1
+        b.count = count
+        self._refile(b)
+
+    def set_timestamp(self, b, timestamp):
+        self.version += 1
+        b.timestamp = timestamp
+        if self._open_filled.get(b.batch_id) is b:
+            self._push_age(b)
+        if self.log is not None:
+            self.log("batch_time", b)
+
+    def fill_changed(self, dish_code, batch_id, count):
+        """OrderStore callback: keep the batch's live count in step."""
+        b = self._by_id.get(batch_id)
+        if b is None or b.dish_code != dish_code:
+            return
+        shrank = count < b.count
+        if count != b.count:
+            self.version += 1
+        filled = b.count > 0
+        b.count = count
+        if filled != (count > 0):
+            self._refile(b)
+        if shrank and not b.locked:
+            # may have room again (completion, deletion, re-batch)
+            self._push_candidate(b)
+
+    def available(self, dish, max_size):
+        """
+        Oldest open batch for dish holding fewer than max_size active orders,
+        or None. Entries that turned locked or full are dropped lazily.
+        """
+        dish_code = DISHES.find(dish)
+        heap = self._candidates.get(dish_code)
+        while heap:
+            seq, batch_id = heap[0]
+            b = self._by_id.get(batch_id)
+            if (
+                b is not None and b.dish_code == dish_code and not b.locked
+                and self._seq.get(batch_id) == seq and b.count < max_size
+            ):
+                return b
+            heapq.heappop(heap)
+            self._queued.discard(batch_id)
+        return None
+
+    def open_batches(self, dish):
+        """Unlocked batches for dish, oldest first."""
+        return list(self._open_by_dish.get(DISHES.find(dish), {}).values())
+
+    def open_with_orders(self):
+        """Unlocked batches that hold active orders, every dish."""
+        return list(self._open_filled.values())
+
+    def locked_with_orders(self):
+        """Locked batches that still hold active orders, every dish."""
+        return list(self._locked_filled.values())
+
+    def oldest_open(self):
+        """Unlocked batch with active orders and the earliest timestamp, or None."""
+        heap = self._by_age
+        while heap:
+            timestamp, seq, batch_id = heap[0]
+            b = self._open_filled.get(batch_id)
+            if b is not None and self._seq.get(batch_id) == seq and (b.timestamp or 0) == timestamp:
+                return b
+            heapq.heappop(heap)
+            if self._aged.get(batch_id) == (timestamp, seq):
+                del self._aged[batch_id]
+        return None
+
+    def clear(self):
+        self.version += 1
+        self._by_id.clear()
+        self._open_by_dish.clear()
+        self._seq.clear()
+        self._candidates.clear()
+        self._queued.clear()
+        self._open_filled.clear()
+        self._locked_filled.clear()
+        self._by_age.clear()
+        self._aged.clear()
+        if self.log is not None:
+            self.log("batch_clear")
+
+    def _refile(self, b):
+        """Put b in the with-orders index matching its lock state (or in neither)."""
+        batch_id = b.batch_id
+        if b.count > 0 and self._by_id.get(batch_id) is b:
+            if b.locked:
+                self._locked_filled[batch_id] = b
+                self._open_filled.pop(batch_id, None)
+            else:
+                self._open_filled[batch_id] = b
+                self._locked_filled.pop(batch_id, None)
+                self._push_age(b)
+        elif self._open_filled.get(batch_id) is b or self._locked_filled.get(batch_id) is b:
+            self._open_filled.pop(batch_id, None)
+            self._locked_filled.pop(batch_id, None)
+
+    def _push_age(self, b):
+        entry = (b.timestamp or 0, self._seq[b.batch_id])
+        if self._aged.get(b.batch_id) == entry:
+            # its entry is still in the heap (and valid again)
+            return
+        self._aged[b.batch_id] = entry
+        heapq.heappush(self._by_age, entry + (b.batch_id,))
+
+    def _push_candidate(self, b):
+        if b.batch_id in self._queued:
+            return
+        self._queued.add(b.batch_id)
+        heapq.heappush(self._candidates.setdefault(b.dish_code, []), (self._seq[b.batch_id], b.batch_id))
@@ -0,0 +1,296 @@
+# -----------------------
+# Incremental MongoDB -> KitchenEngine sync
+# -----------------------
+import time
+
+# server error codes meaning "change streams are not supported here"
+# (40573: standalone server, not a replica set; 40324: unknown $changeStream stage)
+UNSUPPORTED_CODES = {40573, 40324}
+
+# every writer stamps this field so pollers can ask "what changed since X"
+UPDATED_AT = "updated_at"
+
+# only the fields KitchenEngine reads from an order document
+ORDER_PROJECTION = {
+    "dish": 1, "order_number": 1, "bill_number": 1, "order_type": 1,
+    "remarks": 1, "locked": 1, "ready": 1, "batch_id": 1,
+    "timestamp": 1, "completed": 1, UPDATED_AT: 1,
+}
+
+
+def stamp(fields):
+    """Return a $set payload with the updated_at stamp added (use for EVERY order write)."""
+    out = dict(fields)
+    out[UPDATED_AT] = time.time()
+    return out
+
+
+class ChangeFeed:
+    """
+    Change stream over one collection that remembers its resume token, so a
+    dropped connection picks up exactly where it left off.
+
+    changes() returns a (possibly empty) list of change events, or None once
+    the server turned out not to support change streams (or the collection
+    has no watch(), like SqliteCollection or mongomock) — callers then fall back to
+    polling. Any other open error is logged and retried next tick.
+    """
+
+    def __init__(self, collection, full_document="updateLookup", max_await_ms=50):
+        self.collection = collection
+        self.full_document = full_document
+        self.max_await_ms = max_await_ms
+        self.resume_token = None
+        self.supported = True
+        self._stream = None
+
+    def open(self):
+        """Start watching now (so nothing between startup load and first poll is missed)."""
+        if not self.supported or self._stream is not None:
+            return self.supported
+        # checked on the class: mongomock answers any attribute with a sub-collection
+        if not callable(getattr(type(self.collection), "watch", None)):
+            print("Change streams unavailable, falling back to polling:",
+                  type(self.collection).__name__, "has no watch()")
+            self.supported = False
+            return False
+        try:
+            self._stream = self.collection.watch(
+                resume_after=self.resume_token,
+                full_document=self.full_document,
+                max_await_time_ms=self.max_await_ms,
+            )
+        except Exception as e:
+            if self._is_unsupported(e):
+                print("Change streams unavailable, falling back to polling:", e)
+                self.supported = False
+            else:
+                print("Change stream open failed:", e)
+        return self.supported
+
+    def changes(self, max_events=500):
+        if not self.open():
+            return None
+        if self._stream is None:
+            # transient open failure, retry next tick
+            return []
+
+        events = []
+        try:
+            while len(events) < max_events:
+                change = self._stream.try_next()
+                if change is None:
+                    break
+                events.append(change)
+                self.resume_token = self._stream.resume_token
+        except Exception as e:
+            # transient (network, failover): reopen from the resume token next tick
+            print("Change stream interrupted:", e)
+            self.close()
+        return events
+
+    def close(self):
+        if self._stream is not None:
+            try:
+                self._stream.close()
+            except Exception:
+                pass
+        self._stream = None
+
+    @staticmethod
+    def _is_unsupported(e):
+        from pymongo.errors import PyMongoError
+
+        # OperationFailure carries the server code; anything else is transient or a bug
+        return isinstance(e, PyMongoError) and getattr(e, "code", None) in UNSUPPORTED_CODES
+
+
+# change stream events after which the stream cannot continue
+INVALIDATING = ("drop", "rename", "dropDatabase", "invalidate")
+
+
+class OrderSync:
+    """
+    Applies insert/update/delete deltas from the `order` collection to a
+    KitchenEngine, so steady-state cost follows what changed rather than the
+    collection size.
+
+    Uses a ChangeFeed when available. Otherwise falls back to delta polling:
+      - only documents whose `updated_at` is past the high-water mark
+        (minus a small overlap for clock skew / in-flight writes),
+      - fetched with ORDER_PROJECTION,
+      - deletions found by a cheap `_id`-only reconcile every
+        `reconcile_every` seconds instead of a full diff each tick; the
+        same scan finds documents written without `updated_at` (external
+        inserts, manual fixes), which the next fetch loads by `_id`.
+
+    Each tick is split in two: fetch() does all database I/O and may run on
+    the Mongo worker thread; apply() changes KitchenEngine and must run on
+    the thread that owns it. poll() does both in place.
+
+    Any pymongo-compatible collection works (a real server, mongomock or an
+    in-process fake).
+    """
+
+    def __init__(self, kitchen, collection, overlap=2.0, reconcile_every=30.0):
+        self.kitchen = kitchen
+        self.collection = collection
+        self.feed = ChangeFeed(collection)
+        self.high_water = None
+        self.overlap = overlap
+        self.reconcile_every = reconcile_every
+        self._last_reconcile = time.monotonic()
+        # ids the last reconcile found but memory does not know (set by apply)
+        self._unknown = set()
+
+    def start(self):
+        """Open the change stream, or prepare delta polling (I/O: worker thread)."""
+        if self.feed.open():
+            return
+        try:
+            # the delta query needs this index on large collections
+            self.collection.create_index(UPDATED_AT)
+        except Exception as e:
+            print("Could not create updated_at index:", e)
+        self.high_water = self._latest_stamp()
+
+    @property
+    def mode(self):
+        return "stream" if self.feed.supported else "poll"
+
+    def poll(self, max_events=500):
+        """Fetch and apply pending changes. Returns how many changes touched memory."""
+        return self.apply(self.fetch(max_events))
+
+    # -------------------------------------------------
+    # I/O half
+    # -------------------------------------------------
+    def fetch(self, max_events=500):
+        """Read what changed since the last fetch. Returns a delta for apply()."""
+        delta = {"events": [], "records": [], "ids": None, "full": None, "taken_at": None}
+
+        events = self.feed.changes(max_events)
+        if events is not None:
+            delta["events"] = events
+            if any(e.get("operationType") in INVALIDATING for e in events):
+                # stream is dead; a full resync rebuilds memory from scratch
+                self.feed.close()
+                self.feed.resume_token = None
+                delta["taken_at"] = time.monotonic()
+                delta["full"] = self._fetch_full()
+            return delta
+
+        delta["records"] = self._fetch_since()
+        unknown, self._unknown = self._unknown, set()
+        if unknown:
+            delta["records"].extend(self._fetch_by_id(unknown))
+        if time.monotonic() - self._last_reconcile >= self.reconcile_every:
+            delta["taken_at"] = time.monotonic()
+            delta["ids"] = self._fetch_ids()
+        return delta
+
+    def fetch_full(self):
+        """A delta that reconciles memory with the whole collection (e.g. after a warm start)."""
+        taken_at = time.monotonic()
+        return {"events": [], "records": [], "ids": None, "full": self._fetch_full(),
+                "taken_at": taken_at}
+
+    def _fetch_since(self):
+        records = []
+        try:
+            query = {}
+            if self.high_water is not None:
+                query = {UPDATED_AT: {"$gt": self.high_water - self.overlap}}
+            for rec in self.collection.find(query, ORDER_PROJECTION).sort(UPDATED_AT, 1):
+                value = rec.get(UPDATED_AT)
+                if isinstance(value, (int, float)):
+                    if self.high_water is None or value > self.high_water:
+                        self.high_water = value
+                records.append(rec)
+        except Exception as e:
+            print("Order poll failed:", e)
+        return records
+
+    def _fetch_by_id(self, ids):
+        """Documents by `_id` (the unstamped ones a reconcile found)."""
+        try:
+            return list(self.collection.find({"_id": {"$in": list(ids)}}, ORDER_PROJECTION))
+        except Exception as e:
+            print("Order fetch by id failed:", e)
+            # try again after the next reconcile
+            return []
+
+    def _fetch_ids(self):
+        """`_id`-only scan used to detect deletions."""
+        self._last_reconcile = time.monotonic()
+        try:
+            return {d["_id"] for d in self.collection.find({}, {"_id": 1})}
+        except Exception as e:
+            print("Order reconcile failed:", e)
+            return None
+
+    def _fetch_full(self):
+        self._last_reconcile = time.monotonic()
+        try:
+            return list(self.collection.find({}, ORDER_PROJECTION))
+        except Exception as e:
+            print("Order resync failed:", e)
+            return None
+
+    def _latest_stamp(self):
+        try:
+            for rec in self.collection.find({}, {UPDATED_AT: 1}).sort(UPDATED_AT, -1).limit(1):
+                value = rec.get(UPDATED_AT)
+                if isinstance(value, (int, float)):
+                    return value
+        except Exception as e:
+            print("Could not read updated_at high-water mark:", e)
+        return None
+
+    # -------------------------------------------------
+    # Engine half
+    # -------------------------------------------------
+    def apply(self, delta):
+        """Apply a fetched delta. Returns how many changes touched memory."""
+        changed = 0
+        for change in delta["events"]:
+            if self.apply_change(change):
+                changed += 1
+        for rec in delta["records"]:
+            # re-applying a doc from the overlap window is a no-op
+            if self.kitchen.apply_remote_insert(rec):
+                changed += 1
+        taken_at = delta.get("taken_at")
+        if delta["ids"] is not None:
+            changed += self.kitchen.drop_missing(delta["ids"], taken_at)
+            # loaded by the next fetch (written without updated_at, so polling missed them)
+            self._unknown = self.kitchen.unknown_ids(delta["ids"])
+        if delta["full"] is not None:
+            self.kitchen.sync_orders(delta["full"], taken_at)
+            changed += 1
+        return changed
+
+    def apply_change(self, change):
+        op = change.get("operationType")
+        doc_id = (change.get("documentKey") or {}).get("_id")
+
+        if op == "insert":
+            return self.kitchen.apply_remote_insert(change.get("fullDocument") or {})
+
+        if op == "update":
+            fields = (change.get("updateDescription") or {}).get("updatedFields") or {}
+            return self.kitchen.apply_remote_update(doc_id, fields)
+
+        if op == "replace":
+            doc = change.get("fullDocument")
+            if doc is None:
+                return False
+            if self.kitchen.orders.by_mongo_id(doc_id) is None:
+                return self.kitchen.apply_remote_insert(doc)
+            return self.kitchen.apply_remote_update(doc_id, doc)
+
+        if op == "delete":
+            return self.kitchen.apply_remote_delete(doc_id)
+
+        # INVALIDATING events are handled by fetch()
+        return False
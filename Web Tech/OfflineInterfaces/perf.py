@@ -0,0 +1,219 @@
+# -----------------------
+# Lightweight latency histograms for the dashboard's hot paths
+# -----------------------
+import functools
+import time
+
+# log-linear buckets: 2**SUB_BITS linear steps, then HALF buckets per power
+# of two, i.e. about 3% relative error over any range (HDR histogram style)
+SUB_BITS = 5
+SUB = 1 << SUB_BITS
+HALF = SUB // 2
+
+
+def _bucket(us):
+    if us < SUB:
+        return us
+    shift = us.bit_length() - SUB_BITS
+    return shift * HALF + (us >> shift)
+
+
+def _bucket_range(index):
+    """(lowest, highest) microsecond value that falls into bucket `index`."""
+    if index < SUB:
+        return index, index
+    shift = index // HALF - 1
+    low = (index - shift * HALF) << shift
+    return low, low + (1 << shift) - 1
+
+
+class Histogram:
+    """
+    Latency histogram over microseconds with constant relative precision.
+    record() is a couple of integer ops, so it can sit on every call.
+    """
+
+    def __init__(self):
+        self.counts = []
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, seconds):
+        us = int(seconds * 1e6)
+        if us < 0:
+            us = 0
+        i = _bucket(us)
+        counts = self.counts
+        if i >= len(counts):
+            counts.extend([0] * (i + 1 - len(counts)))
+        counts[i] += 1
+        self.count += 1
+        self.total += us
+        if us > self.max:
+            self.max = us
+
+    def merge(self, other):
+        if len(other.counts) > len(self.counts):
+            self.counts.extend([0] * (len(other.counts) - len(self.counts)))
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        return self
+
+    def percentile(self, p):
+        """Value (seconds) below which p percent of the recordings fall."""
+        if not self.count:
+            return None
+        rank = max(1, int(round(p / 100.0 * self.count)))
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                low, high = _bucket_range(i)
+                return min((low + high) / 2.0, self.max) / 1e6
+        return self.max / 1e6
+
+    @property
+    def mean(self):
+        return self.total / self.count / 1e6 if self.count else None
+
+
+class Perf:
+    """
+    Named histograms over a sliding window: every `window` seconds the
+    current histograms become the previous ones, and stats() reports
+    both together (so the numbers follow what the dashboard does now).
+
+    time(name) is a context manager; wrap(obj, names, prefix) replaces
+    methods on one instance with timed versions. Nothing is recorded while
+    `enabled` is False (the wrappers then cost one attribute check).
+    """
+
+    def __init__(self, window=10.0, enabled=True):
+        self.window = window
+        self.enabled = enabled
+        self.current = {}
+        self.previous = {}
+        self._rotated_at = time.monotonic()
+        self._last_frame = None
+
+    def record(self, name, seconds):
+        if not self.enabled:
+            return
+        h = self.current.get(name)
+        if h is None:
+            h = self.current[name] = Histogram()
+        h.record(seconds)
+
+    def time(self, name):
+        return _Timer(self, name)
+
+    def wrap(self, obj, names, prefix=""):
+        """Time obj.<name>() for each name under '<prefix><name>' (instance-level patch)."""
+        for name in names:
+            method = getattr(obj, name, None)
+            if method is None:
+                continue
+            setattr(obj, name, self._timed(method, prefix + name))
+
+    def _timed(self, fn, name):
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            if not self.enabled:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - t0)
+        return timed
+
+    def frame(self):
+        """Call once per UI frame: records the time since the previous call."""
+        now = time.perf_counter()
+        if self._last_frame is not None:
+            self.record("frame", now - self._last_frame)
+        self._last_frame = now
+
+    def maybe_rotate(self):
+        now = time.monotonic()
+        if now - self._rotated_at >= self.window:
+            self.previous, self.current = self.current, {}
+            self._rotated_at = now
+
+    def stats(self):
+        """{name: Histogram} over the previous and the current window."""
+        merged = {}
+        for source in (self.previous, self.current):
+            for name, h in source.items():
+                merged.setdefault(name, Histogram()).merge(h)
+        return merged
+
+    def instrument_worker(self, io):
+        """
+        Time MongoWorker jobs: 'mongo job' is the time on the worker,
+        'mongo round trip' adds the queueing before and after. Both are
+        recorded when the result is drained on the Tk thread.
+        """
+        submit = io.submit
+
+        def timed_submit(fn, callback=None, errback=None):
+            if not self.enabled:
+                return submit(fn, callback, errback)
+            submitted = time.perf_counter()
+            box = {}
+
+            def job(db):
+                t0 = time.perf_counter()
+                try:
+                    return fn(db)
+                finally:
+                    box["run"] = time.perf_counter() - t0
+
+            def finish():
+                if "run" in box:
+                    self.record("mongo job", box["run"])
+                self.record("mongo round trip", time.perf_counter() - submitted)
+
+            def on_result(result):
+                finish()
+                if callback is not None:
+                    callback(result)
+
+            def on_error(e):
+                finish()
+                if errback is not None:
+                    errback(e)
+                else:
+                    print("Mongo job failed:", e)
+
+            return submit(job, on_result, on_error)
+
+        io.submit = timed_submit
+
+
+class _Timer:
+    def __init__(self, perf, name):
+        self.perf = perf
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.perf.record(self.name, time.perf_counter() - self.t0)
+        return False
+
+
+def format_stats(stats, limit=14):
+    """Overlay text: one line per path, slowest p99 first."""
+    lines = [f"{'path':<30}{'n':>7}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}"]
+    rows = sorted(stats.items(), key=lambda kv: kv[1].percentile(99) or 0, reverse=True)
+    for name, h in rows[:limit]:
+        lines.append(f"{name[:29]:<30}{h.count:>7}{h.percentile(50) * 1000:>9.2f}"
+                     f"{h.percentile(99) * 1000:>9.2f}{h.max / 1000:>9.2f}")
+    return "\n".join(lines)
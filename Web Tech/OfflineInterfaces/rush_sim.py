@@ -0,0 +1,435 @@
+# -----------------------
+# Rush-hour simulator: drives a KitchenEngine on a simulated clock
+# -----------------------
+import argparse
+from collections import deque
+import heapq
+import json
+import random
+import sys
+import time
+
+from auto_lock import AutoLockRule
+from delivery_feed import FEED_POLICIES, make_policy
+from kitchen_engine import KitchenEngine
+
+# share of each dish in the orders (weights, need not sum to 1)
+DEFAULT_MENU_MIX = {
+    "Margherita Pizza": 0.22, "Caesar Salad": 0.12, "Tomato Soup": 0.10,
+    "Grilled Chicken": 0.14, "Spaghetti Bolognese": 0.16, "Fish and Chips": 0.10,
+    "Beef Burger": 0.11, "Pad Thai": 0.05,
+}
+DEFAULT_LIMITS = {
+    "Margherita Pizza": 4, "Tomato Soup": 8, "Beef Burger": 6, "Pad Thai": 3,
+    "Spaghetti Bolognese": 5, "Grilled Chicken": 4,
+}
+# mean cooking time per batch, in seconds (other dishes use DEFAULT_COOK_TIME)
+DEFAULT_COOK_TIMES = {
+    "Margherita Pizza": 420, "Caesar Salad": 180, "Tomato Soup": 240,
+    "Grilled Chicken": 600, "Spaghetti Bolognese": 480, "Fish and Chips": 540,
+    "Beef Burger": 420, "Pad Thai": 360,
+}
+DEFAULT_COOK_TIME = 300
+
+
+class SimClock:
+    """Settable clock for KitchenEngine(clock=...): calling it returns the simulated now."""
+
+    def __init__(self, start=None):
+        self.now = time.time() if start is None else start
+
+    def __call__(self):
+        return self.now
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of an unsorted list (None if empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(p / 100.0 * len(ordered))) - 1))]
+
+
+class RushSimulator:
+    """
+    Discrete-event model of a service: guests and couriers arrive, the
+    chef locks and cooks batches, the pass hands finished tickets out. The
+    engine only ever sees the simulated clock, so hours of service run in
+    seconds.
+
+      - dine-in tickets and delivery bills arrive as Poisson processes
+        (`dine_in_rate` / `delivery_rate` per minute), each with
+        1..max_items dishes drawn from `menu_mix`
+      - dine-in items go straight in with add_order(); delivery bills go
+        into the bill queue and feed_kitchen() runs every `feed_interval`
+        seconds, like the dashboard does (`feed_rate` / `feed_burst` /
+        `whole_bills` / `feed_policy` configure the engine's feeder);
+        each bill is promised `promise` seconds (+/- a third) after it
+        arrives
+      - every `chef_interval` seconds the chef locks unlocked batches that
+        are full or older than `max_wait` (chef="max-wait"), or the ones
+        the engine's batch planner says to start now (chef="planner"),
+        while fewer than `stations` batches are cooking; with chef="auto"
+        the engine's auto-lock rules lock batches (when full, when fewer
+        than `auto_capacity` items are cooking, or `auto_max_age` seconds
+        old) and the chef cooks them in lock order as stations free up. A
+        batch is ready after its dish's cook time (+/- `cook_jitter`)
+      - every `pass_interval` seconds all ready tickets are completed
+
+    Writes are dropped each tick (storage cost is not part of the model;
+    see benchmarks/bench_sqlite_storage.py). `engine_cpu` only counts CPU
+    time spent inside KitchenEngine calls.
+    """
+
+    def __init__(self, dine_in_rate=1.5, delivery_rate=0.75, menu_mix=None,
+                 dish_limits=None, cook_times=None, max_items=4, max_wait=180,
+                 stations=10, cook_jitter=0.2, feed_interval=2.5, chef_interval=5.0,
+                 pass_interval=10.0, retention=300, feed_rate=None, feed_burst=None,
+                 whole_bills=False, feed_policy="fifo", promise=2400, chef="max-wait",
+                 auto_capacity=25, auto_max_age=600, seed=1, engine=None):
+        self.rnd = random.Random(seed)
+        self.clock = SimClock(start=1_700_000_000.0)
+        self.engine = engine or KitchenEngine(clock=self.clock, retention=retention)
+        self.engine.clock = self.clock
+        self.engine.dish_limits = dict(DEFAULT_LIMITS if dish_limits is None else dish_limits)
+        bucket = self.engine.feed_bucket
+        bucket.rate = bucket.rate if feed_rate is None else feed_rate
+        bucket.burst = bucket.tokens = bucket.burst if feed_burst is None else feed_burst
+        self.engine.feed_whole_bills = whole_bills
+        self.engine.feed_policy = make_policy(feed_policy)
+        self.promise = promise
+
+        mix = menu_mix or DEFAULT_MENU_MIX
+        self.dishes = list(mix)
+        self.weights = [mix[d] for d in self.dishes]
+        self.cook_times = dict(DEFAULT_COOK_TIMES if cook_times is None else cook_times)
+        self.engine.cook_times = dict(self.cook_times)
+        self.chef = chef
+        if chef == "auto":
+            self.engine.auto_lock.default = AutoLockRule(full=True, max_age=auto_max_age, on_capacity=True)
+            self.engine.auto_lock.capacity = auto_capacity
+            self.engine.auto_lock.rearm()
+        self.to_cook = deque()     # auto-locked (dish, batch_id) waiting for a station
+        self.dine_in_rate = dine_in_rate
+        self.delivery_rate = delivery_rate
+        self.max_items = max_items
+        self.max_wait = max_wait
+        self.stations = stations
+        self.cook_jitter = cook_jitter
+        self.feed_interval = feed_interval
+        self.chef_interval = chef_interval
+        self.pass_interval = pass_interval
+
+        self._events = []
+        self._seq = 0
+        self._ticket_no = 0
+        self.tickets = {}          # order_number -> (arrived_at, item count)
+        self.cooking = set()       # (dish, batch_id) on a station
+        self.engine_cpu = 0.0
+
+        self.ticket_times = []
+        self.delivery_times = []
+        self.late_deliveries = 0
+        self.promised = {}         # bill -> promised time
+        self.minutes = []
+        self._minute = self._new_minute()
+
+    # -------------------------------------------------
+    # Event queue
+    # -------------------------------------------------
+    def schedule(self, at, kind, *payload):
+        self._seq += 1
+        heapq.heappush(self._events, (at, self._seq, kind, payload))
+
+    def call(self, fn, *args):
+        """Run an engine method, charging its CPU time to the current minute."""
+        t0 = time.thread_time()
+        result = fn(*args)
+        spent = time.thread_time() - t0
+        self.engine_cpu += spent
+        self._minute["engine_cpu"] += spent
+        return result
+
+    def run(self, minutes, speed=None):
+        """
+        Simulate `minutes` of service. With speed=N the run is paced at N
+        times real time (e.g. to watch it); by default it runs flat out.
+        Returns the report (see report()).
+        """
+        start = self.clock.now
+        end = start + minutes * 60
+        wall_start = time.perf_counter()
+
+        if self.dine_in_rate > 0:
+            self.schedule(start + self._gap(self.dine_in_rate), "dine_in")
+        if self.delivery_rate > 0:
+            self.schedule(start + self._gap(self.delivery_rate), "delivery")
+        self.schedule(start + self.feed_interval, "feed")
+        self.schedule(start + self.chef_interval, "chef")
+        self.schedule(start + self.pass_interval, "pass")
+        self.schedule(start + 60, "minute")
+
+        while self._events and self._events[0][0] <= end:
+            at, _, kind, payload = heapq.heappop(self._events)
+            if speed:
+                delay = (at - start) / speed - (time.perf_counter() - wall_start)
+                if delay > 0:
+                    time.sleep(delay)
+            self.clock.now = at
+            getattr(self, "_on_" + kind)(*payload)
+
+        self.clock.now = end
+        return self.report(time.perf_counter() - wall_start)
+
+    def _gap(self, per_minute):
+        return self.rnd.expovariate(per_minute / 60.0)
+
+    def _items(self):
+        n = self.rnd.randint(1, self.max_items)
+        return self.rnd.choices(self.dishes, self.weights, k=n)
+
+    # -------------------------------------------------
+    # Events
+    # -------------------------------------------------
+    def _on_dine_in(self):
+        self._ticket_no += 1
+        table = self._ticket_no
+        items = self._items()
+        self.tickets[str(table)] = (self.clock.now, len(items))
+        for dish in items:
+            self.call(self.engine.add_order, dish, table)
+        self._minute["arrivals"] += 1
+        self.schedule(self.clock.now + self._gap(self.dine_in_rate), "dine_in")
+
+    def _on_delivery(self):
+        self._ticket_no += 1
+        bill = f"Bill:{self._ticket_no}"
+        items = self._items()
+        self.tickets[bill] = (self.clock.now, len(items))
+        promised = self.clock.now + self.promise * self.rnd.uniform(2 / 3.0, 4 / 3.0)
+        self.promised[bill] = promised
+        self.call(self.engine.add_bill_to_queue, bill, [[dish, ""] for dish in items], promised)
+        self._minute["arrivals"] += 1
+        self.schedule(self.clock.now + self._gap(self.delivery_rate), "delivery")
+
+    def _on_feed(self):
+        self.call(self.engine.feed_kitchen)
+        self.schedule(self.clock.now + self.feed_interval, "feed")
+
+    def _on_chef(self):
+        now = self.clock.now
+        if self.chef == "auto":
+            for dish, batch_id, _ in self.call(self.engine.run_auto_locks):
+                b = self.engine.batches.get(batch_id, dish)
+                self.to_cook.append((dish, batch_id, b.count, self.engine.get_limit(dish)))
+            while self.to_cook and len(self.cooking) < self.stations:
+                self._start(*self.to_cook.popleft())
+        elif self.chef == "planner":
+            free = self.stations - len(self.cooking)
+            if free > 0:
+                for s in self.call(self.engine.suggest_batches, free):
+                    self._start(s.dish, s.batch_id, s.count, s.limit)
+        elif len(self.cooking) < self.stations:
+            # oldest batches first
+            waiting = []
+            for dish, batch_id, orders in self.call(self.engine.get_unlocked_batches):
+                b = self.engine.batches.get(batch_id, dish)
+                created = b.timestamp if b is not None else now
+                limit = self.engine.get_limit(dish)
+                if len(orders) >= limit or now - created >= self.max_wait:
+                    waiting.append((created, dish, batch_id, len(orders), limit))
+            waiting.sort()
+            for created, dish, batch_id, count, limit in waiting:
+                if len(self.cooking) >= self.stations:
+                    break
+                self._start(dish, batch_id, count, limit)
+        self.schedule(now + self.chef_interval, "chef")
+
+    def _start(self, dish, batch_id, count, limit):
+        self.call(self.engine.lock_specific_batch, dish, batch_id)
+        self.cooking.add((dish, batch_id))
+        if limit < 10 ** 9:
+            self._minute["fill"].append(count / float(limit))
+        cook = self.cook_times.get(dish, DEFAULT_COOK_TIME)
+        cook *= 1 + self.rnd.uniform(-self.cook_jitter, self.cook_jitter)
+        self.schedule(self.clock.now + cook, "ready", dish, batch_id)
+
+    def _on_ready(self, dish, batch_id):
+        self.call(self.engine.confirm_batch_done, dish, batch_id)
+        self.cooking.discard((dish, batch_id))
+
+    def _on_pass(self):
+        now = self.clock.now
+        engine = self.engine
+        dine, delivery = self.call(engine.get_ready_bills)
+        for order_no in dine + delivery:
+            ticket = self.tickets.get(order_no)
+            # a delivery bill is only whole once every item was fed
+            if ticket is None or len(engine.orders.for_order_no(order_no)) < ticket[1]:
+                continue
+            self.call(engine.complete_bill, order_no)
+            del self.tickets[order_no]
+            self.ticket_times.append(now - ticket[0])
+            self._minute["ticket_times"].append(now - ticket[0])
+            promised = self.promised.pop(order_no, None)
+            if promised is not None:
+                self.delivery_times.append(now - ticket[0])
+                if now > promised:
+                    self.late_deliveries += 1
+        self.call(engine.evict_completed)
+        engine.writes.take()
+        self.schedule(now + self.pass_interval, "pass")
+
+    def _on_minute(self):
+        engine = self.engine
+        m = self._minute
+        m["minute"] = len(self.minutes) + 1
+        m["bill_queue_items"] = engine.queued_items()
+        m["pending_orders"] = engine.orders.count("pending")
+        m["cooking_batches"] = len(self.cooking)
+        m["open_tickets"] = len(self.tickets)
+        self.minutes.append(m)
+        self._minute = self._new_minute()
+        self.schedule(self.clock.now + 60, "minute")
+
+    @staticmethod
+    def _new_minute():
+        return {"arrivals": 0, "ticket_times": [], "fill": [], "engine_cpu": 0.0}
+
+    # -------------------------------------------------
+    # Report
+    # -------------------------------------------------
+    def report(self, wall_seconds):
+        rows = []
+        for m in self.minutes:
+            times, fill = m["ticket_times"], m["fill"]
+            rows.append({
+                "minute": m["minute"],
+                "arrivals": m["arrivals"],
+                "tickets_done": len(times),
+                "ticket_p50": percentile(times, 50),
+                "ticket_p90": percentile(times, 90),
+                "ticket_p99": percentile(times, 99),
+                "batch_fill": sum(fill) / len(fill) if fill else None,
+                "bill_queue_items": m["bill_queue_items"],
+                "pending_orders": m["pending_orders"],
+                "cooking_batches": m["cooking_batches"],
+                "open_tickets": m["open_tickets"],
+                "engine_cpu_ms": m["engine_cpu"] * 1000,
+            })
+        all_fill = [f for m in self.minutes for f in m["fill"]]
+        feed_waits = [wait for _, wait in self.engine.feed_waits]
+        simulated = len(self.minutes) * 60
+        return {
+            "simulated_minutes": len(self.minutes),
+            "wall_seconds": wall_seconds,
+            "speedup": simulated / wall_seconds if wall_seconds > 0 else None,
+            "tickets_done": len(self.ticket_times),
+            "open_tickets": len(self.tickets),
+            "ticket_p50": percentile(self.ticket_times, 50),
+            "ticket_p90": percentile(self.ticket_times, 90),
+            "ticket_p99": percentile(self.ticket_times, 99),
+            "batch_fill": sum(all_fill) / len(all_fill) if all_fill else None,
+            "max_pending_orders": max((r["pending_orders"] for r in rows), default=0),
+            "max_bill_queue_items": max((r["bill_queue_items"] for r in rows), default=0),
+            "delivery_p50": percentile(self.delivery_times, 50),
+            "delivery_p90": percentile(self.delivery_times, 90),
+            "late_deliveries": self.late_deliveries,
+            "feed_wait_p50": percentile(feed_waits, 50),
+            "feed_wait_p99": percentile(feed_waits, 99),
+            "engine_cpu_ms_per_minute": (self.engine_cpu * 1000 / len(rows)) if rows else 0.0,
+            "minutes": rows,
+        }
+
+
+def print_report(report, every=10):
+    def fmt(v, spec):
+        if v is None:
+            return format("-", ">" + spec.split(".")[0])
+        return format(v, spec)
+
+    print(f"{'min':>5} {'arr':>5} {'done':>5} {'p50 s':>7} {'p90 s':>7} {'fill':>6} "
+          f"{'queue':>6} {'pend':>6} {'cook':>5} {'cpu ms':>8}")
+    for r in report["minutes"]:
+        if r["minute"] % every and r["minute"] != report["simulated_minutes"]:
+            continue
+        print(f"{r['minute']:>5} {r['arrivals']:>5} {r['tickets_done']:>5} "
+              f"{fmt(r['ticket_p50'], '7.0f')} {fmt(r['ticket_p90'], '7.0f')} "
+              f"{fmt(r['batch_fill'], '6.2f')} {r['bill_queue_items']:>6} "
+              f"{r['pending_orders']:>6} {r['cooking_batches']:>5} {r['engine_cpu_ms']:>8.2f}")
+    print()
+    print(f"simulated {report['simulated_minutes']} min in {report['wall_seconds']:.2f} s "
+          f"(x{fmt(report['speedup'], '.0f')})")
+    print(f"tickets done {report['tickets_done']}, still open {report['open_tickets']}")
+    print(f"ticket time p50/p90/p99: {fmt(report['ticket_p50'], '.0f')} / "
+          f"{fmt(report['ticket_p90'], '.0f')} / {fmt(report['ticket_p99'], '.0f')} s")
+    print(f"mean batch fill at lock: {fmt(report['batch_fill'], '.2f')}")
+    print(f"delivery bill time p50/p90: {fmt(report['delivery_p50'], '.0f')} / "
+          f"{fmt(report['delivery_p90'], '.0f')} s, {report['late_deliveries']} late")
+    print(f"delivery queue wait p50/p99 (last {KitchenEngine.FEED_WAIT_HISTORY} bills): "
+          f"{fmt(report['feed_wait_p50'], '.0f')} / {fmt(report['feed_wait_p99'], '.0f')} s")
+    print(f"engine CPU: {report['engine_cpu_ms_per_minute']:.2f} ms per simulated minute")
+
+
+def print_policy_comparison(reports):
+    """One line per feed policy: batch fill, ticket and delivery bill times."""
+    def fmt(v, spec):
+        return format("-", ">" + spec.split(".")[0]) if v is None else format(v, spec)
+
+    print(f"{'policy':<13} {'fill':>6} {'ticket p50':>11} {'p90':>6} {'bill p50':>9} {'p90':>6} "
+          f"{'late':>5} {'wait p99':>9} {'queue max':>10}")
+    for name, r in reports.items():
+        print(f"{name:<13} {fmt(r['batch_fill'], '6.2f')} {fmt(r['ticket_p50'], '11.0f')} "
+              f"{fmt(r['ticket_p90'], '6.0f')} {fmt(r['delivery_p50'], '9.0f')} "
+              f"{fmt(r['delivery_p90'], '6.0f')} {r['late_deliveries']:>5} "
+              f"{fmt(r['feed_wait_p99'], '9.0f')} {r['max_bill_queue_items']:>10}")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Simulate a rush against KitchenEngine.")
+    parser.add_argument("--minutes", type=int, default=180)
+    parser.add_argument("--dine-in-rate", type=float, default=1.5, help="tickets per minute")
+    parser.add_argument("--delivery-rate", type=float, default=0.75, help="bills per minute")
+    parser.add_argument("--stations", type=int, default=10)
+    parser.add_argument("--max-wait", type=float, default=180, help="seconds before a partial batch is cooked")
+    parser.add_argument("--chef", choices=("max-wait", "planner", "auto"), default="max-wait",
+                        help="when a batch starts: the chef locks it when full or --max-wait old, "
+                             "follows the batch planner, or auto-lock rules lock it")
+    parser.add_argument("--feed-rate", type=float, help="delivery items admitted per second")
+    parser.add_argument("--feed-burst", type=int, help="delivery items a quiet kitchen takes at once")
+    parser.add_argument("--whole-bills", action="store_true", help="feed delivery bills whole")
+    parser.add_argument("--feed-policy", choices=list(FEED_POLICIES), default="fifo",
+                        help="order in which queued bills are fed")
+    parser.add_argument("--compare-feed-policies", action="store_true",
+                        help="run every feed policy on the same arrivals and compare them")
+    parser.add_argument("--limits", help='JSON dish limits, e.g. \'{"Margherita Pizza": 6}\'')
+    parser.add_argument("--mix", help="JSON menu mix (dish -> weight)")
+    parser.add_argument("--speed", type=float, help="pace at N x real time instead of flat out")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="write the full report to this file")
+    args = parser.parse_args(argv)
+
+    def simulator(policy):
+        return RushSimulator(
+            dine_in_rate=args.dine_in_rate, delivery_rate=args.delivery_rate,
+            menu_mix=json.loads(args.mix) if args.mix else None,
+            dish_limits=json.loads(args.limits) if args.limits else None,
+            max_wait=args.max_wait, stations=args.stations, seed=args.seed,
+            feed_rate=args.feed_rate, feed_burst=args.feed_burst, whole_bills=args.whole_bills,
+            feed_policy=policy, chef=args.chef,
+        )
+
+    if args.compare_feed_policies:
+        report = {name: simulator(name).run(args.minutes) for name in FEED_POLICIES}
+        print_policy_comparison(report)
+    else:
+        report = simulator(args.feed_policy).run(args.minutes, speed=args.speed)
+        print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,154 @@
+# -----------------------
+# One cooperative scheduler for the dashboard's periodic work
+# -----------------------
+import time
+
+
+class Task:
+    """
+    A periodic job. fn() returns True when it found work (the task speeds
+    up towards min_interval), False when it was idle (after `idle_after`
+    idle runs in a row the interval grows by `backoff` up to max_interval)
+    or None to leave the interval alone. Tasks without min/max run at a
+    fixed interval.
+    """
+
+    def __init__(self, name, fn, interval, min_interval=None, max_interval=None,
+                 idle_after=3, backoff=1.5):
+        self.name = name
+        self.fn = fn
+        self.base = interval
+        self.interval = interval
+        self.min_interval = interval if min_interval is None else min_interval
+        self.max_interval = interval if max_interval is None else max_interval
+        self.idle_after = idle_after
+        self.backoff = backoff
+        self.enabled = True
+        self.due = 0.0
+        self.idle_runs = 0
+        self.runs = 0
+        self.total = 0.0
+        self.last = 0.0
+
+    def report(self, busy):
+        """Adapt the interval to one run's outcome (see the class docstring)."""
+        if busy is None:
+            return
+        if busy:
+            self.idle_runs = 0
+            self.interval = max(self.min_interval, min(self.interval, self.base) * 0.5)
+        else:
+            self.idle_runs += 1
+            if self.idle_runs >= self.idle_after:
+                self.interval = min(self.max_interval, max(self.interval, self.base) * self.backoff)
+
+
+class Scheduler:
+    """
+    Runs every periodic task of the dashboard from a single after() chain:
+    each pass runs the tasks that are due, then at most one render, then
+    sleeps until the next task is due. Tasks call request_render() instead
+    of refreshing themselves, so several changes in one pass cost one
+    render.
+
+    Tasks keep their phase (next due = last due + interval) so they do not
+    drift against each other; a task that fell behind skips ahead instead
+    of running back to back.
+
+    `after(ms, fn)` is the Tk after(); `render()` redraws; `perf` (a
+    perf.Perf) gets a 'task <name>' histogram per task.
+    """
+
+    def __init__(self, after, render, clock=time.monotonic, perf=None):
+        self.after = after
+        self.render = render
+        self.clock = clock
+        self.perf = perf
+        self.tasks = {}
+        self.render_requested = False
+        self.renders = 0
+        self.render_time = 0.0
+        self._running = False
+
+    def add(self, name, fn, interval, **adaptive):
+        task = self.tasks[name] = Task(name, fn, interval, **adaptive)
+        task.due = self.clock() + interval
+        return task
+
+    def set_enabled(self, name, enabled=True):
+        task = self.tasks[name]
+        if enabled and not task.enabled:
+            task.due = self.clock()
+        task.enabled = enabled
+
+    def report(self, name, busy):
+        """Outcome of a task whose real work finished later (e.g. on the I/O worker)."""
+        self.tasks[name].report(busy)
+
+    def request_render(self):
+        self.render_requested = True
+
+    def start(self):
+        if not self._running:
+            self._running = True
+            self.after(0, self._pass)
+
+    # -------------------------------------------------
+    # Loop
+    # -------------------------------------------------
+    def _pass(self):
+        now = self.clock()
+        for task in list(self.tasks.values()):
+            if task.enabled and task.due <= now:
+                self._run(task)
+
+        if self.render_requested:
+            self.render_requested = False
+            t0 = time.perf_counter()
+            try:
+                self.render()
+            except Exception as e:
+                print("Render failed:", e)
+            self.renders += 1
+            self.render_time += time.perf_counter() - t0
+
+        upcoming = [t.due for t in self.tasks.values() if t.enabled]
+        delay = (min(upcoming) - self.clock()) if upcoming else 0.5
+        self.after(max(1, int(delay * 1000)), self._pass)
+
+    def _run(self, task):
+        t0 = time.perf_counter()
+        try:
+            busy = task.fn()
+        except Exception as e:
+            print(f"Task {task.name} failed:", e)
+            busy = None
+        spent = time.perf_counter() - t0
+        task.runs += 1
+        task.total += spent
+        task.last = spent
+        if self.perf is not None:
+            self.perf.record("task " + task.name, spent)
+        task.report(busy)
+
+        # judged after the run: a task that took longer than its interval
+        # must not come straight back on the next pass
+        now = self.clock()
+        task.due += task.interval
+        if task.due <= now:
+            task.due = now + task.interval
+
+    def stats(self):
+        """{task name: (runs, total seconds, current interval)} plus 'render'."""
+        out = {name: (t.runs, t.total, t.interval) for name, t in self.tasks.items()}
+        out["render"] = (self.renders, self.render_time, None)
+        return out
+
+
+def format_schedule(stats):
+    """Overlay text: runs, time used and current interval per task."""
+    lines = [f"{'task':<14}{'runs':>7}{'total ms':>10}{'every s':>9}"]
+    for name, (runs, total, interval) in sorted(stats.items(), key=lambda kv: kv[1][1], reverse=True):
+        every = f"{interval:>9.2f}" if interval is not None else f"{'-':>9}"
+        lines.append(f"{name[:13]:<14}{runs:>7}{total * 1000:>10.1f}{every}")
+    return "\n".join(lines)
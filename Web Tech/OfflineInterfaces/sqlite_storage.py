@@ -0,0 +1,321 @@
+# -----------------------
+# SQLite storage backend (no database server needed)
+# -----------------------
+import json
+import sqlite3
+import threading
+import uuid
+
+from order_sync import stamp, UPDATED_AT
+from storage import ORDER_COLLECTION, LIMIT_COLLECTION, MENU_COLLECTION, HISTORY_COLLECTION
+
+# collection name -> (table, typed columns, boolean columns).
+# Every table also has `_id TEXT PRIMARY KEY` and an `extra` JSON column
+# for fields without a column of their own.
+TABLES = {
+    ORDER_COLLECTION: ("orders", (
+        ("dish", "TEXT"), ("order_number", ""), ("bill_number", ""),
+        ("order_type", "TEXT"), ("remarks", "TEXT"), ("locked", "INTEGER"),
+        ("ready", "INTEGER"), ("batch_id", ""), ("timestamp", "REAL"),
+        ("completed", "INTEGER"), (UPDATED_AT, "REAL"),
+    ), ("locked", "ready", "completed")),
+    HISTORY_COLLECTION: ("order_history", (
+        ("dish", "TEXT"), ("order_number", ""), ("order_type", "TEXT"),
+        ("remarks", "TEXT"), ("locked", "INTEGER"), ("ready", "INTEGER"),
+        ("batch_id", ""), ("timestamp", "REAL"), ("completed", "INTEGER"),
+        ("archived_at", "REAL"), (UPDATED_AT, "REAL"),
+    ), ("locked", "ready", "completed")),
+    LIMIT_COLLECTION: ("dish_limits", (
+        ("dish", "TEXT"), ("maximum_number_of_dishes_per_batch", ""),
+    ), ()),
+    MENU_COLLECTION: ("menu", (
+        ("dish", "TEXT"), ("available", "INTEGER"),
+    ), ("available",)),
+}
+
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS orders_updated_at ON orders (updated_at)",
+    "CREATE INDEX IF NOT EXISTS orders_dish_batch ON orders (dish, batch_id)",
+    "CREATE INDEX IF NOT EXISTS order_history_archived_at ON order_history (archived_at)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS dish_limits_dish ON dish_limits (dish)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS menu_dish ON menu (dish)",
+)
+
+OPERATORS = {"$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+
+class SqliteStorage:
+    """
+    KitchenEngine storage in one local SQLite file (WAL mode), with the same
+    interface as MongoStorage: load_*(), new_id() and write(batch), where a
+    WriteBuffer batch is applied in a single transaction.
+
+    .orders / .limits / .menu / .history (and storage[collection_name])
+    are SqliteCollection objects that answer the small part of the pymongo
+    collection API that OrderSync, ChangeFeed and the dashboard use, so the
+    app runs unchanged on top of it. There are no change streams: the
+    dashboard falls back to updated_at polling, which is an indexed range
+    scan here.
+
+    Statements are built from a fixed set of SQL strings, so sqlite3's
+    statement cache keeps them prepared. One connection is shared by the
+    threads that use the storage (in the app only the I/O worker does);
+    a lock serializes access.
+    """
+
+    def __init__(self, path, timeout=5.0):
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(
+            path, timeout=timeout, check_same_thread=False,
+            isolation_level=None, cached_statements=256,
+        )
+        self._configure()
+        self.orders = self[ORDER_COLLECTION]
+        self.limits = self[LIMIT_COLLECTION]
+        self.menu = self[MENU_COLLECTION]
+        self.history = self[HISTORY_COLLECTION]
+
+    def _configure(self):
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            # WAL + NORMAL: no fsync per commit; a power cut may lose the
+            # last commits but never corrupts the database
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("PRAGMA temp_store=MEMORY")
+            with self.transaction():
+                for table, columns, _ in TABLES.values():
+                    cols = "".join(f', "{name}" {kind}'.rstrip() for name, kind in columns)
+                    self.conn.execute(
+                        f'CREATE TABLE IF NOT EXISTS {table} '
+                        f'(_id TEXT PRIMARY KEY{cols}, extra TEXT)'
+                    )
+                for sql in INDEXES:
+                    self.conn.execute(sql)
+
+    def __getitem__(self, name):
+        """Collection by its Mongo name (so debug helpers can treat this like a db)."""
+        if name not in TABLES:
+            raise KeyError(f"no SQLite table for collection {name!r}")
+        return SqliteCollection(self, name)
+
+    def transaction(self):
+        return _Transaction(self)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    # -------------------------------------------------
+    # Storage interface
+    # -------------------------------------------------
+    def load_orders(self):
+        return list(self.orders.find({}))
+
+    def load_dish_limits(self):
+        return list(self.limits.find({}))
+
+    def load_menu(self):
+        return list(self.menu.find({}))
+
+    def load_history(self, query=None, limit=0):
+        """Archived orders, newest first (never read by the live engine)."""
+        return list(self.history.find(query or {}).sort("archived_at", -1).limit(limit))
+
+    def new_id(self):
+        return uuid.uuid4().hex
+
+    def write(self, batch):
+        """Apply one WriteBuffer batch in one transaction. Returns {key: error}."""
+        inserts, updates, many, archive = batch
+        failures = {}
+        with self.transaction():
+            for _id, doc in inserts.items():
+                try:
+                    self.orders.insert_one(stamp(doc))
+                except sqlite3.IntegrityError as e:
+                    failures[_id] = f"duplicate key: {e}"
+            for _id, fields in updates.items():
+                self.orders.update({"_id": _id}, stamp(fields))
+            for filter_, fields in many:
+                self.orders.update(filter_, stamp(fields))
+            # copy first, then delete: both land in the same commit
+            for _id, doc in archive.items():
+                self.history.insert_one(stamp(doc), replace=True)
+                self.orders.delete({"_id": _id})
+        return failures
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, rolled back on error. Nests (inner levels are no-ops)."""
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.outer = False
+
+    def __enter__(self):
+        self.storage.lock.acquire()
+        conn = self.storage.conn
+        self.outer = not conn.in_transaction
+        if self.outer:
+            conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self.outer:
+                self.storage.conn.execute("COMMIT" if exc_type is None else "ROLLBACK")
+        finally:
+            self.storage.lock.release()
+        return False
+
+
+class SqliteCollection:
+    """
+    One table seen as a Mongo collection. find() understands equality,
+    $in and $gt/$gte/$lt/$lte on column fields, inclusion projections, sort() and
+    limit(). Writes are insert_one / update / delete with the same filters.
+    """
+
+    def __init__(self, storage, name):
+        self.storage = storage
+        self.name = name
+        self.table, columns, self.booleans = TABLES[name]
+        self.columns = [c for c, _ in columns]
+        self._column_set = set(self.columns)
+
+    # -------------------------------------------------
+    # Reads
+    # -------------------------------------------------
+    def find(self, query=None, projection=None):
+        where, params = self._where(query or {})
+        return SqliteCursor(self, where, params, self._select(projection))
+
+    def create_index(self, field):
+        # the indexes the app needs are created with the schema
+        if field not in self._column_set and field != "_id":
+            raise NotImplementedError(f"cannot index {field!r}: not a column of {self.table}")
+
+    def _select(self, projection):
+        if not projection:
+            return None
+        wanted = [f for f, on in projection.items() if on and f != "_id"]
+        if any(f not in self._column_set for f in wanted):
+            return None  # needs `extra`: read whole rows
+        return [f for f in self.columns if f in wanted]
+
+    def _where(self, query):
+        clauses, params = [], []
+        for field, cond in query.items():
+            self._check_field(field)
+            if isinstance(cond, dict):
+                for op, value in cond.items():
+                    if op == "$in":
+                        values = list(value)
+                        clauses.append(f'"{field}" IN ({", ".join("?" * len(values))})' if values else "0")
+                        params.extend(self._to_sql(field, v) for v in values)
+                        continue
+                    if op not in OPERATORS:
+                        raise NotImplementedError(f"unsupported operator {op!r}")
+                    clauses.append(f'"{field}" {OPERATORS[op]} ?')
+                    params.append(self._to_sql(field, value))
+            elif cond is None:
+                clauses.append(f'"{field}" IS NULL')
+            else:
+                clauses.append(f'"{field}" = ?')
+                params.append(self._to_sql(field, cond))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _check_field(self, field):
+        if field != "_id" and field not in self._column_set:
+            raise NotImplementedError(f"cannot query {field!r}: not a column of {self.table}")
+
+    def _row_to_doc(self, names, row):
+        doc = {}
+        for name, value in zip(names, row):
+            if name == "extra":
+                if value:
+                    doc.update(json.loads(value))
+            elif value is not None:
+                doc[name] = bool(value) if name in self.booleans else value
+        return doc
+
+    def _to_sql(self, field, value):
+        if field in self.booleans and value is not None:
+            return int(bool(value))
+        return value
+
+    # -------------------------------------------------
+    # Writes (call inside storage.transaction() to batch them)
+    # -------------------------------------------------
+    def insert_one(self, doc, replace=False):
+        if "_id" not in doc:
+            doc = dict(doc, _id=self.storage.new_id())
+        values = [doc["_id"]] + [self._to_sql(c, doc.get(c)) for c in self.columns]
+        extra = {k: v for k, v in doc.items() if k != "_id" and k not in self._column_set}
+        values.append(json.dumps(extra) if extra else None)
+        verb = "INSERT OR REPLACE" if replace else "INSERT"
+        marks = ", ".join("?" * len(values))
+        cols = ", ".join(f'"{c}"' for c in self.columns)
+        with self.storage.transaction() as conn:
+            conn.execute(f'{verb} INTO {self.table} (_id, {cols}, extra) VALUES ({marks})', values)
+        return doc["_id"]
+
+    def update(self, filter_, fields):
+        """$set `fields` on every matching row. Returns how many rows matched."""
+        where, params = self._where(filter_)
+        sets, values = [], []
+        extra = {}
+        for field in sorted(fields):
+            if field in self._column_set:
+                sets.append(f'"{field}" = ?')
+                values.append(self._to_sql(field, fields[field]))
+            elif field != "_id":
+                extra[field] = fields[field]
+        if extra:
+            sets.append("extra = json_patch(coalesce(extra, '{}'), ?)")
+            values.append(json.dumps(extra))
+        if not sets:
+            return 0
+        with self.storage.transaction() as conn:
+            cur = conn.execute(f'UPDATE {self.table} SET {", ".join(sets)}{where}', values + params)
+        return cur.rowcount
+
+    def delete(self, filter_):
+        where, params = self._where(filter_)
+        with self.storage.transaction() as conn:
+            return conn.execute(f"DELETE FROM {self.table}{where}", params).rowcount
+
+
+class SqliteCursor:
+    """Lazy result of SqliteCollection.find(); runs the query when iterated."""
+
+    def __init__(self, collection, where, params, columns):
+        self.collection = collection
+        self.where = where
+        self.params = params
+        self.columns = columns
+        self._order = ""
+        self._limit = 0
+
+    def sort(self, field, direction=1):
+        self.collection._check_field(field)
+        self._order = f' ORDER BY "{field}" {"DESC" if direction < 0 else "ASC"}'
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def __iter__(self):
+        c = self.collection
+        names = ["_id"] + (self.columns if self.columns is not None else c.columns + ["extra"])
+        cols = ", ".join(f'"{n}"' for n in names)
+        sql = f"SELECT {cols} FROM {c.table}{self.where}{self._order}"
+        params = list(self.params)
+        if self._limit:
+            sql += " LIMIT ?"
+            params.append(self._limit)
+        with c.storage.lock:
+            rows = c.storage.conn.execute(sql, params).fetchall()
+        return (c._row_to_doc(names, row) for row in rows)
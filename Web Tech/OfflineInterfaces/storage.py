@@ -0,0 +1,111 @@
+# -----------------------
+# Storage backends for KitchenEngine
+# -----------------------
+import itertools
+
+from order_sync import stamp
+from write_buffer import WriteBuffer
+
+# default collection names (same as the Mongo database the app ships with)
+ORDER_COLLECTION = 'order'
+LIMIT_COLLECTION = 'dish limit'
+MENU_COLLECTION = 'menu'
+HISTORY_COLLECTION = 'order history'  # archived (completed + evicted) orders
+
+
+class MongoStorage:
+    """
+    KitchenEngine storage on a pymongo database. Every call does database
+    I/O, so in the UI it only runs on the MongoWorker thread.
+    """
+
+    def __init__(self, db, order_collection=ORDER_COLLECTION,
+                 limit_collection=LIMIT_COLLECTION, menu_collection=MENU_COLLECTION,
+                 history_collection=HISTORY_COLLECTION):
+        self.db = db
+        self.orders = db[order_collection]
+        self.limits = db[limit_collection]
+        self.menu = db[menu_collection]
+        self.history = db[history_collection]
+
+    def load_orders(self):
+        return list(self.orders.find({}))
+
+    def load_dish_limits(self):
+        return list(self.limits.find({}))
+
+    def load_menu(self):
+        return list(self.menu.find({}))
+
+    def load_history(self, query=None, limit=0):
+        """Archived orders, newest first (never read by the live engine)."""
+        return list(self.history.find(query or {}).sort("archived_at", -1).limit(limit))
+
+    def new_id(self):
+        from bson import ObjectId
+        return ObjectId()
+
+    def write(self, batch):
+        """Apply one WriteBuffer batch as a single bulk_write. Returns {key: error}."""
+        return WriteBuffer.execute(batch, self.orders, self.history)
+
+
+class MemoryStorage:
+    """
+    In-process storage with the same interface: orders are dicts keyed by
+    _id. For benchmarks, simulations and running without a database.
+    """
+
+    def __init__(self, orders=(), dish_limits=(), menu=()):
+        self._ids = itertools.count(1)
+        self.orders = {}
+        for doc in orders:
+            doc = dict(doc)
+            doc.setdefault("_id", self.new_id())
+            self.orders[doc["_id"]] = doc
+        self.dish_limits = [dict(d) for d in dish_limits]
+        self.menu = [dict(d) for d in menu]
+        self.history = {}
+        self.round_trips = 0
+
+    def load_orders(self):
+        return [dict(d) for d in self.orders.values()]
+
+    def load_dish_limits(self):
+        return [dict(d) for d in self.dish_limits]
+
+    def load_menu(self):
+        return [dict(d) for d in self.menu]
+
+    def load_history(self, query=None, limit=0):
+        docs = [
+            dict(d) for d in self.history.values()
+            if all(d.get(k) == v for k, v in (query or {}).items())
+        ]
+        docs.sort(key=lambda d: d.get("archived_at", 0), reverse=True)
+        return docs[:limit] if limit else docs
+
+    def new_id(self):
+        return f"mem-{next(self._ids)}"
+
+    def write(self, batch):
+        inserts, updates, many, archive = batch
+        self.round_trips += 1
+        failures = {}
+        for _id, doc in inserts.items():
+            if _id in self.orders:
+                failures[_id] = "duplicate key"
+                continue
+            self.orders[_id] = stamp(doc)
+        for _id, fields in updates.items():
+            doc = self.orders.get(_id)
+            if doc is not None:
+                doc.update(stamp(fields))
+        for filter_, fields in many:
+            for doc in self.orders.values():
+                if all(doc.get(k) == v for k, v in filter_.items()):
+                    doc.update(stamp(fields))
+        for _id, doc in archive.items():
+            self.history[_id] = stamp(doc)
+            self.orders.pop(_id, None)
+        return failures
@@ -0,0 +1,152 @@
+# -----------------------
+# Test harness: in-process collection fake over MemoryStorage
+# -----------------------
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kitchen_engine import KitchenEngine  # noqa: E402
+from order_sync import OrderSync  # noqa: E402
+from storage import MemoryStorage  # noqa: E402
+
+
+def _matches(doc, query):
+    for field, cond in query.items():
+        value = doc.get(field)
+        if not isinstance(cond, dict):
+            if value != cond:
+                return False
+            continue
+        for op, arg in cond.items():
+            if op == "$in":
+                ok = value in arg
+            elif op == "$gt":
+                ok = value is not None and value > arg
+            else:
+                raise NotImplementedError(f"unsupported operator {op!r}")
+            if not ok:
+                return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, field, direction=1):
+        self.docs.sort(key=lambda d: d.get(field, 0), reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        if n:
+            self.docs = self.docs[:n]
+        return self
+
+    def __iter__(self):
+        return iter(self.docs)
+
+
+class FakeCollection:
+    """
+    The part of a pymongo collection OrderSync uses, over a dict of
+    documents keyed by _id (share MemoryStorage.orders so the engine's
+    flushed writes show up here). No watch(): OrderSync polls.
+    """
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.finds = 0
+
+    def find(self, query=None, projection=None):
+        self.finds += 1
+        out = []
+        for doc in self.docs.values():
+            if _matches(doc, query or {}):
+                if projection:
+                    doc = {k: v for k, v in doc.items() if k == "_id" or k in projection}
+                out.append(dict(doc))
+        return FakeCursor(out)
+
+    def create_index(self, field):
+        return field
+
+
+class FakeStream:
+    def __init__(self, events):
+        self.events = events
+        self.resume_token = None
+        self.closed = False
+
+    def try_next(self):
+        if not self.events:
+            return None
+        change = self.events.pop(0)
+        self.resume_token = {"_data": change.get("_id")}
+        return change
+
+    def close(self):
+        self.closed = True
+
+
+class FakeStreamCollection(FakeCollection):
+    """FakeCollection with a change stream: tests append events to .events."""
+
+    def __init__(self, docs):
+        super().__init__(docs)
+        self.events = []
+
+    def watch(self, resume_after=None, full_document=None, max_await_time_ms=None):
+        return FakeStream(self.events)
+
+
+class FlakyStorage(MemoryStorage):
+    """MemoryStorage whose write() raises while .down is set."""
+
+    down = False
+
+    def write(self, batch):
+        if self.down:
+            raise ConnectionError("network is down")
+        return super().write(batch)
+
+
+def order_doc(_id, order_number, dish="Pizza", **fields):
+    """An `order` document as the POS writes it (no updated_at unless given)."""
+    doc = {"_id": _id, "dish": dish, "order_number": order_number, "order_type": "dine-in",
+           "remarks": "", "locked": False, "ready": False, "completed": False}
+    doc.update(fields)
+    return doc
+
+
+def start_sync(kitchen, collection, **kwargs):
+    sync = OrderSync(kitchen, collection, **kwargs)
+    sync.start()
+    return sync
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def storage():
+    return FlakyStorage(dish_limits=[{"dish": "Pizza", "maximum_number_of_dishes_per_batch": 4}])
+
+
+@pytest.fixture
+def kitchen(storage, clock):
+    engine = KitchenEngine(storage=storage, clock=clock)
+    engine.load_dish_limits(storage.load_dish_limits())
+    return engine
@@ -0,0 +1,25 @@
+from kitchen_engine import KitchenEngine
+
+
+def test_dish_without_limit_waits_until_its_slack_runs_out(clock):
+    km = KitchenEngine(clock=clock)
+    km.cook_times["Stew"] = 300
+    km.add_order("Stew", "Table:1")
+    clock.now += 60
+    km.add_order("Stew", "Table:2")
+
+    (s,) = km.planner.plan()
+    assert not s.start_now and s.slack == 540
+    assert km.suggest_batches() == []
+
+    clock.now += 541
+    (s,) = km.planner.plan()
+    assert s.start_now and s.reason == "due"
+
+
+def test_limited_dish_that_will_not_fill_starts_now(clock):
+    km = KitchenEngine(clock=clock)
+    km.load_dish_limits([{"dish": "Pizza", "maximum_number_of_dishes_per_batch": 50}])
+    km.add_order("Pizza", "Table:1")
+    (s,) = km.planner.plan()
+    assert s.start_now and s.reason == "will not fill in time"
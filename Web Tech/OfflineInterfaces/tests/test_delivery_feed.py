@@ -0,0 +1,139 @@
+import pytest
+
+from delivery_feed import EarliestPromise, MaxBatchFill, RoundRobin, TokenBucket, make_policy
+from kitchen_engine import KitchenEngine
+
+
+def _items(*dishes):
+    return [[dish, ""] for dish in dishes]
+
+
+def _unlimited(clock, policy):
+    km = KitchenEngine(clock=clock)
+    km.feed_bucket.rate = None
+    km.feed_policy = policy
+    return km
+
+
+# -------------------------------------------------
+# Token bucket
+# -------------------------------------------------
+def test_bucket_refills_at_its_rate_up_to_the_burst(clock):
+    bucket = TokenBucket(rate=2, burst=4)
+    assert bucket.available(clock()) == 4
+    bucket.take(4, clock())
+    assert bucket.available(clock()) == 0
+
+    clock.now += 0.5
+    assert bucket.available(clock()) == 1
+    clock.now += 10
+    assert bucket.available(clock()) == 4 and bucket.full(clock())
+
+    # a clock that steps back neither refills nor rewinds the bucket
+    bucket.take(4, clock())
+    assert bucket.available(clock() - 5) == 0
+    clock.now += 1
+    assert bucket.available(clock()) == 2
+
+
+def test_full_bucket_can_be_overdrawn_and_pays_the_debt_back(clock):
+    bucket = TokenBucket(rate=2, burst=4)
+    bucket.take(6, clock())
+    assert bucket.available(clock()) == 0
+    clock.now += 1
+    assert bucket.available(clock()) == 0
+    clock.now += 1.5
+    assert bucket.available(clock()) == 3 and not bucket.full(clock())
+    clock.now += 0.5
+    assert bucket.full(clock())
+
+    assert TokenBucket().available(clock()) is None
+
+
+# -------------------------------------------------
+# Feeding through the bucket
+# -------------------------------------------------
+def test_feed_is_limited_by_the_bucket(clock):
+    km = KitchenEngine(clock=clock)
+    km.feed_bucket = TokenBucket(rate=1, burst=2)
+    km.add_bill_to_queue(1, _items("Pizza", "Soup", "Salad", "Pizza"))
+
+    assert km.feed_kitchen() == ["Pizza", "Soup"]
+    assert km.feed_kitchen() == []
+    clock.now += 1
+    assert km.feed_kitchen() == ["Salad"]
+    clock.now += 5
+    # the burst caps what saves up while the kitchen waits
+    assert km.feed_bucket.available(clock()) == 2
+    assert km.feed_kitchen(limit=1) == ["Pizza"]
+    assert km.queued_items() == 0
+
+
+def test_whole_bill_larger_than_the_burst_waits_for_a_full_bucket(clock):
+    km = KitchenEngine(clock=clock)
+    km.feed_bucket = TokenBucket(rate=1, burst=2)
+    km.feed_whole_bills = True
+    km.add_bill_to_queue(1, _items("Soup"))
+    km.add_bill_to_queue(2, _items("Pizza", "Pizza", "Pizza"))
+    km.add_bill_to_queue(3, _items("Salad"))
+
+    assert km.feed_kitchen() == ["Soup"]
+    clock.now += 0.5
+    # one token left: the big bill needs a full bucket
+    assert km.feed_kitchen() == []
+    clock.now += 0.5
+    assert km.feed_kitchen() == ["Pizza", "Pizza", "Pizza"]
+    # overdrawn by one: bill 3 waits until that is paid back
+    clock.now += 1
+    assert km.feed_kitchen() == []
+    clock.now += 1
+    assert km.feed_kitchen() == ["Salad"]
+
+
+# -------------------------------------------------
+# Feed policies
+# -------------------------------------------------
+def test_fifo_drains_the_oldest_bill_first(clock):
+    km = _unlimited(clock, make_policy("fifo"))
+    km.add_bill_to_queue(1, _items("Pizza", "Soup"))
+    km.add_bill_to_queue(2, _items("Salad"))
+    assert km.feed_kitchen() == ["Pizza", "Soup", "Salad"]
+
+
+def test_round_robin_feeds_one_item_per_bill_in_turn(clock):
+    km = _unlimited(clock, RoundRobin())
+    km.add_bill_to_queue(1, _items("Pizza", "Pizza", "Pizza"))
+    km.add_bill_to_queue(2, _items("Soup", "Soup"))
+    km.add_bill_to_queue(3, _items("Salad"))
+    assert km.feed_kitchen() == ["Pizza", "Soup", "Salad", "Pizza", "Soup", "Pizza"]
+
+
+def test_earliest_promise_first_and_unpromised_bills_last(clock):
+    km = _unlimited(clock, EarliestPromise())
+    km.add_bill_to_queue(1, _items("Pizza"))
+    km.add_bill_to_queue(2, _items("Soup"), promised_at=2000.0)
+    km.add_bill_to_queue(3, _items("Salad", "Salad"), promised_at=1500.0)
+    km.add_bill_to_queue(4, _items("Stew"))
+    assert km.feed_kitchen() == ["Salad", "Salad", "Soup", "Pizza", "Stew"]
+
+
+def test_max_fill_tops_up_the_fullest_open_batch(clock):
+    km = _unlimited(clock, MaxBatchFill())
+    km.load_dish_limits([{"dish": "Pizza", "maximum_number_of_dishes_per_batch": 4},
+                         {"dish": "Soup", "maximum_number_of_dishes_per_batch": 4}])
+    for table in (1, 2, 3):
+        km.add_order("Pizza", table)
+    km.add_bill_to_queue(1, _items("Soup"))
+    km.add_bill_to_queue(2, _items("Pizza", "Pizza"))
+
+    # the first Pizza closes the open batch; the second would start a new
+    # one, no better than the Soup queued before it
+    assert km.feed_kitchen() == ["Pizza", "Soup", "Pizza"]
+
+
+def test_make_policy_by_name():
+    for name in ("fifo", "round-robin", "deadline", "max-fill"):
+        assert make_policy(name).name == name
+    assert isinstance(make_policy("deadline"), EarliestPromise)
+    with pytest.raises(ValueError):
+        make_policy("lifo")
@@ -0,0 +1,112 @@
+import os
+import pickle
+
+from journal import Journal
+from kitchen_engine import KitchenEngine
+
+
+def _events(directory, generation):
+    with open(os.path.join(directory, f"journal-{generation}.log"), "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def _recover(directory, clock, **kwargs):
+    engine = KitchenEngine(clock=clock, **kwargs)
+    assert Journal(directory).recover(engine)
+    return engine
+
+
+def test_bill_queue_is_logged_per_bill_and_replayed(tmp_path, clock):
+    km = KitchenEngine(clock=clock)
+    km.feed_bucket.rate = None
+    journal = Journal(str(tmp_path))
+    journal.attach(km)
+    journal.snapshot()
+
+    km.add_bill_to_queue(1, [["Pizza", ""], ["Soup", "hot"], ["Pizza", ""]])
+    km.add_bill_to_queue(2, [["Salad", ""]], promised_at=2000.0)
+    clock.now += 10
+    km.feed_kitchen(limit=2)
+    clock.now += 10
+    km.feed_next_item_to_kitchen()
+    journal.sync()
+
+    kinds = [e[0] for e in _events(str(tmp_path), journal.generation)]
+    assert "bill_queue" not in kinds
+    assert kinds.count("bill_push") == 2
+    # one event per item fed, naming the bill
+    assert kinds.count("bill_take") == 3
+
+    km2 = _recover(str(tmp_path), clock)
+    assert [b.row() for b in km2.bill_queue] == [b.row() for b in km.bill_queue]
+    assert km2.bill_seq == km.bill_seq
+    assert list(km2.feed_waits) == list(km.feed_waits)
+
+
+def _served(km, clock, dish="Pizza", order_no=1):
+    """Place an order and take it all the way to completed; returns it."""
+    km.add_order(dish, order_no)
+    o = km.orders.last()
+    km.lock_specific_batch(dish, o.batch_id)
+    km.confirm_batch_done(dish, o.batch_id)
+    assert km.serve_item(o)
+    return o
+
+
+def test_completed_and_archived_orders_survive_a_warm_start(tmp_path, clock):
+    km = KitchenEngine(clock=clock, retention=100)
+    journal = Journal(str(tmp_path))
+    journal.attach(km)
+
+    old = _served(km, clock, order_no=1)
+    km.orders.set(old, "mongo_id", "old-id")
+    clock.now += 60
+    kept = _served(km, clock, "Soup", order_no=2)
+    journal.snapshot()
+    clock.now += 50
+    assert km.evict_completed() == 1
+    assert km.is_archived("old-id")
+    late = _served(km, clock, "Salad", order_no=3)
+    journal.sync()
+
+    clock.now += 30
+    km2 = _recover(str(tmp_path), clock, retention=100)
+    assert km2.is_archived("old-id")
+    # completion times came back from the snapshot and the log, not the restart
+    queued = [(t, o.seq) for t, o in km2._completed if o in km2.orders]
+    assert queued == [(1060.0, kept.seq), (1110.0, late.seq)]
+    assert km2.evict_completed() == 0
+    clock.now += 20
+    assert km2.evict_completed() == 1
+    assert [o.seq for o in km2.orders] == [late.seq]
+
+
+def test_logs_rotated_before_the_snapshot_landed_still_replay(tmp_path, clock):
+    km = KitchenEngine(clock=clock)
+    journal = Journal(str(tmp_path), snapshot_every=2)
+    journal.attach(km)
+    km.add_order("Pizza", 1)
+    km.add_order("Soup", 2)
+
+    pending = []
+    assert journal.maybe_snapshot(lambda fn, callback, errback: pending.append(fn))
+    assert journal.generation == 1 and len(pending) == 1
+    # a second snapshot waits for the first write to finish
+    km.add_order("Salad", 3)
+    km.add_order("Pizza", 4)
+    assert not journal.maybe_snapshot(lambda fn, callback, errback: pending.append(fn))
+    journal.sync()
+
+    # crash before the worker ran: no snapshot, logs 0 and 1 on disk
+    km2 = _recover(str(tmp_path), clock)
+    assert [o.dish for o in km2.orders] == [o.dish for o in km.orders]
+
+    # once it lands, only the new log is left to replay
+    pending[0](None)
+    assert not os.path.exists(os.path.join(str(tmp_path), "journal-0.log"))
+    km3 = _recover(str(tmp_path), clock)
+    assert [o.dish for o in km3.orders] == [o.dish for o in km.orders]
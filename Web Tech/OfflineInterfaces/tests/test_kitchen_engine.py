@@ -0,0 +1,56 @@
+def _limit(kitchen, dish, size):
+    kitchen.sync_dish_limits([{"dish": dish, "maximum_number_of_dishes_per_batch": size}])
+
+
+def test_raising_a_limit_locks_pending_orders_packed_into_a_locked_batch(kitchen, storage, clock):
+    _limit(kitchen, "Pizza", 1)
+    kitchen.place_order("Pizza", "Table:1")
+    first = kitchen.orders.last()
+    kitchen.lock_specific_batch("Pizza", first.batch_id)
+    clock.now += 10
+    kitchen.place_order("Pizza", "Table:2")
+    second = kitchen.orders.last()
+    kitchen.flush_writes()
+
+    _limit(kitchen, "Pizza", 4)
+    assert first.batch_id == second.batch_id
+    assert [o.state for o in (first, second)] == ["locked", "locked"]
+    assert kitchen.get_unlocked_batches() == []
+
+    kitchen.confirm_batch_done("Pizza", first.batch_id)
+    assert [o.state for o in (first, second)] == ["ready", "ready"]
+    kitchen.flush_writes()
+    assert storage.orders[second.mongo_id]["locked"] and storage.orders[second.mongo_id]["ready"]
+
+
+def test_ready_bills_follow_confirm_complete_and_remove(kitchen):
+    events = []
+    kitchen.on_bill_ready = lambda order_no, dine_in: events.append((order_no, dine_in))
+    kitchen.place_order("Pizza", 10)
+    kitchen.place_order("Pizza", 10)
+    kitchen.place_order("Soup", 10)
+    soup = kitchen.orders.last()
+    kitchen.place_order("Pizza", 2)
+    kitchen.place_order("Pizza", "D-7", order_type="delivery")
+    pizza = kitchen.orders.for_order_no(10)[0]
+    assert kitchen.get_ready_bills() == ([], [])
+
+    kitchen.lock_specific_batch("Pizza", pizza.batch_id)
+    kitchen.confirm_batch_done("Pizza", pizza.batch_id)
+    # table 10 still waits for its soup; one event per bill
+    assert kitchen.get_ready_bills() == (["2"], ["D-7"])
+    assert sorted(events) == [("2", True), ("D-7", False)]
+
+    events.clear()
+    kitchen.apply_remote_delete(soup.mongo_id)
+    assert kitchen.get_ready_bills() == (["2", "10"], ["D-7"])
+    assert events == [("10", True)]
+
+    # serving part of a bill keeps it ready; completing it clears it
+    events.clear()
+    assert kitchen.serve_item(pizza)
+    assert kitchen.orders.is_bill_ready(10)
+    assert kitchen.complete_bill(10) == 1
+    assert kitchen.complete_bill("D-7") == 1
+    assert kitchen.get_ready_bills() == (["2"], [])
+    assert events == []
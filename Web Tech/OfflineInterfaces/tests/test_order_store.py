@@ -0,0 +1,29 @@
+from order_store import BatchRegistry
+
+
+def test_oldest_open_follows_timestamps_locks_and_fill():
+    reg = BatchRegistry()
+    a = reg.add("Pizza", 1, False, 300.0)
+    b = reg.add("Soup", 2, False, 100.0)
+    c = reg.add("Pizza", 3, False, 200.0)
+    assert reg.oldest_open() is None
+
+    for batch in (a, b, c):
+        reg.fill_changed(batch.dish_code, batch.batch_id, 1)
+    assert reg.oldest_open() is b
+
+    reg.set_locked(b)
+    assert reg.oldest_open() is c
+    reg.fill_changed(c.dish_code, c.batch_id, 0)
+    assert reg.oldest_open() is a
+
+    reg.set_timestamp(a, 400.0)
+    reg.fill_changed(c.dish_code, c.batch_id, 2)
+    assert reg.oldest_open() is c
+    reg.set_locked(b, False)
+    assert reg.oldest_open() is b
+    assert reg.locked_with_orders() == []
+    assert {x.batch_id for x in reg.open_with_orders()} == {1, 2, 3}
+
+    reg.clear()
+    assert reg.oldest_open() is None
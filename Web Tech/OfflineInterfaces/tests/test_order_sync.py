@@ -0,0 +1,67 @@
+from order_sync import stamp
+
+from conftest import FakeCollection, FakeStreamCollection, order_doc, start_sync
+
+
+# -------------------------------------------------
+# Change stream deltas
+# -------------------------------------------------
+def test_stream_events_apply_as_deltas(kitchen, storage):
+    coll = FakeStreamCollection(storage.orders)
+    sync = start_sync(kitchen, coll)
+    assert sync.mode == "stream"
+
+    coll.events.append({"_id": 1, "operationType": "insert", "documentKey": {"_id": "x"},
+                        "fullDocument": order_doc("x", "Table:1")})
+    assert sync.poll() == 1
+    o = kitchen.orders.by_mongo_id("x")
+    assert o is not None and not o.locked
+
+    coll.events.append({"_id": 2, "operationType": "update", "documentKey": {"_id": "x"},
+                        "updateDescription": {"updatedFields": {"remarks": "spicy"}}})
+    assert sync.poll() == 1
+    assert o.remarks == "spicy"
+
+    coll.events.append({"_id": 3, "operationType": "delete", "documentKey": {"_id": "x"}})
+    assert sync.poll() == 1
+    assert kitchen.orders.by_mongo_id("x") is None
+    assert sync.feed.resume_token == {"_data": 3}
+    # nothing was read from the collection itself
+    assert coll.finds == 0
+
+
+def test_invalidated_stream_resyncs_in_full(kitchen, storage):
+    coll = FakeStreamCollection(storage.orders)
+    sync = start_sync(kitchen, coll)
+    kitchen.load_orders_from_mongodb([order_doc("old", "Table:1")])
+    storage.orders["new"] = stamp(order_doc("new", "Table:2"))
+
+    coll.events.append({"_id": 1, "operationType": "invalidate"})
+    sync.poll()
+    assert kitchen.orders.by_mongo_id("old") is None
+    assert kitchen.orders.by_mongo_id("new") is not None
+    assert sync.feed.resume_token is None
+
+
+# -------------------------------------------------
+# Polling fallback
+# -------------------------------------------------
+def test_polling_fallback_fetches_only_newer_documents(kitchen, storage):
+    storage.orders["a"] = dict(order_doc("a", "Table:1"), updated_at=10.0)
+    coll = FakeCollection(storage.orders)
+    sync = start_sync(kitchen, coll, overlap=0, reconcile_every=3600)
+    assert sync.mode == "poll"
+    assert sync.high_water == 10.0
+
+    storage.orders["b"] = dict(order_doc("b", "Table:2"), updated_at=11.0)
+    delta = sync.fetch()
+    assert [r["_id"] for r in delta["records"]] == ["b"]
+    assert sync.apply(delta) == 1
+    assert kitchen.orders.by_mongo_id("b") is not None
+    assert kitchen.orders.by_mongo_id("a") is None
+    assert sync.high_water == 11.0
+
+    storage.orders["b"]["updated_at"] = 12.0
+    storage.orders["b"]["remarks"] = "extra sauce"
+    sync.poll()
+    assert kitchen.orders.by_mongo_id("b").remarks == "extra sauce"
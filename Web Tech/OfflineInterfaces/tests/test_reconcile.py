@@ -0,0 +1,69 @@
+from write_buffer import WriteBuffer
+
+from conftest import FakeCollection, order_doc, start_sync
+
+
+def test_inserting_covers_queued_in_flight_and_recently_landed():
+    wb = WriteBuffer()
+    wb.insert({"_id": "a"})
+    assert wb.inserting("a")
+    batch = wb.take()
+    assert wb.inserting("a")
+    wb.settle(batch, {})
+    assert not wb.inserting("a")
+    assert wb.inserting("a", since=0.0)
+
+
+def test_reconcile_drops_deleted_and_loads_unstamped_documents(kitchen, storage):
+    coll = FakeCollection(storage.orders)
+    sync = start_sync(kitchen, coll, reconcile_every=0)
+    kitchen.load_orders_from_mongodb([order_doc("gone", "Table:1")])
+    # written by hand: no updated_at, so the delta query never matches it
+    storage.orders["manual"] = order_doc("manual", "Table:2")
+
+    sync.poll()
+    assert kitchen.orders.by_mongo_id("gone") is None
+    sync.poll()
+    assert kitchen.orders.by_mongo_id("manual") is not None
+
+
+def test_reconcile_keeps_order_whose_insert_is_queued(kitchen, storage):
+    sync = start_sync(kitchen, FakeCollection(storage.orders), reconcile_every=0)
+    kitchen.place_order("Pizza", "Table:1")
+    o = kitchen.orders.last()
+    sync.poll()
+    assert o in kitchen.orders
+
+
+def test_reconcile_keeps_order_whose_insert_is_in_flight(kitchen, storage):
+    sync = start_sync(kitchen, FakeCollection(storage.orders), reconcile_every=0)
+    kitchen.place_order("Pizza", "Table:1")
+    o = kitchen.orders.last()
+    batch = kitchen.writes.take()
+    sync.poll()
+    assert o in kitchen.orders
+    kitchen.writes.settle(batch, storage.write(batch))
+    assert o.mongo_id in storage.orders
+
+
+def test_reconcile_snapshot_older_than_landed_insert_keeps_it(kitchen, storage):
+    sync = start_sync(kitchen, FakeCollection(storage.orders), reconcile_every=0)
+    kitchen.place_order("Pizza", "Table:1")
+    o = kitchen.orders.last()
+    # the id scan runs on the worker before the insert lands ...
+    delta = sync.fetch()
+    assert o.mongo_id not in delta["ids"]
+    kitchen.flush_writes()
+    # ... and is applied after it landed
+    sync.apply(delta)
+    assert o in kitchen.orders
+
+
+def test_reconcile_still_drops_remote_deletes_of_landed_orders(kitchen, storage):
+    sync = start_sync(kitchen, FakeCollection(storage.orders), reconcile_every=0)
+    kitchen.place_order("Pizza", "Table:1")
+    o = kitchen.orders.last()
+    kitchen.flush_writes()
+    del storage.orders[o.mongo_id]
+    sync.poll()
+    assert o not in kitchen.orders
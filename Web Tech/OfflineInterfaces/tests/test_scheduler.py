@@ -0,0 +1,55 @@
+from scheduler import Scheduler
+
+
+def _scheduler(clock):
+    delays = []
+    sched = Scheduler(lambda ms, fn: delays.append(ms), lambda: None, clock=clock)
+    return sched, delays
+
+
+def test_over_budget_task_skips_ahead_instead_of_running_back_to_back(clock):
+    sched, delays = _scheduler(clock)
+
+    def slow():
+        clock.now += 2.5  # more than two intervals
+        return True
+
+    sched.add("slow", slow, 1.0)
+    other = sched.add("other", lambda: None, 1.0)
+    clock.now += 1.0
+    sched._pass()
+
+    # the task queued behind it still ran, and both resume one interval
+    # after the overrun instead of catching up on the missed runs
+    slow_task = sched.tasks["slow"]
+    assert (slow_task.runs, other.runs) == (1, 1)
+    assert slow_task.due == other.due == clock.now + 1.0
+    assert delays == [1000]
+    # the interval only reacts to the outcome, not to the time it took
+    assert slow_task.interval == 1.0
+
+    clock.now += 1.0
+    sched._pass()
+    assert (slow_task.runs, other.runs) == (2, 2)
+
+
+def test_tasks_keep_their_phase_when_a_pass_is_a_little_late(clock):
+    sched, delays = _scheduler(clock)
+    task = sched.add("tick", lambda: None, 1.0)
+    clock.now += 1.25
+    sched._pass()
+    assert task.due == 1002.0
+    assert delays == [750]
+
+
+def test_failing_task_is_rescheduled(clock):
+    sched, _ = _scheduler(clock)
+
+    def broken():
+        raise RuntimeError("boom")
+
+    task = sched.add("broken", broken, 1.0, min_interval=0.5, max_interval=4.0)
+    clock.now += 1.0
+    sched._pass()
+    assert task.runs == 1 and task.interval == 1.0
+    assert task.due == 1002.0
@@ -0,0 +1,108 @@
+import pytest
+
+from kitchen_engine import KitchenEngine
+from sqlite_storage import SqliteStorage
+
+from conftest import order_doc, start_sync
+
+
+@pytest.fixture
+def db(tmp_path):
+    storage = SqliteStorage(str(tmp_path / "kitchen.db"))
+    yield storage
+    storage.close()
+
+
+# -------------------------------------------------
+# Reads
+# -------------------------------------------------
+def test_find_round_trips_documents_and_projects_columns(db):
+    db.orders.insert_one(order_doc("a", "Table:1", locked=True, table_note="window"))
+    db.orders.insert_one(order_doc("b", "Table:2", dish="Soup"))
+
+    (a,) = db.orders.find({"dish": "Pizza"})
+    # booleans come back as bools, unknown fields from the extra column
+    assert a == order_doc("a", "Table:1", locked=True, table_note="window")
+    assert [d["_id"] for d in db.orders.find({"locked": False})] == ["b"]
+
+    assert list(db.orders.find({"_id": "a"}, {"dish": 1, "locked": 1})) == [
+        {"_id": "a", "dish": "Pizza", "locked": True}]
+    # a field without a column of its own needs the whole row
+    (a,) = db.orders.find({"_id": "a"}, {"table_note": 1})
+    assert a["table_note"] == "window" and a["dish"] == "Pizza"
+
+
+def test_in_and_gt_filters(db):
+    for i, _id in enumerate("abcd"):
+        db.orders.insert_one(order_doc(_id, f"Table:{i}", updated_at=10.0 + i))
+
+    found = db.orders.find({"_id": {"$in": ["a", "c", "x"]}})
+    assert sorted(d["_id"] for d in found) == ["a", "c"]
+    assert list(db.orders.find({"_id": {"$in": []}})) == []
+
+    newer = db.orders.find({"updated_at": {"$gt": 11.0}}).sort("updated_at", -1).limit(1)
+    assert [d["_id"] for d in newer] == ["d"]
+    both = db.orders.find({"updated_at": {"$gt": 10.0}, "_id": {"$in": ["a", "b"]}})
+    assert [d["_id"] for d in both] == ["b"]
+
+    with pytest.raises(NotImplementedError):
+        db.orders.find({"table_note": "window"})
+
+
+# -------------------------------------------------
+# Writes
+# -------------------------------------------------
+def test_write_applies_a_batch_in_one_transaction(db):
+    db.orders.insert_one(order_doc("a", "Table:1"))
+    db.orders.insert_one(order_doc("b", "Table:1", completed=True))
+    failures = db.write((
+        {"a": order_doc("a", "Table:1"), "c": order_doc("c", "Table:2")},
+        {"c": {"remarks": "spicy"}},
+        [({"order_number": "Table:1"}, {"ready": True})],
+        {"b": dict(order_doc("b", "Table:1", completed=True), archived_at=5.0)},
+    ))
+
+    # the duplicate insert fails alone; the rest of the batch still lands
+    assert list(failures) == ["a"]
+    orders = {d["_id"]: d for d in db.load_orders()}
+    assert set(orders) == {"a", "c"}
+    assert orders["a"]["ready"] and orders["c"]["remarks"] == "spicy"
+    assert "updated_at" in orders["c"]
+    assert [d["_id"] for d in db.load_history()] == ["b"]
+
+
+def test_failed_transaction_rolls_back(db):
+    db.orders.insert_one(order_doc("a", "Table:1"))
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.orders.insert_one(order_doc("b", "Table:2"))
+            db.orders.update({"_id": "a"}, {"remarks": "spicy"})
+            raise RuntimeError("boom")
+
+    assert [d["_id"] for d in db.load_orders()] == ["a"]
+    assert db.load_orders()[0]["remarks"] == ""
+    assert not db.conn.in_transaction
+
+
+# -------------------------------------------------
+# OrderSync on SQLite
+# -------------------------------------------------
+def test_order_sync_polls_sqlite(db, clock):
+    db.orders.insert_one(order_doc("a", "Table:1", updated_at=10.0))
+    kitchen = KitchenEngine(storage=db, clock=clock)
+    sync = start_sync(kitchen, db.orders, overlap=0, reconcile_every=3600)
+    assert sync.mode == "poll"
+    assert sync.high_water == 10.0
+
+    db.orders.insert_one(order_doc("b", "Table:2", updated_at=11.0))
+    assert sync.poll() == 1
+    assert kitchen.orders.by_mongo_id("b") is not None
+    assert kitchen.orders.by_mongo_id("a") is None
+
+    # the engine's own flushed writes come back stamped and change nothing
+    kitchen.orders.set(kitchen.orders.by_mongo_id("b"), "remarks", "extra sauce")
+    kitchen.writes.set("b", {"remarks": "extra sauce"})
+    assert kitchen.flush_writes() == {}
+    sync.poll()
+    assert kitchen.orders.by_mongo_id("b").remarks == "extra sauce"
+    assert sync.high_water > 11.0
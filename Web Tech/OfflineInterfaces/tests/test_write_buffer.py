@@ -0,0 +1,87 @@
+from write_buffer import WriteBuffer
+
+
+def test_updates_for_one_id_are_merged():
+    wb = WriteBuffer()
+    wb.set("a", {"locked": True})
+    wb.set("a", {"ready": True})
+    wb.set("b", {"locked": True})
+    inserts, updates, many, archive = wb.take()
+    assert updates == {"a": {"locked": True, "ready": True}, "b": {"locked": True}}
+    assert not inserts and not many and not archive
+    assert wb.take() is None
+
+
+def test_update_of_queued_insert_is_folded_into_it():
+    wb = WriteBuffer()
+    wb.insert({"_id": "a", "dish": "Pizza", "locked": False})
+    wb.set("a", {"locked": True})
+    wb.set_many({"dish": "Pizza"}, {"ready": True})
+    inserts, updates, many, _ = wb.take()
+    assert inserts["a"] == {"_id": "a", "dish": "Pizza", "locked": True, "ready": True}
+    assert updates == {}
+    assert many == [({"dish": "Pizza"}, {"ready": True})]
+
+
+def test_archive_of_unsent_insert_only_writes_history():
+    wb = WriteBuffer()
+    wb.insert({"_id": "a", "dish": "Pizza"})
+    wb.set("a", {"completed": True})
+    wb.archive("a", {"archived_at": 5})
+    inserts, updates, _, archive = wb.take()
+    assert inserts == {} and updates == {}
+    assert archive["a"] == {"_id": "a", "dish": "Pizza", "completed": True, "archived_at": 5}
+
+
+def test_failed_round_trip_is_retried_with_newer_writes_winning(kitchen, storage):
+    kitchen.place_order("Pizza", 1)
+    o = kitchen.orders.last()
+    storage.down = True
+    kitchen.flush_writes()
+    assert storage.orders == {}
+    assert len(kitchen.writes) == 1
+
+    kitchen.writes.set(o.mongo_id, {"remarks": "no cheese"})
+    storage.down = False
+    assert kitchen.flush_writes() == {}
+    assert len(kitchen.writes) == 0
+    assert storage.orders[o.mongo_id]["remarks"] == "no cheese"
+    assert storage.round_trips == 1
+
+
+def test_failed_update_keeps_the_newer_value():
+    wb = WriteBuffer()
+    wb.set("a", {"locked": True, "ready": False})
+    batch = wb.take()
+    wb.set("a", {"ready": True})
+    wb.settle(batch, error=ConnectionError("down"))
+    _, updates, _, _ = wb.take()
+    assert updates == {"a": {"locked": True, "ready": True}}
+
+
+def test_per_document_failures_are_reported_and_dropped(kitchen, storage):
+    kitchen.place_order("Pizza", 1)
+    o = kitchen.orders.last()
+    storage.orders[o.mongo_id] = {"_id": o.mongo_id}
+    failures = kitchen.flush_writes()
+    assert list(failures) == [o.mongo_id]
+    assert kitchen.writes.failed_total == 1
+    assert len(kitchen.writes) == 0
+
+
+def test_locking_a_batch_updates_documents_stored_without_batch_id(kitchen, storage):
+    # legacy / external document: the loader assigns its batch in memory only
+    storage.orders["legacy"] = {"_id": "legacy", "dish": "Pizza", "order_number": "Table:1",
+                                "order_type": "dine-in", "locked": False, "ready": False}
+    kitchen.load_orders_from_mongodb(storage.load_orders())
+    kitchen.place_order("Pizza", "Table:2")
+    o = kitchen.orders.by_mongo_id("legacy")
+    assert o.batch_id is not None and "batch_id" not in storage.orders["legacy"]
+
+    assert kitchen.lock_specific_batch("Pizza", o.batch_id)
+    assert kitchen.flush_writes() == {}
+    assert all(doc["locked"] for doc in storage.orders.values())
+
+    # a full resync from storage keeps the lock
+    kitchen.sync_orders(storage.load_orders())
+    assert o.locked
@@ -0,0 +1,208 @@
+# -----------------------
+# Write coalescing for the `order` collection
+# -----------------------
+import time
+
+from order_sync import stamp
+
+DUPLICATE_KEY = 11000
+# seconds a landed insert is still reported by inserting(); longer than any
+# reconcile scan that could have started before it landed
+LANDED_GRACE = 120.0
+
+
+class WriteBuffer:
+    """
+    Collects order mutations and sends them as ONE unordered bulk_write per
+    flush (the UI flushes once per tick).
+
+      - insert(doc)              -> InsertOne (doc must already carry its _id)
+      - set(_id, fields)         -> UpdateOne, fields for the same _id are merged
+      - set_many(filter, fields) -> UpdateMany
+      - archive(_id, doc)        -> doc copied to the history collection,
+                                    then DeleteOne from `order`
+
+    Updates aimed at a document whose insert is still queued are folded into
+    the insert itself. Every $set gets the updated_at stamp at flush time.
+
+    A flush is split in three so the round trip can run on the Mongo worker:
+    take() swaps out the queue (owner thread), execute() does the bulk_write
+    (any thread), settle() records the outcome (owner thread). flush() does
+    all three in place.
+
+    Per-document write errors are reported as {_id: error message} and
+    dropped. A failed round trip (network, timeout) puts everything back in
+    the queue for the next flush.
+
+    inserting(_id, since) tells the sync loop which documents it must not
+    treat as deleted: their insert is queued, in flight, or landed after
+    its snapshot was taken.
+    """
+
+    def __init__(self, collection=None):
+        self.collection = collection
+        self._inserts = {}   # _id -> document
+        self._updates = {}   # _id -> fields to $set
+        self._many = []      # [(filter, fields)]
+        self._archive = {}   # _id -> final document for the history collection
+        self._in_flight = {}  # _id -> number of taken, unsettled batches inserting it
+        self._landed = {}    # _id -> time.monotonic() its insert settled
+        self.failed_total = 0
+        self.round_trips = 0
+
+    def __len__(self):
+        return len(self._inserts) + len(self._updates) + len(self._many) + len(self._archive)
+
+    # -------------------------------------------------
+    # Queueing
+    # -------------------------------------------------
+    def insert(self, doc):
+        self._inserts[doc["_id"]] = doc
+
+    def set(self, mongo_id, fields):
+        if not mongo_id:
+            return
+        if mongo_id in self._inserts:
+            self._inserts[mongo_id].update(fields)
+            return
+        self._updates.setdefault(mongo_id, {}).update(fields)
+
+    def archive(self, mongo_id, doc):
+        """Move a finished order to history. Pending writes for it are folded into doc."""
+        if not mongo_id:
+            return
+        pending = self._inserts.pop(mongo_id, None)
+        if pending is not None:
+            # it never reached `order`: only the history copy is needed
+            doc = dict(pending, **doc)
+        doc = dict(doc, _id=mongo_id)
+        doc.update(self._updates.pop(mongo_id, {}))
+        self._archive[mongo_id] = doc
+
+    def inserting(self, mongo_id, since=None):
+        """True if mongo_id's insert is queued or in flight, or landed at/after `since` (monotonic)."""
+        if mongo_id in self._inserts or mongo_id in self._in_flight:
+            return True
+        landed = self._landed.get(mongo_id)
+        return since is not None and landed is not None and landed >= since
+
+    def set_many(self, filter_, fields):
+        # unordered ops may run before a queued insert, so patch those directly
+        for doc in self._inserts.values():
+            if all(doc.get(k) == v for k, v in filter_.items()):
+                doc.update(fields)
+        self._many.append((dict(filter_), dict(fields)))
+
+    # -------------------------------------------------
+    # Flush
+    # -------------------------------------------------
+    def flush(self, collection=None):
+        batch = self.take()
+        if batch is None:
+            return {}
+        try:
+            failures = self.execute(batch, collection if collection is not None else self.collection)
+        except Exception as e:
+            return self.settle(batch, error=e)
+        return self.settle(batch, failures)
+
+    def take(self):
+        """Swap out everything queued. Returns a batch for execute(), or None."""
+        if not len(self):
+            return None
+        batch = (self._inserts, self._updates, self._many, self._archive)
+        self._inserts, self._updates, self._many, self._archive = {}, {}, [], {}
+        for _id in batch[0]:
+            self._in_flight[_id] = self._in_flight.get(_id, 0) + 1
+        return batch
+
+    @staticmethod
+    def execute(batch, collection, history=None):
+        """
+        Send one unordered bulk_write. Returns {key: error} for per-document failures.
+        Archived orders are first copied into `history` (one extra round trip,
+        only when there is something to archive) and then deleted from
+        `collection`, so a failure in between never loses an order.
+        """
+        from pymongo import InsertOne, UpdateOne, UpdateMany, DeleteOne
+        from pymongo.errors import BulkWriteError
+
+        inserts, updates, many, archive = batch
+        if archive and history is not None:
+            try:
+                history.insert_many([stamp(doc) for doc in archive.values()], ordered=False)
+            except BulkWriteError as e:
+                # already archived by an earlier, partly failed flush
+                if any(err.get("code") != DUPLICATE_KEY for err in e.details.get("writeErrors", [])):
+                    raise
+
+        ops = []
+        keys = []  # what each op index refers to, for error reporting
+        for _id, doc in inserts.items():
+            ops.append(InsertOne(stamp(doc)))
+            keys.append(_id)
+        for _id, fields in updates.items():
+            ops.append(UpdateOne({"_id": _id}, {"$set": stamp(fields)}))
+            keys.append(_id)
+        for filter_, fields in many:
+            ops.append(UpdateMany(filter_, {"$set": stamp(fields)}))
+            keys.append(tuple(sorted(filter_.items())))
+        for _id in archive:
+            ops.append(DeleteOne({"_id": _id}))
+            keys.append(_id)
+
+        failures = {}
+        if not ops:
+            return failures
+        try:
+            collection.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            for err in e.details.get("writeErrors", []):
+                failures[keys[err["index"]]] = err.get("errmsg", "write error")
+        return failures
+
+    def settle(self, batch, failures=None, error=None):
+        """Record a finished flush. Returns {key: error}."""
+        self.round_trips += 1
+        self._settle_inserts(batch[0], landed=error is None)
+        if error is not None:
+            # nothing is known to have landed: queue it all again (newer writes win)
+            print("Bulk write failed, will retry:", error)
+            self._requeue(*batch)
+            return {"*": str(error)}
+
+        for key, msg in failures.items():
+            print("Write failed for", key, msg)
+        self.failed_total += len(failures)
+        return failures
+
+    def _settle_inserts(self, inserts, landed):
+        now = time.monotonic()
+        for _id in inserts:
+            left = self._in_flight.get(_id, 0) - 1
+            if left > 0:
+                self._in_flight[_id] = left
+            else:
+                self._in_flight.pop(_id, None)
+            if landed:
+                self._landed.pop(_id, None)
+                self._landed[_id] = now
+        # forget old landings (dicts keep insertion order)
+        while self._landed:
+            _id, at = next(iter(self._landed.items()))
+            if now - at < LANDED_GRACE:
+                break
+            del self._landed[_id]
+
+    def _requeue(self, inserts, updates, many, archive):
+        for _id, doc in inserts.items():
+            doc.update(self._updates.pop(_id, {}))
+            self._inserts.setdefault(_id, doc)
+        for _id, fields in updates.items():
+            newer = self._updates.get(_id, {})
+            merged = dict(fields)
+            merged.update(newer)
+            self._updates[_id] = merged
+        self._many = many + self._many
+        for _id, doc in archive.items():
+            self._archive.setdefault(_id, doc)